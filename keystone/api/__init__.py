@@ -10,10 +10,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from keystone.api import cache_metrics
 from keystone.api import credentials
 from keystone.api import discovery
 from keystone.api import os_revoke
 from keystone.api import trusts
 
-__all__ = ('discovery', 'credentials', 'os_revoke', 'trusts')
-__apis__ = (discovery, credentials, os_revoke, trusts)
+__all__ = ('discovery', 'cache_metrics', 'credentials', 'os_revoke',
+           'trusts')
+__apis__ = (discovery, cache_metrics, credentials, os_revoke, trusts)
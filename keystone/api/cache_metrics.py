@@ -0,0 +1,51 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+# This file handles all flask-restful resources for /v3/cache/metrics
+
+import flask_restful
+
+from keystone.common import cache
+from keystone.common import json_home
+from keystone.common import rbac_enforcer
+from keystone.server import flask as ks_flask
+
+
+ENFORCER = rbac_enforcer.RBACEnforcer
+
+
+class CacheMetricsResource(flask_restful.Resource):
+    def get(self):
+        ENFORCER.enforce_call(action='identity:get_cache_metrics')
+        # The metrics are those of the process serving the request.
+        return {'cache_metrics': cache.get_metrics_report(),
+                'links': {
+                    'self': '%s/v3/cache/metrics' % ks_flask.base_url()}}
+
+
+class CacheMetricsAPI(ks_flask.APIBase):
+    _name = 'cache_metrics'
+    _import_name = __name__
+    _api_url_prefix = '/cache'
+    resources = []
+    resource_mapping = [
+        ks_flask.construct_resource_map(
+            resource=CacheMetricsResource,
+            url='/metrics',
+            resource_kwargs={},
+            rel='cache_metrics',
+            status=json_home.Status.EXPERIMENTAL
+        )
+    ]
+
+
+APIs = (CacheMetricsAPI,)
@@ -27,6 +27,8 @@ from keystone import notifications
 
 CONF = keystone.conf.CONF
 MEMOIZE = cache.get_memoization_decorator(group='application_credential')
+MEMOIZE_NOT_FOUND = cache.get_not_found_cache_decorator(
+    group='application_credential')
 LOG = log.getLogger(__name__)
 PROVIDERS = provider_api.ProviderAPIs
 
@@ -142,8 +144,13 @@ class Manager(manager.Manager):
             self._APP_CRED,
             application_credential['id'],
             initiator)
+        # Forget that the application credential didn't exist, if that was
+        # cached.
+        self.get_application_credential.invalidate(
+            self, application_credential['id'])
         return ref
 
+    @MEMOIZE_NOT_FOUND
     @MEMOIZE
     def get_application_credential(self, application_credential_id):
         """Get application credential details.
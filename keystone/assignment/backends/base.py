@@ -95,6 +95,32 @@ class AssignmentDriverBase(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def create_grants(self, grants):
+        """Create several assignments/grants in a single transaction.
+
+        The grants which already exist are left as they are.
+
+        :param grants: a list of dictionaries with the ``role_id``,
+                       ``user_id``, ``group_id``, ``domain_id``,
+                       ``project_id`` and ``inherited_to_projects`` arguments
+                       of :meth:`create_grant` for each grant
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
+
+    def delete_grants(self, grants):
+        """Delete several assignments/grants in a single transaction.
+
+        :param grants: a list of dictionaries with the ``role_id``,
+                       ``user_id``, ``group_id``, ``domain_id``,
+                       ``project_id`` and ``inherited_to_projects`` arguments
+                       of :meth:`delete_grant` for each grant
+        :raises keystone.exception.RoleAssignmentNotFound: If any of the role
+            assignments doesn't exist, in which case none is deleted.
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
+
     @abc.abstractmethod
     def list_role_assignments(self, role_id=None,
                               user_id=None, group_ids=None,
@@ -207,3 +233,39 @@ class AssignmentDriverBase(object):
 
         """
         raise exception.NotImplemented()  # pragma: no cover
+
+    def list_effective_assignments(self, user_id=None, target_type=None,
+                                   target_id=None):
+        """Return the stored effective role assignments of users.
+
+        :param user_id: the unique ID of the user, if not None
+        :param target_type: ``project`` or ``domain``, if not None
+        :param target_id: the unique ID of the project or domain, if not None
+        :returns: a list of dictionaries with the ``user_id``,
+                  ``target_type``, ``target_id`` and ``role_id`` of each
+                  effective assignment matching the parameters which are not
+                  None
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
+
+    def replace_effective_assignments(self, assignments, user_ids=None,
+                                      target_type=None, target_ids=None,
+                                      role_ids=None):
+        """Replace some of the stored effective role assignments.
+
+        The stored assignments matching all the parameters which are not None
+        are deleted, or all of them if these are all None, and
+        ``assignments`` are stored instead, in a single transaction.
+
+        :param assignments: a list of dictionaries with the ``user_id``,
+                            ``target_type``, ``target_id`` and ``role_id`` of
+                            each effective assignment to store
+        :param user_ids: a list of unique IDs of users, or None
+        :param target_type: ``project`` or ``domain``, or None
+        :param target_ids: a list of unique IDs of projects or domains, or
+                           None
+        :param role_ids: a list of unique IDs of roles, or None
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
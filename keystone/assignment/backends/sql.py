@@ -12,6 +12,8 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import sqlalchemy
+
 from keystone.assignment.backends import base
 from keystone.common import sql
 from keystone import exception
@@ -113,6 +115,70 @@ class Assignment(base.AssignmentDriverBase):
                                                        actor_id=actor_id,
                                                        target_id=target_id)
 
+    # The number of grants matched by each statement deleting grants, so that
+    # their conditions don't get too large for the database.
+    _GRANTS_PER_DELETE = 100
+
+    def _get_grant_rows(self, grants):
+        rows = []
+        for grant in grants:
+            rows.append({
+                'type': AssignmentType.calculate_type(
+                    grant['user_id'], grant['group_id'], grant['project_id'],
+                    grant['domain_id']),
+                'actor_id': grant['user_id'] or grant['group_id'],
+                'target_id': grant['project_id'] or grant['domain_id'],
+                'role_id': grant['role_id'],
+                'inherited': grant['inherited_to_projects']})
+        return rows
+
+    def _get_existing_grant_keys(self, session, rows):
+        query = session.query(RoleAssignment)
+        query = query.filter(RoleAssignment.actor_id.in_(
+            list(set(row['actor_id'] for row in rows))))
+        query = query.filter(RoleAssignment.target_id.in_(
+            list(set(row['target_id'] for row in rows))))
+        query = query.filter(RoleAssignment.role_id.in_(
+            list(set(row['role_id'] for row in rows))))
+        return set(_grant_row_key(ref) for ref in query.all())
+
+    def create_grants(self, grants):
+        rows = self._get_grant_rows(grants)
+        try:
+            with sql.session_for_write() as session:
+                existing_keys = self._get_existing_grant_keys(session, rows)
+                rows = dict((_grant_row_key(row), row) for row in rows
+                            if _grant_row_key(row) not in existing_keys)
+                if rows:
+                    rows = list(rows.values())
+                    session.execute(RoleAssignment.__table__.insert(), rows)
+        except sql.DBDuplicateEntry:
+            # Some of the grants were created meanwhile, which the v3 grant
+            # APIs are silent about, so create the others one by one.
+            for grant in grants:
+                self.create_grant(**grant)
+
+    def delete_grants(self, grants):
+        rows = self._get_grant_rows(grants)
+        with sql.session_for_write() as session:
+            existing_keys = self._get_existing_grant_keys(session, rows)
+            for row in rows:
+                if _grant_row_key(row) not in existing_keys:
+                    raise exception.RoleAssignmentNotFound(
+                        role_id=row['role_id'], actor_id=row['actor_id'],
+                        target_id=row['target_id'])
+            for i in range(0, len(rows), self._GRANTS_PER_DELETE):
+                conditions = [
+                    sqlalchemy.and_(
+                        RoleAssignment.type == row['type'],
+                        RoleAssignment.actor_id == row['actor_id'],
+                        RoleAssignment.target_id == row['target_id'],
+                        RoleAssignment.role_id == row['role_id'],
+                        RoleAssignment.inherited == row['inherited'])
+                    for row in rows[i:i + self._GRANTS_PER_DELETE]]
+                query = session.query(RoleAssignment)
+                query.filter(sqlalchemy.or_(*conditions)).delete(False)
+
     def add_role_to_user_and_project(self, user_id, tenant_id, role_id):
         try:
             with sql.session_for_write() as session:
@@ -350,6 +416,47 @@ class Assignment(base.AssignmentDriverBase):
                     role_id=role_id, actor_id=actor_id, target_id=target_id
                 )
 
+    def list_effective_assignments(self, user_id=None, target_type=None,
+                                   target_id=None):
+        with sql.session_for_read() as session:
+            query = session.query(EffectiveRoleAssignment)
+            if user_id:
+                query = query.filter_by(user_id=user_id)
+            if target_type:
+                query = query.filter_by(target_type=target_type)
+            if target_id:
+                query = query.filter_by(target_id=target_id)
+            return [ref.to_dict() for ref in query.all()]
+
+    def replace_effective_assignments(self, assignments, user_ids=None,
+                                      target_type=None, target_ids=None,
+                                      role_ids=None):
+        with sql.session_for_write() as session:
+            query = session.query(EffectiveRoleAssignment)
+            if user_ids is not None:
+                query = query.filter(
+                    EffectiveRoleAssignment.user_id.in_(user_ids))
+            if target_type:
+                query = query.filter_by(target_type=target_type)
+            if target_ids is not None:
+                query = query.filter(
+                    EffectiveRoleAssignment.target_id.in_(target_ids))
+            if role_ids is not None:
+                query = query.filter(
+                    EffectiveRoleAssignment.role_id.in_(role_ids))
+            query.delete(False)
+            if assignments:
+                session.execute(EffectiveRoleAssignment.__table__.insert(),
+                                assignments)
+
+
+def _grant_row_key(row):
+    if isinstance(row, dict):
+        return (row['type'], row['actor_id'], row['target_id'],
+                row['role_id'], bool(row['inherited']))
+    return (row.type, row.actor_id, row.target_id, row.role_id,
+            bool(row.inherited))
+
 
 class RoleAssignment(sql.ModelBase, sql.ModelDictMixin):
     __tablename__ = 'assignment'
@@ -400,3 +507,26 @@ class SystemRoleAssignment(sql.ModelBase, sql.ModelDictMixin):
         parent implementation is not applicable.
         """
         return dict(self.items())
+
+
+class EffectiveRoleAssignment(sql.ModelBase, sql.ModelDictMixin):
+    __tablename__ = 'effective_assignment'
+    attributes = ['user_id', 'target_type', 'target_id', 'role_id']
+    user_id = sql.Column(sql.String(64), nullable=False)
+    target_type = sql.Column(sql.String(64), nullable=False)
+    target_id = sql.Column(sql.String(64), nullable=False)
+    role_id = sql.Column(sql.String(64), nullable=False)
+    __table_args__ = (
+        sql.PrimaryKeyConstraint('user_id', 'target_type', 'target_id',
+                                 'role_id'),
+        sql.Index('ix_effective_assignment_target_id', 'target_id'),
+        sql.Index('ix_effective_assignment_role_id', 'role_id'),
+    )
+
+    def to_dict(self):
+        """Override parent method with a simpler implementation.
+
+        EffectiveRoleAssignment doesn't have non-indexed 'extra' attributes,
+        so the parent implementation is not applicable.
+        """
+        return dict(self.items())
@@ -18,6 +18,7 @@
 import functools
 
 from oslo_log import log
+from six.moves import urllib
 
 from keystone.assignment import schema
 from keystone.common import controller
@@ -34,6 +35,35 @@ LOG = log.getLogger(__name__)
 PROVIDERS = provider_api.ProviderAPIs
 
 
+def _get_grant_protection_target(role_id=None, user_id=None, group_id=None,
+                                 domain_id=None, project_id=None,
+                                 allow_non_existing=False):
+    """Return the entities of a grant the policy rules may inspect."""
+    ref = {}
+    if role_id:
+        ref['role'] = PROVIDERS.role_api.get_role(role_id)
+    if user_id:
+        try:
+            ref['user'] = PROVIDERS.identity_api.get_user(user_id)
+        except exception.UserNotFound:
+            if not allow_non_existing:
+                raise
+    else:
+        try:
+            ref['group'] = PROVIDERS.identity_api.get_group(group_id)
+        except exception.GroupNotFound:
+            if not allow_non_existing:
+                raise
+
+    # NOTE(lbragstad): This if/else check will need to be expanded in the
+    # future to handle system hierarchies if that is implemented.
+    if domain_id:
+        ref['domain'] = PROVIDERS.resource_api.get_domain(domain_id)
+    elif project_id:
+        ref['project'] = PROVIDERS.resource_api.get_project(project_id)
+    return ref
+
+
 class ProjectAssignmentV3(controller.V3Controller):
     """The V3 Project APIs that are processing assignments."""
 
@@ -400,29 +430,10 @@ class GrantAssignmentV3(controller.V3Controller):
         check_protection() handler in the controller.
 
         """
-        ref = {}
-        if role_id:
-            ref['role'] = PROVIDERS.role_api.get_role(role_id)
-        if user_id:
-            try:
-                ref['user'] = PROVIDERS.identity_api.get_user(user_id)
-            except exception.UserNotFound:
-                if not allow_non_existing:
-                    raise
-        else:
-            try:
-                ref['group'] = PROVIDERS.identity_api.get_group(group_id)
-            except exception.GroupNotFound:
-                if not allow_non_existing:
-                    raise
-
-        # NOTE(lbragstad): This if/else check will need to be expanded in the
-        # future to handle system hierarchies if that is implemented.
-        if domain_id:
-            ref['domain'] = PROVIDERS.resource_api.get_domain(domain_id)
-        elif project_id:
-            ref['project'] = PROVIDERS.resource_api.get_project(project_id)
-
+        ref = _get_grant_protection_target(
+            role_id=role_id, user_id=user_id, group_id=group_id,
+            domain_id=domain_id, project_id=project_id,
+            allow_non_existing=allow_non_existing)
         self.check_protection(request, protection, ref)
 
     @controller.protected(callback=_check_grant_protection)
@@ -848,7 +859,7 @@ class RoleAssignmentV3(controller.V3Controller):
                                            domain=params.get(
                                                'scope.domain.id'))
 
-        refs = PROVIDERS.assignment_api.list_role_assignments(
+        list_filters = dict(
             role_id=params.get('role.id'),
             user_id=params.get('user.id'),
             group_id=params.get('group.id'),
@@ -859,10 +870,53 @@ class RoleAssignmentV3(controller.V3Controller):
             inherited=inherited, effective=effective,
             include_names=include_names)
 
+        next_marker = None
+        if 'limit' in params or 'marker' in params:
+            refs, next_marker = (
+                PROVIDERS.assignment_api.list_role_assignments_page(
+                    limit=self._get_page_limit(params),
+                    marker=params.get('marker'), **list_filters))
+        else:
+            refs = PROVIDERS.assignment_api.list_role_assignments(
+                **list_filters)
+
         formatted_refs = [self._format_entity(request.context_dict, ref)
                           for ref in refs]
 
-        return self.wrap_collection(request.context_dict, formatted_refs)
+        collection = self.wrap_collection(request.context_dict,
+                                          formatted_refs)
+        if next_marker:
+            collection['links']['next'] = self._get_next_page_url(
+                request, len(refs), next_marker)
+        return collection
+
+    def _get_page_limit(self, params):
+        if 'limit' not in params:
+            return None
+        try:
+            limit = int(params['limit'])
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            msg = _('The limit must be a positive integer.')
+            raise exception.ValidationError(message=msg)
+        return limit
+
+    def _get_next_page_url(self, request, limit, marker):
+        """Return the URL of the next page of a role assignments listing.
+
+        The URL has the same query parameters as the request, but for the
+        marker, and the limit, which is set to the number of assignments in
+        the page to carry on with the same limit when none was requested.
+
+        """
+        query = [(name, value) for name, value in request.params.items()
+                 if name not in ('limit', 'marker')]
+        query += [('limit', str(limit)), ('marker', marker)]
+        return '%s?%s' % (
+            self.base_url(request.context_dict,
+                          path=request.context_dict['path']),
+            urllib.parse.urlencode(query))
 
     @controller.filterprotected('group.id', 'role.id', 'scope.system',
                                 'scope.domain.id', 'scope.project.id',
@@ -897,6 +951,58 @@ class RoleAssignmentV3(controller.V3Controller):
         return self._list_role_assignments(request, filters,
                                            include_subtree=True)
 
+    def _get_grants(self, role_assignments):
+        validation.lazy_validate(schema.role_assignments_bulk,
+                                 role_assignments)
+        grants = []
+        for ref in role_assignments:
+            scope = ref['scope']
+            grants.append({
+                'role_id': ref['role']['id'],
+                'user_id': ref.get('user', {}).get('id'),
+                'group_id': ref.get('group', {}).get('id'),
+                'domain_id': scope.get('domain', {}).get('id'),
+                'project_id': scope.get('project', {}).get('id'),
+                'inherited_to_projects': 'OS-INHERIT:inherited_to' in scope})
+        return grants
+
+    def _check_bulk_grant_protection(self, request, protection,
+                                     role_assignments):
+        """Check protection for the bulk role assignment APIs.
+
+        Each role assignment is checked against the policy rule of the grant
+        API making or removing it alone, with the same target entities, so
+        that these APIs don't allow more than the grant APIs.
+
+        """
+        if protection['f_name'] == 'create_role_assignments':
+            action = 'create_grant'
+            allow_non_existing = False
+        else:
+            action = 'revoke_grant'
+            allow_non_existing = True
+        for grant in self._get_grants(role_assignments):
+            input_attr = dict((name, value) for name, value in grant.items()
+                              if value and name != 'inherited_to_projects')
+            ref = _get_grant_protection_target(
+                allow_non_existing=allow_non_existing, **input_attr)
+            self.check_protection(
+                request, {'f_name': action, 'input_attr': input_attr}, ref)
+
+    @controller.protected(callback=_check_bulk_grant_protection)
+    def create_role_assignments(self, request, role_assignments):
+        """Grant several roles in a single request."""
+        PROVIDERS.assignment_api.create_grants(
+            self._get_grants(role_assignments),
+            context=request.context_dict)
+
+    @controller.protected(callback=_check_bulk_grant_protection)
+    def delete_role_assignments(self, request, role_assignments):
+        """Revoke several roles in a single request."""
+        PROVIDERS.assignment_api.delete_grants(
+            self._get_grants(role_assignments),
+            context=request.context_dict)
+
     def list_role_assignments_wrapper(self, request):
         """Main entry point from router for list role assignments.
 
@@ -14,10 +14,14 @@
 
 """Main entry point into the Assignment service."""
 
+import base64
+import collections
 import copy
 import itertools
 
 from oslo_log import log
+from oslo_serialization import jsonutils
+import six
 
 from keystone.common import cache
 from keystone.common import driver_hints
@@ -36,15 +40,234 @@ PROVIDERS = provider_api.ProviderAPIs
 # This is a general cache region for assignment administration (CRUD
 # operations).
 MEMOIZE = cache.get_memoization_decorator(group='role')
+MEMOIZE_NOT_FOUND = cache.get_not_found_cache_decorator(group='role')
 
 # This builds a discrete cache region dedicated to role assignments computed
-# for a given user + project/domain pair. Any write operation to add or remove
-# any role assignment should invalidate this entire cache region.
+# for a given user + project/domain pair. Values are cached under the
+# generations of the user and target they were computed for, so that a write
+# operation only has to renew the generations of the users and targets it
+# affects, see invalidate_computed_assignments(). Previous values aren't served
+# while they are computed again: they are cached under the previous
+# generations, which a recomputed value is never looked up under.
 COMPUTED_ASSIGNMENTS_REGION = cache.create_region(name='computed assignments')
 MEMOIZE_COMPUTED_ASSIGNMENTS = cache.get_memoization_decorator(
     group='role',
     region=COMPUTED_ASSIGNMENTS_REGION)
 
+# The name of the generation, kept in the computed assignments region, which
+# tells the role managers of all processes whether their closure of the role
+# inference rules is current.
+IMPLIED_ROLES_GENERATION = 'implied_roles'
+# The generation renewed by changes to the roles themselves and whenever the
+# whole region is invalidated, which the token provider checks cached tokens
+# against. Changes to the role assignments of some users or targets only
+# invalidate the cached tokens bound to those, see
+# invalidate_computed_assignments().
+ROLES_GENERATION = 'roles'
+# The generation renewed by any change to the projects and domains, which the
+# projects and domains listed for a user depend on.
+TARGETS_GENERATION = 'targets'
+
+
+def _get_computed_generations(user_id, project_id=None, domain_id=None,
+                              targets=False):
+    """Return the generations a value computed for a user is cached under.
+
+    :returns: a tuple of the generations of the user, of the project or
+              domain if given and of the targets if ``targets`` is True, or
+              None if the computed assignments aren't cached
+
+    """
+    if not (CONF.cache.enabled and CONF.role.caching):
+        return None
+    names = ['user:%s' % user_id]
+    if project_id:
+        names.append('project:%s' % project_id)
+    if domain_id:
+        names.append('domain:%s' % domain_id)
+    if targets:
+        names.append(TARGETS_GENERATION)
+    return tuple(cache.get_generations(COMPUTED_ASSIGNMENTS_REGION, names))
+
+
+def invalidate_computed_assignments(user_ids=None, project_ids=None,
+                                    domain_ids=None, targets=False,
+                                    group_ids=None):
+    """Invalidate the role assignments computed for some users or targets.
+
+    The generations of the given users, projects and domains are renewed, so
+    that the values computed for them are computed again, and the cached
+    tokens bound to them are invalidated, since those keep their roles. If
+    none are given and ``targets`` is False, the whole computed assignments
+    region is invalidated instead, which is only needed when a change may
+    affect the assignments of anyone, such as a change to the role inference
+    rules.
+
+    :param user_ids: an iterable of the IDs of the users whose effective
+                     assignments may have changed
+    :param project_ids: an iterable of the IDs of the projects on which
+                        effective assignments may have changed
+    :param domain_ids: an iterable of the IDs of the domains on which
+                       effective assignments may have changed
+    :param targets: whether projects or domains were created, deleted, or
+                    disabled, or changed their domain, which changes the
+                    projects and domains listed for users
+    :param group_ids: an iterable of the IDs of the groups whose role
+                      assignments may have changed. Nothing is computed for
+                      groups, but federated tokens get their roles from their
+                      groups rather than from their user, who isn't listed
+                      among the members of any group, so the cached tokens
+                      bound to these groups are invalidated.
+
+    """
+    if (user_ids is None and project_ids is None and domain_ids is None and
+            group_ids is None and not targets):
+        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        return
+    user_ids = set(user_ids or [])
+    project_ids = set(project_ids or [])
+    domain_ids = set(domain_ids or [])
+    names = set('user:%s' % user_id for user_id in user_ids)
+    names.update('project:%s' % project_id for project_id in project_ids)
+    names.update('domain:%s' % domain_id for domain_id in domain_ids)
+    if targets:
+        names.add(TARGETS_GENERATION)
+    cache.bump_generations(COMPUTED_ASSIGNMENTS_REGION, names)
+    # Listing the projects and domains of users doesn't change the roles of
+    # any token, so the targets alone don't invalidate any cached token.
+    for kind, entity_ids in (('user', user_ids), ('project', project_ids),
+                             ('domain', domain_ids),
+                             ('group', set(group_ids or []))):
+        for entity_id in sorted(entity_ids):
+            notifications.invalidate_token_cache_notification(
+                'Invalidating the token cache because the role assignments '
+                'of %(kind)s %(id)s may have changed.' %
+                {'kind': kind, 'id': entity_id},
+                **{'%s_id' % kind: entity_id})
+
+
+def _assignment_key(ref):
+    """Return a hashable value identifying a role assignment ref."""
+    return tuple(sorted(
+        (key, tuple(sorted(value.items())) if isinstance(value, dict)
+         else value)
+        for key, value in ref.items()))
+
+
+def _get_assignment_source_key(ref):
+    """Return the position of a role assignment read from the backend.
+
+    The assignments listed in pages are sorted by actor, target and
+    inheritance first. The assignments read from the backend which share these
+    are expanded together, so that an implied role reached from several of
+    them is only listed once.
+
+    """
+    if 'user_id' in ref:
+        actor = ('user', ref['user_id'])
+    else:
+        actor = ('group', ref['group_id'])
+    if 'project_id' in ref:
+        target = ('project', ref['project_id'])
+    elif 'domain_id' in ref:
+        target = ('domain', ref['domain_id'])
+    else:
+        target = ('system', 'all')
+    return actor + target + (bool(ref.get('inherited_to_projects')),)
+
+
+def _encode_assignment_marker(key):
+    return base64.urlsafe_b64encode(
+        jsonutils.dump_as_bytes(key)).decode('ascii')
+
+
+def _decode_assignment_marker(marker):
+    try:
+        source_key, ref_key = jsonutils.loads(
+            base64.urlsafe_b64decode(marker.encode('ascii')))
+        source_key = tuple(source_key)
+    except (TypeError, ValueError):
+        source_key = ref_key = None
+    if (source_key is None or len(source_key) != 5 or
+            not all(isinstance(value, six.string_types)
+                    for value in source_key[:4] + (ref_key,)) or
+            not isinstance(source_key[4], bool)):
+        raise exception.ValidationError(
+            message=_('Invalid marker: %s') % marker)
+    return source_key, ref_key
+
+
+class _GroupUsers(object):
+    """The users of the groups met while listing role assignments.
+
+    The users of the groups are listed from the identity backend in batches
+    of the groups given, in their order, when the users of a group of the batch
+    are first needed. They are then kept for the rest of the listing.
+
+    """
+
+    def __init__(self, group_ids, batch_size=None):
+        self._group_ids = []
+        self._positions = {}
+        for group_id in group_ids:
+            if group_id not in self._positions:
+                self._positions[group_id] = len(self._group_ids)
+                self._group_ids.append(group_id)
+        self._batch_size = batch_size
+        self._users = {}
+        self._listed_group_ids = set()
+
+    def get(self, group_id):
+        """Return the users of a group, or None if it doesn't exist."""
+        if group_id not in self._listed_group_ids:
+            start = self._positions.get(group_id)
+            if start is None:
+                group_ids = [group_id]
+            else:
+                end = start + self._batch_size if self._batch_size else None
+                group_ids = [x for x in self._group_ids[start:end]
+                             if x not in self._listed_group_ids]
+            self._users.update(
+                PROVIDERS.identity_api.list_users_in_groups(group_ids))
+            self._listed_group_ids.update(group_ids)
+        return self._users.get(group_id)
+
+
+def _compute_implied_roles_closure(rules):
+    """Compute the transitive closure of the role inference rules.
+
+    :param rules: a list of role inference rules, as returned by
+                  ``list_role_inference_rules()``
+    :returns: a dictionary mapping the ID of each prior role to a tuple of
+              ``(implied_role_id, prior_role_id)`` pairs, one for each rule
+              reachable from it, where ``prior_role_id`` is the role the rule
+              directly implies ``implied_role_id`` from
+
+    """
+    implied_role_ids = collections.defaultdict(list)
+    for rule in rules:
+        implied_role_ids[rule['prior_role_id']].append(
+            rule['implied_role_id'])
+
+    closure = {}
+    for prior_role_id in implied_role_ids:
+        reached_role_ids = [prior_role_id]
+        seen_role_ids = set(reached_role_ids)
+        pairs = []
+        # The list grows while being iterated over, one role at a time.
+        for role_id in reached_role_ids:
+            for implied_role_id in implied_role_ids.get(role_id, ()):
+                pairs.append((implied_role_id, role_id))
+                if implied_role_id not in seen_role_ids:
+                    seen_role_ids.add(implied_role_id)
+                    reached_role_ids.append(implied_role_id)
+                elif implied_role_id == prior_role_id:
+                    msg = ('Circular reference found '
+                           'role inference rules - %(prior_role_id)s.')
+                    LOG.error(msg, {'prior_role_id': role_id})
+        closure[prior_role_id] = tuple(pairs)
+    return closure
+
 
 @notifications.listener
 class Manager(manager.Manager):
@@ -62,6 +285,9 @@ class Manager(manager.Manager):
     _USER_SYSTEM = 'UserSystem'
     _GROUP_SYSTEM = 'GroupSystem'
     _PROJECT = 'project'
+    _DOMAIN = 'domain'
+    _GRANT_ARGUMENTS = ('role_id', 'user_id', 'group_id', 'domain_id',
+                        'project_id', 'inherited_to_projects')
     _ROLE_REMOVED_FROM_USER = 'role_removed_from_user'
     _INVALIDATION_USER_PROJECT_TOKENS = 'invalidate_user_project_tokens'
 
@@ -79,6 +305,8 @@ class Manager(manager.Manager):
                                    payload):
         domain_id = payload['resource_info']
         self.driver.delete_domain_assignments(domain_id)
+        self._delete_effective_assignments(target_type=self._DOMAIN,
+                                           target_ids=[domain_id])
 
     def _get_group_ids_for_user_id(self, user_id):
         # TODO(morganfainberg): Implement a way to get only group_ids
@@ -110,7 +338,135 @@ class Manager(manager.Manager):
                     notifications.REMOVE_APP_CREDS_FOR_USER, payload
                 )
 
-    @MEMOIZE_COMPUTED_ASSIGNMENTS
+    def _compute_effective_assignments(self, **filters):
+        """Compute the effective assignments to store from the direct ones.
+
+        :param filters: the filters of :meth:`list_role_assignments`
+        :returns: a list of dictionaries with the ``user_id``,
+                  ``target_type``, ``target_id`` and ``role_id`` of each
+                  effective assignment on a project or domain
+
+        """
+        rows = set()
+        for ref in self.list_role_assignments(effective=True, **filters):
+            if ref.get('project_id'):
+                target = (self._PROJECT, ref['project_id'])
+            elif ref.get('domain_id'):
+                target = (self._DOMAIN, ref['domain_id'])
+            else:
+                continue
+            rows.add((ref['user_id'],) + target + (ref['role_id'],))
+        return [{'user_id': user_id, 'target_type': target_type,
+                 'target_id': target_id, 'role_id': role_id}
+                for user_id, target_type, target_id, role_id in rows]
+
+    def rebuild_effective_assignments(self):
+        """Compute and store all the effective role assignments again.
+
+        This is done whether or not the `[assignment]
+        materialize_effective_assignments` option is enabled, so that the
+        stored assignments are current when it gets enabled.
+
+        :returns: the number of effective assignments stored
+
+        """
+        assignments = self._compute_effective_assignments()
+        self.driver.replace_effective_assignments(assignments)
+        return len(assignments)
+
+    def refresh_effective_assignments(self, user_ids=None, project_ids=None,
+                                      domain_ids=None):
+        """Compute and store again the effective role assignments changed.
+
+        Nothing is done unless the `[assignment]
+        materialize_effective_assignments` option is enabled. All the
+        effective assignments are computed again if no parameter is given.
+
+        :param user_ids: a list of unique IDs of users whose effective
+                         assignments may have changed
+        :param project_ids: a list of unique IDs of projects on which the
+                            effective assignments may have changed
+        :param domain_ids: a list of unique IDs of domains on which the
+                           effective assignments may have changed
+
+        """
+        if not CONF.assignment.materialize_effective_assignments:
+            return
+        if user_ids is None and project_ids is None and domain_ids is None:
+            self.rebuild_effective_assignments()
+            return
+
+        def compute(ids, filter_name):
+            assignments = []
+            for entity_id in set(ids or []):
+                try:
+                    assignments += self._compute_effective_assignments(
+                        **{filter_name: entity_id})
+                except exception.NotFound:
+                    # The entity was deleted meanwhile, so it doesn't have
+                    # any effective assignment anymore.
+                    pass
+            return assignments
+
+        if user_ids:
+            self.driver.replace_effective_assignments(
+                compute(user_ids, 'user_id'), user_ids=list(user_ids))
+        if project_ids:
+            assignments = [a for a in compute(project_ids, 'project_id')
+                           if a['target_type'] == self._PROJECT]
+            self.driver.replace_effective_assignments(
+                assignments, target_type=self._PROJECT,
+                target_ids=list(project_ids))
+        if domain_ids:
+            self.driver.replace_effective_assignments(
+                compute(domain_ids, 'domain_id'), target_type=self._DOMAIN,
+                target_ids=list(domain_ids))
+
+    def _delete_effective_assignments(self, **filters):
+        if CONF.assignment.materialize_effective_assignments:
+            self.driver.replace_effective_assignments([], **filters)
+
+    def _refresh_effective_assignments_for_grants(self, grants):
+        if not CONF.assignment.materialize_effective_assignments:
+            return
+        user_ids = set()
+        project_ids = set()
+        domain_ids = set()
+        for grant in grants:
+            if grant['user_id']:
+                user_ids.add(grant['user_id'])
+            elif grant['domain_id'] and grant['inherited_to_projects']:
+                # This affects every project of the domain, so the members of
+                # the group are fewer.
+                try:
+                    users = PROVIDERS.identity_api.list_users_in_group(
+                        grant['group_id'])
+                except exception.GroupNotFound:
+                    users = []
+                user_ids.update(user['id'] for user in users)
+            elif grant['domain_id']:
+                domain_ids.add(grant['domain_id'])
+            else:
+                project_ids.add(grant['project_id'])
+                if grant['inherited_to_projects']:
+                    project_ids.update(
+                        project['id'] for project in
+                        PROVIDERS.resource_api.list_projects_in_subtree(
+                            grant['project_id']))
+        self.refresh_effective_assignments(
+            user_ids=list(user_ids), project_ids=list(project_ids),
+            domain_ids=list(domain_ids))
+
+    def _invalidate_computed_assignments_for_actors(self, user_ids=(),
+                                                    group_ids=()):
+        user_ids = set(user_id for user_id in user_ids if user_id)
+        group_ids = [group_id for group_id in group_ids if group_id]
+        if group_ids:
+            for users in PROVIDERS.identity_api.list_users_in_groups(
+                    group_ids).values():
+                user_ids.update(user['id'] for user in users)
+        invalidate_computed_assignments(user_ids=user_ids, group_ids=group_ids)
+
     def get_roles_for_user_and_project(self, user_id, tenant_id):
         """Get the roles associated with a user within given project.
 
@@ -123,13 +479,24 @@ class Manager(manager.Manager):
             exist.
 
         """
+        return self._get_roles_for_user_and_project(
+            user_id, tenant_id,
+            _get_computed_generations(user_id, project_id=tenant_id))
+
+    @MEMOIZE_COMPUTED_ASSIGNMENTS
+    def _get_roles_for_user_and_project(self, user_id, tenant_id,
+                                        generations):
         PROVIDERS.resource_api.get_project(tenant_id)
+        if CONF.assignment.materialize_effective_assignments:
+            return [ref['role_id'] for ref in
+                    self.driver.list_effective_assignments(
+                        user_id=user_id, target_type=self._PROJECT,
+                        target_id=tenant_id)]
         assignment_list = self.list_role_assignments(
             user_id=user_id, project_id=tenant_id, effective=True)
         # Use set() to process the list to remove any duplicates
         return list(set([x['role_id'] for x in assignment_list]))
 
-    @MEMOIZE_COMPUTED_ASSIGNMENTS
     def get_roles_for_user_and_domain(self, user_id, domain_id):
         """Get the roles associated with a user within given domain.
 
@@ -137,7 +504,19 @@ class Manager(manager.Manager):
         :raises keystone.exception.DomainNotFound: If the domain doesn't exist.
 
         """
+        return self._get_roles_for_user_and_domain(
+            user_id, domain_id,
+            _get_computed_generations(user_id, domain_id=domain_id))
+
+    @MEMOIZE_COMPUTED_ASSIGNMENTS
+    def _get_roles_for_user_and_domain(self, user_id, domain_id,
+                                       generations):
         PROVIDERS.resource_api.get_domain(domain_id)
+        if CONF.assignment.materialize_effective_assignments:
+            return [ref['role_id'] for ref in
+                    self.driver.list_effective_assignments(
+                        user_id=user_id, target_type=self._DOMAIN,
+                        target_id=domain_id)]
         assignment_list = self.list_role_assignments(
             user_id=user_id, domain_id=domain_id, effective=True)
         # Use set() to process the list to remove any duplicates
@@ -195,16 +574,21 @@ class Manager(manager.Manager):
         PROVIDERS.resource_api.get_project(project_id)
         PROVIDERS.role_api.get_role(role_id)
         self.driver.add_role_to_user_and_project(user_id, project_id, role_id)
+        self.refresh_effective_assignments(user_ids=[user_id])
 
     def add_role_to_user_and_project(self, user_id, tenant_id, role_id):
         self._add_role_to_user_and_project_adapter(
             role_id, user_id=user_id, project_id=tenant_id)
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        invalidate_computed_assignments(user_ids=[user_id])
 
     # TODO(henry-nash): We might want to consider list limiting this at some
     # point in the future.
-    @MEMOIZE_COMPUTED_ASSIGNMENTS
     def list_projects_for_user(self, user_id):
+        return self._list_projects_for_user(
+            user_id, _get_computed_generations(user_id, targets=True))
+
+    @MEMOIZE_COMPUTED_ASSIGNMENTS
+    def _list_projects_for_user(self, user_id, generations):
         # FIXME(lbragstad): Without the use of caching, listing effective role
         # assignments is slow, especially with large data set (lots of users
         # with multiple role assignments). This should serve as a marker in
@@ -212,6 +596,12 @@ class Manager(manager.Manager):
         # that it can be performant without having a hard dependency on
         # caching. Please see https://bugs.launchpad.net/keystone/+bug/1700852
         # for more details.
+        if CONF.assignment.materialize_effective_assignments:
+            project_ids = list(set(
+                ref['target_id'] for ref in
+                self.driver.list_effective_assignments(
+                    user_id=user_id, target_type=self._PROJECT)))
+            return PROVIDERS.resource_api.list_projects_from_ids(project_ids)
         assignment_list = self.list_role_assignments(
             user_id=user_id, effective=True)
         # Use set() to process the list to remove any duplicates
@@ -221,8 +611,18 @@ class Manager(manager.Manager):
 
     # TODO(henry-nash): We might want to consider list limiting this at some
     # point in the future.
-    @MEMOIZE_COMPUTED_ASSIGNMENTS
     def list_domains_for_user(self, user_id):
+        return self._list_domains_for_user(
+            user_id, _get_computed_generations(user_id, targets=True))
+
+    @MEMOIZE_COMPUTED_ASSIGNMENTS
+    def _list_domains_for_user(self, user_id, generations):
+        if CONF.assignment.materialize_effective_assignments:
+            domain_ids = list(set(
+                ref['target_id'] for ref in
+                self.driver.list_effective_assignments(
+                    user_id=user_id, target_type=self._DOMAIN)))
+            return PROVIDERS.resource_api.list_domains_from_ids(domain_ids)
         assignment_list = self.list_role_assignments(
             user_id=user_id, effective=True)
         # Use set() to process the list to remove any duplicates
@@ -258,6 +658,7 @@ class Manager(manager.Manager):
 
         self.driver.remove_role_from_user_and_project(user_id, project_id,
                                                       role_id)
+        self.refresh_effective_assignments(user_ids=[user_id])
         payload = {'user_id': user_id, 'project_id': project_id}
         notifications.Audit.internal(
             notifications.REMOVE_APP_CREDS_FOR_USER,
@@ -270,7 +671,7 @@ class Manager(manager.Manager):
     def remove_role_from_user_and_project(self, user_id, tenant_id, role_id):
         self._remove_role_from_user_and_project_adapter(
             role_id, user_id=user_id, project_id=tenant_id)
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        invalidate_computed_assignments(user_ids=[user_id])
 
     def _invalidate_token_cache(self, role_id, group_id, user_id, project_id,
                                 domain_id):
@@ -296,7 +697,10 @@ class Manager(manager.Manager):
              'actor_id': actor_id, 'target_type': target_type,
              'target_id': target_id}
         )
-        notifications.invalidate_token_cache_notification(reason)
+        # The tokens of every member of a group may be affected, so only the
+        # removal of a role from a user is limited to that user's tokens.
+        notifications.invalidate_token_cache_notification(
+            reason, user_id=None if group_id else user_id)
 
     @notifications.role_assignment('created')
     def create_grant(self, role_id, user_id=None, group_id=None,
@@ -319,7 +723,12 @@ class Manager(manager.Manager):
             role_id, user_id=user_id, group_id=group_id, domain_id=domain_id,
             project_id=project_id, inherited_to_projects=inherited_to_projects
         )
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        self._refresh_effective_assignments_for_grants([{
+            'role_id': role_id, 'user_id': user_id, 'group_id': group_id,
+            'domain_id': domain_id, 'project_id': project_id,
+            'inherited_to_projects': inherited_to_projects}])
+        self._invalidate_computed_assignments_for_actors(
+            user_ids=[user_id], group_ids=[group_id])
 
     def get_grant(self, role_id, user_id=None, group_id=None,
                   domain_id=None, project_id=None,
@@ -390,7 +799,183 @@ class Manager(manager.Manager):
             role_id, user_id=user_id, group_id=group_id, domain_id=domain_id,
             project_id=project_id, inherited_to_projects=inherited_to_projects
         )
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        self._refresh_effective_assignments_for_grants([{
+            'role_id': role_id, 'user_id': user_id, 'group_id': group_id,
+            'domain_id': domain_id, 'project_id': project_id,
+            'inherited_to_projects': inherited_to_projects}])
+        self._invalidate_computed_assignments_for_actors(
+            user_ids=[user_id], group_ids=[group_id])
+
+    def _validate_grants(self, grants):
+        """Check several grants before making or removing any of them.
+
+        :returns: the distinct grants, as dictionaries with all the arguments
+                  of create_grant, except the context
+        :raises keystone.exception.ValidationError: If a grant doesn't have
+            a role, or has both or neither of a user and a group, or of a
+            domain and a project.
+        :raises keystone.exception.RoleNotFound: If a role doesn't exist.
+        :raises keystone.exception.DomainNotFound: If a domain doesn't exist.
+        :raises keystone.exception.ProjectNotFound: If a project doesn't
+            exist.
+        :raises keystone.exception.DomainSpecificRoleMismatch: If a domain
+            specific role is granted on a project of another domain.
+
+        """
+        distinct_grants = collections.OrderedDict()
+        for grant in grants:
+            unknown = set(grant) - set(self._GRANT_ARGUMENTS)
+            if unknown:
+                raise exception.ValidationError(
+                    _('Unexpected grant attributes: %s') %
+                    ', '.join(sorted(unknown)))
+            grant = dict((name, grant.get(name))
+                         for name in self._GRANT_ARGUMENTS)
+            grant['inherited_to_projects'] = bool(
+                grant['inherited_to_projects'])
+            if not grant['role_id']:
+                raise exception.ValidationError(
+                    attribute='role_id', target='grant')
+            if bool(grant['user_id']) == bool(grant['group_id']):
+                raise exception.ValidationError(
+                    _('Specify one of user or group'))
+            if bool(grant['domain_id']) == bool(grant['project_id']):
+                raise exception.ValidationError(
+                    _('Specify one of domain or project'))
+            distinct_grants[tuple(sorted(grant.items()))] = grant
+        grants = list(distinct_grants.values())
+
+        role_ids = set(grant['role_id'] for grant in grants)
+        roles = dict((role['id'], role) for role in
+                     PROVIDERS.role_api.list_roles_from_ids(list(role_ids)))
+        for role_id in role_ids:
+            if role_id not in roles:
+                raise exception.RoleNotFound(role_id=role_id)
+        for domain_id in set(grant['domain_id'] for grant in grants
+                             if grant['domain_id']):
+            PROVIDERS.resource_api.get_domain(domain_id)
+        project_ids = set(grant['project_id'] for grant in grants
+                          if grant['project_id'])
+        projects = dict(
+            (project['id'], project) for project in
+            PROVIDERS.resource_api.list_projects_from_ids(list(project_ids)))
+        for project_id in project_ids:
+            if project_id not in projects:
+                raise exception.ProjectNotFound(project_id=project_id)
+
+        for grant in grants:
+            role = roles[grant['role_id']]
+            if not grant['project_id'] or not role['domain_id']:
+                continue
+            # For domain specific roles, the domain of the project
+            # and role must match
+            if projects[grant['project_id']]['domain_id'] != role['domain_id']:
+                raise exception.DomainSpecificRoleMismatch(
+                    role_id=role['id'], project_id=grant['project_id'])
+        return grants
+
+    @notifications.role_assignments('created')
+    def create_grants(self, grants, context=None):
+        """Make several grants at once.
+
+        All the grants are checked before any is made, then they are made in
+        a single transaction if the driver supports it, and the computed role
+        assignments are invalidated once. The grants which already exist are
+        left as they are.
+
+        :param grants: a list of dictionaries with the ``role_id``,
+                       ``user_id``, ``group_id``, ``domain_id``,
+                       ``project_id`` and ``inherited_to_projects`` arguments
+                       of :meth:`create_grant`, the last one being optional
+        :param context: the context of the request, used to audit the grants
+
+        """
+        grants = self._validate_grants(grants)
+        if not grants:
+            return
+        try:
+            self.driver.create_grants(grants)
+        except exception.NotImplemented:
+            for grant in grants:
+                self.driver.create_grant(**grant)
+        self._refresh_effective_assignments_for_grants(grants)
+        self._invalidate_computed_assignments_for_actors(
+            user_ids=[grant['user_id'] for grant in grants],
+            group_ids=[grant['group_id'] for grant in grants])
+
+    @notifications.role_assignments('deleted')
+    def delete_grants(self, grants, context=None):
+        """Remove several grants at once.
+
+        All the grants are checked before any is removed, then they are
+        removed in a single transaction if the driver supports it. The
+        computed role assignments and the cached tokens are invalidated once
+        for all the users concerned.
+
+        :param grants: a list of dictionaries with the ``role_id``,
+                       ``user_id``, ``group_id``, ``domain_id``,
+                       ``project_id`` and ``inherited_to_projects`` arguments
+                       of :meth:`delete_grant`, the last one being optional
+        :param context: the context of the request, used to audit the grants
+        :raises keystone.exception.RoleAssignmentNotFound: If any of the role
+            assignments doesn't exist, in which case none is removed.
+
+        """
+        grants = self._validate_grants(grants)
+        if not grants:
+            return
+        try:
+            self.driver.delete_grants(grants)
+        except exception.NotImplemented:
+            for grant in grants:
+                self.check_grant_role_id(**grant)
+            for grant in grants:
+                self.driver.delete_grant(**grant)
+        self._invalidate_token_cache_for_grants(grants)
+        self._refresh_effective_assignments_for_grants(grants)
+        self._invalidate_computed_assignments_for_actors(
+            user_ids=[grant['user_id'] for grant in grants],
+            group_ids=[grant['group_id'] for grant in grants])
+
+    def _invalidate_token_cache_for_grants(self, grants):
+        # As for single grants, the tokens of every member of a group may be
+        # affected, so the whole token cache is invalidated once if roles
+        # were removed from any group.
+        if any(grant['group_id'] for grant in grants):
+            if CONF.token.revoke_by_id:
+                notifications.invalidate_token_cache_notification(
+                    'Invalidating the token cache because %d role '
+                    'assignments were removed, including from groups.' %
+                    len(grants))
+                return
+        user_ids = set()
+        project_ids = set()
+        domain_ids = set()
+        for grant in grants:
+            if grant['user_id']:
+                user_ids.add(grant['user_id'])
+            # Not every token holding the roles of a group is one of its
+            # members, federated tokens aren't, so the tokens bound to the
+            # target of the grant are invalidated as well. Tokens scoped to
+            # the projects of a domain are bound to the domain too, which
+            # covers the grants inherited from domains.
+            elif grant['domain_id']:
+                domain_ids.add(grant['domain_id'])
+            else:
+                project_ids.add(grant['project_id'])
+                if grant['inherited_to_projects']:
+                    project_ids.update(
+                        project['id'] for project in
+                        PROVIDERS.resource_api.list_projects_in_subtree(
+                            grant['project_id']))
+        for kind, entity_ids in (('user', user_ids), ('project', project_ids),
+                                 ('domain', domain_ids)):
+            for entity_id in sorted(entity_ids):
+                notifications.invalidate_token_cache_notification(
+                    'Invalidating the token cache because role assignments '
+                    'were removed from or on %(kind)s %(id)s.' %
+                    {'kind': kind, 'id': entity_id},
+                    **{'%s_id' % kind: entity_id})
 
     # The methods _expand_indirect_assignment, _list_direct_role_assignments
     # and _list_effective_role_assignments below are only used on
@@ -400,7 +985,8 @@ class Manager(manager.Manager):
     # this case.
 
     def _expand_indirect_assignment(self, ref, user_id=None, project_id=None,
-                                    subtree_ids=None, expand_groups=True):
+                                    subtree_ids=None, expand_groups=True,
+                                    group_users=None):
         """Return a list of expanded role assignments.
 
         This methods is called for each discovered assignment that either needs
@@ -419,7 +1005,8 @@ class Manager(manager.Manager):
         were passed to this method.
 
         If expand_groups is True then we expand groups out to a list of
-        assignments, one for each member of that group.
+        assignments, one for each member of that group. The members are read
+        from group_users, a _GroupUsers instance, if given.
 
         """
         def create_group_assignment(base_ref, user_id):
@@ -474,10 +1061,15 @@ class Manager(manager.Manager):
             # Note(prashkre): Try to get the users in a group,
             # if a group wasn't found in the backend, users are set
             # as empty list.
-            try:
-                users = PROVIDERS.identity_api.list_users_in_group(
-                    ref['group_id'])
-            except exception.GroupNotFound:
+            if group_users is not None:
+                users = group_users.get(ref['group_id'])
+            else:
+                try:
+                    users = PROVIDERS.identity_api.list_users_in_group(
+                        ref['group_id'])
+                except exception.GroupNotFound:
+                    users = None
+            if users is None:
                 LOG.warning('Group %(group)s was not found but still has role '
                             'assignments.', {'group': ref['group_id']})
                 users = []
@@ -629,47 +1221,38 @@ class Manager(manager.Manager):
         in the indirect dict that is part of such a duplicated ref, so that a
         caller can determine where the assignment came from.
 
-        """
-        def _make_implied_ref_copy(prior_ref, implied_role_id):
-            # Create a ref for an implied role from the ref of a prior role,
-            # setting the new role_id to be the implied role and the indirect
-            # role_id to be the prior role
-            implied_ref = copy.deepcopy(prior_ref)
-            implied_ref['role_id'] = implied_role_id
-            indirect = implied_ref.setdefault('indirect', {})
-            indirect['role_id'] = prior_ref['role_id']
-            return implied_ref
+        The implied roles are read from the closure of the role inference
+        rules kept by the role manager, rather than from the backend.
 
+        """
         if not CONF.token.infer_roles:
             return role_refs
         try:
-            implied_roles_cache = {}
-            role_refs_to_check = list(role_refs)
-            ref_results = list(role_refs)
-            checked_role_refs = list()
-            while(role_refs_to_check):
-                next_ref = role_refs_to_check.pop()
-                checked_role_refs.append(next_ref)
-                next_role_id = next_ref['role_id']
-                if next_role_id in implied_roles_cache:
-                    implied_roles = implied_roles_cache[next_role_id]
-                else:
-                    implied_roles = (
-                        PROVIDERS.role_api.list_implied_roles(next_role_id))
-                    implied_roles_cache[next_role_id] = implied_roles
-                for implied_role in implied_roles:
-                    implied_ref = (
-                        _make_implied_ref_copy(
-                            next_ref, implied_role['implied_role_id']))
-                    if implied_ref in checked_role_refs:
-                        msg = ('Circular reference found '
-                               'role inference rules - %(prior_role_id)s.')
-                        LOG.error(msg, {'prior_role_id': next_ref['role_id']})
-                    else:
-                        ref_results.append(implied_ref)
-                        role_refs_to_check.append(implied_ref)
+            closure = PROVIDERS.role_api.get_implied_roles_closure()
         except exception.NotImplemented:
             LOG.error('Role driver does not support implied roles.')
+            return list(role_refs)
+
+        ref_results = list(role_refs)
+        if not closure:
+            return ref_results
+        # The same implied assignment may be reached from several prior
+        # roles assigned on the same target, so it is only added once.
+        seen_refs = set(_assignment_key(ref) for ref in role_refs)
+        for ref in role_refs:
+            for implied_role_id, prior_role_id in closure.get(
+                    ref['role_id'], ()):
+                # Create a ref for an implied role from the ref of a prior
+                # role, setting the new role_id to be the implied role and
+                # the indirect role_id to be the prior role. The other
+                # values of a ref are immutable, so they can be shared.
+                implied_ref = dict(ref, role_id=implied_role_id)
+                implied_ref['indirect'] = dict(ref.get('indirect', {}),
+                                               role_id=prior_role_id)
+                key = _assignment_key(implied_ref)
+                if key not in seen_refs:
+                    seen_refs.add(key)
+                    ref_results.append(implied_ref)
 
         return ref_results
 
@@ -689,8 +1272,14 @@ class Manager(manager.Manager):
         remove any assignments that include a domain role.
 
         """
+        roles = PROVIDERS.role_api.get_roles(
+            ref['role_id'] for ref in role_refs)
+
         def _role_is_global(role_id):
-            ref = PROVIDERS.role_api.get_role(role_id)
+            try:
+                ref = roles[role_id]
+            except KeyError:
+                raise exception.RoleNotFound(role_id=role_id)
             return (ref['domain_id'] is None)
 
         filter_results = []
@@ -705,6 +1294,23 @@ class Manager(manager.Manager):
                                          strip_domain_roles):
         """List role assignments in effective mode.
 
+        The assignments that could affect the result are listed with
+        :meth:`_list_effective_source_assignments`, then expanded with
+        :meth:`_expand_effective_assignments`.
+
+        """
+        refs = self._list_effective_source_assignments(
+            user_id, group_id, domain_id, project_id, subtree_ids, inherited,
+            source_from_group_ids)
+        return self._expand_effective_assignments(
+            refs, role_id, user_id, project_id, subtree_ids,
+            source_from_group_ids, strip_domain_roles)
+
+    def _list_effective_source_assignments(self, user_id, group_id,
+                                           domain_id, project_id, subtree_ids,
+                                           inherited, source_from_group_ids):
+        """List the assignments to expand in effective mode.
+
         When using effective mode, besides the direct assignments, the indirect
         ones that come from grouping or inheritance are retrieved and will then
         be expanded.
@@ -851,12 +1457,29 @@ class Manager(manager.Manager):
                     subtree_ids=subtree_ids, group_ids=group_ids,
                     domain_id=domain_id, inherited=inherited)
 
-        # Expand grouping and inheritance on retrieved role assignments
+        return direct_refs + group_refs
+
+    def _expand_effective_assignments(self, source_refs, role_id, user_id,
+                                      project_id, subtree_ids,
+                                      source_from_group_ids,
+                                      strip_domain_roles, group_users=None):
+        """Expand the assignments listed in effective mode.
+
+        Grouping and inheritance are expanded on the assignments, which are
+        then completed with the implied roles and filtered. Unless
+        group_users is given, the users of all the groups assigned are listed
+        at once.
+
+        """
         refs = []
         expand_groups = (source_from_group_ids is None)
-        for ref in (direct_refs + group_refs):
+        if group_users is None and expand_groups and not user_id:
+            group_users = _GroupUsers(
+                ref['group_id'] for ref in source_refs if 'group_id' in ref)
+        for ref in source_refs:
             refs += self._expand_indirect_assignment(
-                ref, user_id, project_id, subtree_ids, expand_groups)
+                ref, user_id, project_id, subtree_ids, expand_groups,
+                group_users)
 
         refs = self.add_implied_roles(refs)
         if strip_domain_roles:
@@ -975,12 +1598,7 @@ class Manager(manager.Manager):
         which is useful for internal calls like trusts which need to examine
         the full set of roles.
         """
-        subtree_ids = None
-        if project_id and include_subtree:
-            subtree_ids = (
-                [x['id'] for x in
-                    PROVIDERS.resource_api.list_projects_in_subtree(
-                        project_id)])
+        subtree_ids = self._get_subtree_ids(project_id, include_subtree)
 
         if system != 'all':
             system = None
@@ -999,22 +1617,161 @@ class Manager(manager.Manager):
             return self._get_names_from_role_assignments(role_assignments)
         return role_assignments
 
+    def _get_subtree_ids(self, project_id, include_subtree):
+        if project_id and include_subtree:
+            return [x['id'] for x in
+                    PROVIDERS.resource_api.list_projects_in_subtree(
+                        project_id)]
+        return None
+
+    def list_role_assignments_page(self, limit=None, marker=None,
+                                   role_id=None, user_id=None, group_id=None,
+                                   system=None, domain_id=None,
+                                   project_id=None, include_subtree=False,
+                                   inherited=None, effective=None,
+                                   include_names=False):
+        """List a page of role assignments, in a stable order.
+
+        This lists the same role assignments as :meth:`list_role_assignments`
+        with the same filters, sorted by actor, target and inheritance, then by
+        the rest of their attributes. The assignments matching the filters are
+        read from the backend at once, but their expansion in effective mode,
+        and the lookup of their names, only happen for the actors and targets
+        reached by the page.
+
+        :param limit: the maximum number of assignments in the page, which is
+                      capped by the list limit of the driver, and defaults to
+                      it
+        :param marker: the marker returned with the previous page, or None to
+                       list the first page
+        :returns: a tuple of the list of the assignments of the page, and of
+                  the marker of the next page, or None if this is the last
+                  page
+        :raises keystone.exception.ValidationError: if the marker is invalid,
+            or no limit is given nor configured
+
+        """
+        list_limit = self.driver._get_list_limit()
+        if list_limit and (limit is None or limit > list_limit):
+            limit = list_limit
+        if not limit:
+            raise exception.ValidationError(
+                message=_('A limit is required to list role assignments in '
+                          'pages.'))
+        if marker is not None:
+            marker = _decode_assignment_marker(marker)
+
+        subtree_ids = self._get_subtree_ids(project_id, include_subtree)
+        if system != 'all':
+            system = None
+
+        if effective:
+            source_refs = self._list_effective_source_assignments(
+                user_id, group_id, domain_id, project_id, subtree_ids,
+                inherited, None)
+            # The groups are expanded in the order of their IDs, so their
+            # users are listed for as many groups as the page could reach.
+            group_users = _GroupUsers(
+                sorted(ref['group_id'] for ref in source_refs
+                       if 'group_id' in ref),
+                batch_size=limit)
+
+            def expand(refs):
+                return self._expand_effective_assignments(
+                    refs, role_id, user_id, project_id, subtree_ids, None,
+                    True, group_users)
+        else:
+            source_refs = self._list_direct_role_assignments(
+                role_id, user_id, group_id, system, domain_id, project_id,
+                subtree_ids, inherited)
+            expand = list
+
+        # One more assignment than requested is listed, to tell whether there
+        # is a next page.
+        keyed_refs = list(itertools.islice(
+            self._iter_sorted_role_assignments(source_refs, expand, marker),
+            limit + 1))
+        next_marker = None
+        if len(keyed_refs) > limit:
+            keyed_refs = keyed_refs[:limit]
+            next_marker = _encode_assignment_marker(keyed_refs[-1][0])
+
+        role_assignments = [ref for key, ref in keyed_refs]
+        if include_names:
+            role_assignments = self._get_names_from_role_assignments(
+                role_assignments)
+        return role_assignments, next_marker
+
+    def _iter_sorted_role_assignments(self, source_refs, expand, marker=None):
+        """Expand role assignments lazily, in a stable order.
+
+        The assignments read from the backend are sorted, and expanded one
+        actor, target and inheritance at a time.
+
+        :param source_refs: the assignments read from the backend
+        :param expand: a function expanding a list of assignments sharing the
+                       same actor, target and inheritance
+        :param marker: the decoded marker of the last assignment already
+                       listed, if any
+        :returns: an iterator over ``(key, ref)`` tuples, where ``key`` is the
+                  position of each expanded assignment ``ref``, which can be
+                  used as a marker, after the marker given if any
+
+        """
+        source_refs = sorted(source_refs, key=_get_assignment_source_key)
+        if marker is not None:
+            source_refs = [ref for ref in source_refs
+                           if _get_assignment_source_key(ref) >= marker[0]]
+        for source_key, refs in itertools.groupby(
+                source_refs, key=_get_assignment_source_key):
+            keyed_refs = sorted(
+                (((source_key, jsonutils.dumps(ref, sort_keys=True)), ref)
+                 for ref in expand(list(refs))),
+                key=lambda keyed_ref: keyed_ref[0])
+            for key, ref in keyed_refs:
+                if marker is None or key > marker:
+                    yield key, ref
+
     def _get_names_from_role_assignments(self, role_assignments):
         role_assign_list = []
 
+        def _ids(key):
+            return set(role_asgmt[key] for role_asgmt in role_assignments
+                       if key in role_asgmt)
+
+        # Look up the entities referenced by the assignments all at once,
+        # rather than one at a time for each assignment.
+        users = PROVIDERS.identity_api.get_users(_ids('user_id'))
+        groups = PROVIDERS.identity_api.get_groups(_ids('group_id'))
+        projects = PROVIDERS.resource_api.get_projects(_ids('project_id'))
+        roles = PROVIDERS.role_api.get_roles(_ids('role_id'))
+        domain_ids = _ids('domain_id')
+        for ref in itertools.chain(users.values(), groups.values(),
+                                   projects.values(), roles.values()):
+            if ref.get('domain_id') is not None:
+                domain_ids.add(ref['domain_id'])
+        domains = PROVIDERS.resource_api.get_domains(domain_ids)
+
+        def _get_domain(domain_id):
+            try:
+                return domains[domain_id]
+            except KeyError:
+                raise exception.DomainNotFound(domain_id=domain_id)
+
         for role_asgmt in role_assignments:
-            new_assign = copy.deepcopy(role_asgmt)
+            # The names are only added next to the attributes of the
+            # assignment, so these are shared rather than copied.
+            new_assign = dict(role_asgmt)
             for key, value in role_asgmt.items():
                 if key == 'domain_id':
-                    _domain = PROVIDERS.resource_api.get_domain(value)
+                    _domain = _get_domain(value)
                     new_assign['domain_name'] = _domain['name']
                 elif key == 'user_id':
-                    try:
-                        # Note(knikolla): Try to get the user, otherwise
-                        # if the user wasn't found in the backend
-                        # use empty values.
-                        _user = PROVIDERS.identity_api.get_user(value)
-                    except exception.UserNotFound:
+                    # Note(knikolla): Try to get the user, otherwise
+                    # if the user wasn't found in the backend
+                    # use empty values.
+                    _user = users.get(value)
+                    if _user is None:
                         msg = ('User %(user)s not found in the'
                                ' backend but still has role assignments.')
                         LOG.warning(msg, {'user': value})
@@ -1025,15 +1782,13 @@ class Manager(manager.Manager):
                         new_assign['user_name'] = _user['name']
                         new_assign['user_domain_id'] = _user['domain_id']
                         new_assign['user_domain_name'] = (
-                            PROVIDERS.resource_api.get_domain(
-                                _user['domain_id'])['name'])
+                            _get_domain(_user['domain_id'])['name'])
                 elif key == 'group_id':
-                    try:
-                        # Note(knikolla): Try to get the group, otherwise
-                        # if the group wasn't found in the backend
-                        # use empty values.
-                        _group = PROVIDERS.identity_api.get_group(value)
-                    except exception.GroupNotFound:
+                    # Note(knikolla): Try to get the group, otherwise
+                    # if the group wasn't found in the backend
+                    # use empty values.
+                    _group = groups.get(value)
+                    if _group is None:
                         msg = ('Group %(group)s not found in the'
                                ' backend but still has role assignments.')
                         LOG.warning(msg, {'group': value})
@@ -1044,23 +1799,26 @@ class Manager(manager.Manager):
                         new_assign['group_name'] = _group['name']
                         new_assign['group_domain_id'] = _group['domain_id']
                         new_assign['group_domain_name'] = (
-                            PROVIDERS.resource_api.get_domain(
-                                _group['domain_id'])['name'])
+                            _get_domain(_group['domain_id'])['name'])
                 elif key == 'project_id':
-                    _project = PROVIDERS.resource_api.get_project(value)
+                    try:
+                        _project = projects[value]
+                    except KeyError:
+                        raise exception.ProjectNotFound(project_id=value)
                     new_assign['project_name'] = _project['name']
                     new_assign['project_domain_id'] = _project['domain_id']
                     new_assign['project_domain_name'] = (
-                        PROVIDERS.resource_api.get_domain(
-                            _project['domain_id'])['name'])
+                        _get_domain(_project['domain_id'])['name'])
                 elif key == 'role_id':
-                    _role = PROVIDERS.role_api.get_role(value)
+                    try:
+                        _role = roles[value]
+                    except KeyError:
+                        raise exception.RoleNotFound(role_id=value)
                     new_assign['role_name'] = _role['name']
                     if _role['domain_id'] is not None:
                         new_assign['role_domain_id'] = _role['domain_id']
                         new_assign['role_domain_name'] = (
-                            PROVIDERS.resource_api.get_domain(
-                                _role['domain_id'])['name'])
+                            _get_domain(_role['domain_id'])['name'])
             role_assign_list.append(new_assign)
         return role_assign_list
 
@@ -1075,6 +1833,11 @@ class Manager(manager.Manager):
         for assignment in system_assignments:
             self.delete_system_grant_for_group(group_id, assignment['id'])
 
+    def delete_project_assignments(self, project_id):
+        self.driver.delete_project_assignments(project_id)
+        self._delete_effective_assignments(target_type=self._PROJECT,
+                                           target_ids=[project_id])
+
     def delete_user_assignments(self, user_id):
         # FIXME(lbragstad): This should be refactored in the Rocky release so
         # that we can pass the user_id to the system assignment backend like we
@@ -1082,6 +1845,7 @@ class Manager(manager.Manager):
         # this because it will require an interface change to the backend,
         # making it harder to backport for Queens RC.
         self.driver.delete_user_assignments(user_id)
+        self._delete_effective_assignments(user_ids=[user_id])
         system_assignments = self.list_system_grants_for_user(user_id)
         for assignment in system_assignments:
             self.delete_system_grant_for_user(user_id, assignment['id'])
@@ -1142,6 +1906,7 @@ class Manager(manager.Manager):
         self.driver.create_system_grant(
             role_id, user_id, target_id, assignment_type, inherited
         )
+        invalidate_computed_assignments(user_ids=[user_id])
 
     def delete_system_grant_for_user(self, user_id, role_id):
         """Remove a system grant from a user.
@@ -1157,6 +1922,7 @@ class Manager(manager.Manager):
         target_id = self._SYSTEM_SCOPE_TOKEN
         inherited = False
         self.driver.delete_system_grant(role_id, user_id, target_id, inherited)
+        invalidate_computed_assignments(user_ids=[user_id])
 
     def check_system_grant_for_group(self, group_id, role_id):
         """Check if a group has a specific role on the system.
@@ -1214,6 +1980,7 @@ class Manager(manager.Manager):
         self.driver.create_system_grant(
             role_id, group_id, target_id, assignment_type, inherited
         )
+        self._invalidate_computed_assignments_for_actors(group_ids=[group_id])
 
     def delete_system_grant_for_group(self, group_id, role_id):
         """Remove a system grant from a group.
@@ -1231,6 +1998,7 @@ class Manager(manager.Manager):
         self.driver.delete_system_grant(
             role_id, group_id, target_id, inherited
         )
+        self._invalidate_computed_assignments_for_actors(group_ids=[group_id])
 
     def list_all_system_grants(self):
         """Return a list of all system grants."""
@@ -1264,11 +2032,86 @@ class RoleManager(manager.Manager):
             role_driver = assignment_manager_obj.default_role_driver()
 
         super(RoleManager, self).__init__(role_driver)
+        # The closure of the role inference rules, with the generation it
+        # was computed at.
+        self._implied_roles_closure = None
 
+    @MEMOIZE_NOT_FOUND
     @MEMOIZE
     def get_role(self, role_id):
         return self.driver.get_role(role_id)
 
+    def get_roles(self, role_ids):
+        """Get several roles at once.
+
+        This reads and fills the same cache entries as :meth:`get_role`, and
+        reads the roles missing from the cache with a single driver call.
+
+        :param role_ids: an iterable of role IDs
+        :returns: a dictionary mapping the ID of each role found to the role,
+                  roles that don't exist are omitted
+
+        """
+        def fetch(missed_ids):
+            refs = self.driver.list_roles_from_ids(missed_ids)
+            return dict((ref['id'], ref) for ref in refs)
+
+        return cache.get_memoized_by_ids(cache.CACHE_REGION, MEMOIZE,
+                                         self.get_role, self, role_ids, fetch)
+
+    def warm_cache(self, budget):
+        """Load the roles into the cache, within a cache warm-up budget.
+
+        :param budget: a :class:`keystone.common.cache._warm.Budget`
+        :returns: the number of roles loaded
+
+        """
+        refs = budget.take(self.driver.list_roles(budget.hints()))
+        cache.set_memoized_multi(cache.CACHE_REGION, MEMOIZE, self.get_role,
+                                 [(self, ref['id']) for ref in refs], refs)
+        return len(refs)
+
+    def _get_implied_roles_generation(self):
+        if CONF.cache.enabled and CONF.role.caching:
+            return cache.get_generations(COMPUTED_ASSIGNMENTS_REGION,
+                                         [IMPLIED_ROLES_GENERATION])[0]
+
+    def get_implied_roles_closure(self):
+        """Return all the roles each prior role implies, directly or not.
+
+        The closure is computed from a single listing of the role inference
+        rules, and kept by the manager until they change. When caching is
+        enabled, it is checked against a generation in the computed
+        assignments region, which is renewed whenever the region is
+        invalidated, so that changes made by other processes are seen too.
+        Otherwise, it is computed on each call.
+
+        :returns: a dictionary mapping the ID of each prior role to a tuple of
+                  ``(implied_role_id, prior_role_id)`` pairs, where
+                  ``prior_role_id`` is the role which directly implies
+                  ``implied_role_id``
+        :raises keystone.exception.NotImplemented: If the role driver does
+            not support implied roles.
+
+        """
+        # The generation is read before the rules, so that the closure is
+        # never older than the generation it is kept with.
+        generation = self._get_implied_roles_generation()
+        cached = self._implied_roles_closure
+        if generation is not None and cached and cached[0] == generation:
+            return cached[1]
+        closure = _compute_implied_roles_closure(
+            self.driver.list_role_inference_rules())
+        if generation is not None:
+            self._implied_roles_closure = (generation, closure)
+        return closure
+
+    def _invalidate_implied_roles_closure(self):
+        self._implied_roles_closure = None
+        # Changing the rules may affect the effective assignments of anyone.
+        PROVIDERS.assignment_api.refresh_effective_assignments()
+        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+
     def get_unique_role_by_name(self, role_name, hints=None):
         if not hints:
             hints = driver_hints.Hints()
@@ -1307,7 +2150,19 @@ class RoleManager(manager.Manager):
         self.get_role.invalidate(self, role_id)
         return ret
 
+    def _has_inference_rules(self, role_id):
+        try:
+            closure = self.get_implied_roles_closure()
+        except exception.NotImplemented:
+            return False
+        return role_id in closure or any(
+            implied_role_id == role_id
+            for pairs in closure.values() for implied_role_id, _ in pairs)
+
     def delete_role(self, role_id, initiator=None):
+        has_inference_rules = (
+            CONF.assignment.materialize_effective_assignments and
+            self._has_inference_rules(role_id))
         PROVIDERS.assignment_api.delete_role_assignments(role_id)
         PROVIDERS.assignment_api._send_app_cred_notification_for_role_removal(
             role_id
@@ -1322,7 +2177,14 @@ class RoleManager(manager.Manager):
             'a token' % {'role_id': role_id}
         )
         notifications.invalidate_token_cache_notification(reason)
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        # Deleting a role deletes the rules implying it or from it too.
+        if has_inference_rules:
+            self._invalidate_implied_roles_closure()
+        else:
+            self._implied_roles_closure = None
+            PROVIDERS.assignment_api._delete_effective_assignments(
+                role_ids=[role_id])
+            COMPUTED_ASSIGNMENTS_REGION.invalidate()
 
     # TODO(ayoung): Add notification
     def create_implied_role(self, prior_role_id, implied_role_id):
@@ -1336,9 +2198,9 @@ class RoleManager(manager.Manager):
                                                role_id=implied_role_id)
         response = self.driver.create_implied_role(
             prior_role_id, implied_role_id)
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        self._invalidate_implied_roles_closure()
         return response
 
     def delete_implied_role(self, prior_role_id, implied_role_id):
         self.driver.delete_implied_role(prior_role_id, implied_role_id)
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        self._invalidate_implied_roles_closure()
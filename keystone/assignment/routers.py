@@ -219,6 +219,8 @@ class Routers(wsgi.RoutersBase):
             mapper, controllers.RoleAssignmentV3(),
             path='/role_assignments',
             get_head_action='list_role_assignments_wrapper',
+            put_action='create_role_assignments',
+            delete_action='delete_role_assignments',
             rel=json_home.build_v3_resource_relation('role_assignments'))
 
         self._add_resource(
@@ -31,3 +31,54 @@ role_update = {
     'minProperties': 1,
     'additionalProperties': True
 }
+
+_entity_reference = {
+    'type': 'object',
+    'properties': {
+        'id': parameter_types.id_string
+    },
+    'required': ['id'],
+    'additionalProperties': True
+}
+
+_role_assignment_scope = {
+    'type': 'object',
+    'properties': {
+        'project': _entity_reference,
+        'domain': _entity_reference,
+        'OS-INHERIT:inherited_to': {
+            'type': 'string',
+            'enum': ['projects']
+        }
+    },
+    'oneOf': [
+        {'required': ['project']},
+        {'required': ['domain']}
+    ],
+    'additionalProperties': False
+}
+
+_role_assignment = {
+    'type': 'object',
+    'properties': {
+        'role': _entity_reference,
+        'user': _entity_reference,
+        'group': _entity_reference,
+        'scope': _role_assignment_scope,
+        'links': {
+            'type': 'object'
+        }
+    },
+    'required': ['role', 'scope'],
+    'oneOf': [
+        {'required': ['user']},
+        {'required': ['group']}
+    ],
+    'additionalProperties': False
+}
+
+role_assignments_bulk = {
+    'type': 'array',
+    'items': _role_assignment,
+    'minItems': 1
+}
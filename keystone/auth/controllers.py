@@ -19,6 +19,7 @@ from keystone.auth import core
 from keystone.auth import schema
 from keystone.common import authorization
 from keystone.common import controller
+from keystone.common.policies import base as pol_base
 from keystone.common import provider_api
 from keystone.common import wsgi
 import keystone.conf
@@ -265,14 +266,14 @@ class Auth(controller.V3Controller):
         include_catalog = 'nocatalog' not in request.params
         token = PROVIDERS.token_provider_api.validate_token(
             token_id, window_seconds=window_seconds)
-        token_reference = controller.render_token_response_from_model(
-            token, include_catalog=include_catalog
-        )
+        token_reference, token_json = (
+            PROVIDERS.token_provider_api.render_token_response(
+                token, include_catalog=include_catalog))
         # NOTE(morganfainberg): The code in
         # ``keystone.common.wsgi.render_response`` will remove the content
         # body.
 
-        return render_token_data_response(token.id, token_reference)
+        return render_token_data_response(token.id, token_json)
 
     @controller.protected()
     def revoke_token(self, request):
@@ -286,11 +287,75 @@ class Auth(controller.V3Controller):
 
         token = PROVIDERS.token_provider_api.validate_token(
             token_id, window_seconds=window_seconds)
-        token_reference = controller.render_token_response_from_model(
-            token, include_catalog=include_catalog
-        )
+        token_reference, token_json = (
+            PROVIDERS.token_provider_api.render_token_response(
+                token, include_catalog=include_catalog))
+
+        return render_token_data_response(token.id, token_json)
+
+    def _check_validate_token_policy(self, request, token=None):
+        target_attr = None
+        if token is not None:
+            target_attr = {'token': {'user_id': token.user_id}}
+        authorization.check_policy(
+            self, request, pol_base.IDENTITY % 'validate_token',
+            target_attr=target_attr)
+
+    def validate_tokens(self, request, tokens=None):
+        """Validate a batch of tokens.
+
+        Each token is authorized with the same policy as validating it alone.
+        Tokens that are invalid, or that the caller isn't allowed to validate,
+        are reported as not found.
+
+        """
+        request.assert_authenticated()
+        schema.validate_token_batch(tokens)
+        if len(tokens) > CONF.token.validate_batch_size:
+            msg = _('Cannot validate more than %d tokens at once.')
+            raise exception.ValidationError(
+                msg % CONF.token.validate_batch_size)
+
+        # Service users and administrators are allowed to validate any token,
+        # so the policy only needs to be enforced for each token when the
+        # caller may only validate their own tokens.
+        try:
+            self._check_validate_token_policy(request)
+            check_each_token = False
+        except exception.ForbiddenAction:
+            check_each_token = True
 
-        return render_token_data_response(token.id, token_reference)
+        window_seconds = authorization.token_validation_window(request)
+        include_catalog = 'nocatalog' not in request.params
+        results = PROVIDERS.token_provider_api.validate_tokens(
+            tokens, window_seconds=window_seconds)
+
+        token_refs = []
+        for token_id in tokens:
+            token = results.get(token_id)
+            if token is not None and not isinstance(token, exception.Error):
+                try:
+                    if check_each_token:
+                        self._check_validate_token_policy(request, token=token)
+                    token_reference = (
+                        PROVIDERS.token_provider_api.render_token_reference(
+                            token, include_catalog=include_catalog))
+                except (exception.Forbidden, exception.NotFound) as e:
+                    LOG.debug('Unable to validate token: %s', e)
+                else:
+                    token_refs.append({'id': token_id,
+                                       'valid': True,
+                                       'token': token_reference['token']})
+                    continue
+
+            error = exception.TokenNotFound(token_id=token_id)
+            token_refs.append({'id': token_id,
+                               'valid': False,
+                               'error': {'code': error.code,
+                                         'title': error.title,
+                                         'message': six.text_type(error)}})
+
+        return wsgi.render_response(body={'tokens': token_refs})
 
     def revocation_list(self, request):
         if not CONF.token.revoke_by_id:
@@ -107,6 +107,24 @@ token_issue = {
 }
 
 
+token_validate_batch = {
+    'type': 'array',
+    'items': {
+        'type': 'string',
+        'minLength': 1,
+    },
+    'minItems': 1,
+}
+
+
+def validate_token_batch(tokens=None):
+    if tokens is None:
+        msg = _('Invalid input for field tokens: a list of token IDs must '
+                'be present.')
+        raise exception.SchemaValidationError(detail=msg)
+    validation.lazy_validate(token_validate_batch, tokens)
+
+
 def validate_issue_token_auth(auth=None):
     if auth is None:
         return
@@ -36,7 +36,8 @@ MEMOIZE = cache.get_memoization_decorator(group='catalog')
 # computed for a given user + project pair. Any write operation to create,
 # modify or delete elements of the service catalog should invalidate this
 # entire cache region.
-COMPUTED_CATALOG_REGION = cache.create_region(name='computed catalog region')
+COMPUTED_CATALOG_REGION = cache.create_region(name='computed catalog region',
+                                              serve_stale=True)
 MEMOIZE_COMPUTED_CATALOG = cache.get_memoization_decorator(
     group='catalog',
     region=COMPUTED_CATALOG_REGION)
@@ -211,6 +212,47 @@ class Manager(manager.Manager):
         except exception.NotFound:
             raise exception.EndpointNotFound(endpoint_id=endpoint_id)
 
+    def get_endpoints(self, endpoint_ids):
+        """Get several endpoints at once.
+
+        This reads and fills the same cache entries as :meth:`get_endpoint`.
+        Endpoints missing from the cache are read by listing all endpoints
+        once, since catalog drivers can't read several given endpoints.
+
+        :param endpoint_ids: an iterable of endpoint IDs
+        :returns: a dictionary mapping the ID of each endpoint found to the
+                  endpoint, endpoints that don't exist are omitted
+
+        """
+        def fetch(missed_ids):
+            refs = self.driver.list_endpoints(driver_hints.Hints())
+            return dict((ref['id'], ref) for ref in refs)
+
+        return cache.get_memoized_by_ids(cache.CACHE_REGION, MEMOIZE,
+                                         self.get_endpoint, self,
+                                         endpoint_ids, fetch)
+
+    def warm_cache(self, budget):
+        """Load the catalog into the cache, within a cache warm-up budget.
+
+        The regions, services and endpoints are each listed with a single
+        driver call.
+
+        :param budget: a :class:`keystone.common.cache._warm.Budget`
+        :returns: the number of regions, services and endpoints loaded
+
+        """
+        loaded = 0
+        for list_refs, get_ref in [
+                (self.driver.list_regions, self.get_region),
+                (self.driver.list_services, self.get_service),
+                (self.driver.list_endpoints, self.get_endpoint)]:
+            refs = budget.take(list_refs(budget.hints()))
+            cache.set_memoized_multi(cache.CACHE_REGION, MEMOIZE, get_ref,
+                                     [(self, ref['id']) for ref in refs], refs)
+            loaded += len(refs)
+        return loaded
+
     @manager.response_truncated
     def list_endpoints(self, hints=None):
         return self.driver.list_endpoints(hints or driver_hints.Hints())
@@ -226,6 +268,15 @@ class Manager(manager.Manager):
     def get_v3_catalog(self, user_id, project_id):
         return self.driver.get_v3_catalog(user_id, project_id)
 
+    def get_catalog_generation(self):
+        """Return the generation of the computed service catalogs.
+
+        The generation is renewed whenever the computed catalogs are
+        invalidated, so that data derived from them can be discarded too.
+
+        """
+        return cache.get_generations(COMPUTED_CATALOG_REGION, ['catalog'])[0]
+
     def add_endpoint_to_project(self, endpoint_id, project_id):
         self.driver.add_endpoint_to_project(endpoint_id, project_id)
         COMPUTED_CATALOG_REGION.invalidate()
@@ -289,12 +340,10 @@ class Manager(manager.Manager):
 
         """
         refs = self.driver.list_endpoints_for_project(project_id)
-        filtered_endpoints = {}
+        filtered_endpoints = self.get_endpoints(
+            ref['endpoint_id'] for ref in refs)
         for ref in refs:
-            try:
-                endpoint = self.get_endpoint(ref['endpoint_id'])
-                filtered_endpoints.update({ref['endpoint_id']: endpoint})
-            except exception.EndpointNotFound:
+            if ref['endpoint_id'] not in filtered_endpoints:
                 # remove bad reference from association
                 self.remove_endpoint_from_project(ref['endpoint_id'],
                                                   project_id)
@@ -28,6 +28,7 @@ import pbr.version
 
 from keystone.cmd import bootstrap
 from keystone.cmd import doctor
+from keystone.common import cache
 from keystone.common import driver_hints
 from keystone.common import fernet_utils
 from keystone.common import sql
@@ -676,6 +677,97 @@ class TokenFlush(BaseApp):
         )
 
 
+class RevocationPrune(BaseApp):
+    """Prune expired revocation events from the backend."""
+
+    name = 'revocation_prune'
+
+    @classmethod
+    def add_argument_parser(cls, subparsers):
+        parser = super(RevocationPrune, cls).add_argument_parser(subparsers)
+        parser.add_argument('--batch-size', default=None, type=int,
+                            help=('Maximum number of events deleted in a '
+                                  'single transaction. Defaults to the '
+                                  '[revoke] prune_batch_size option.'))
+        return parser
+
+    @staticmethod
+    def main():
+        batch_size = CONF.command.batch_size
+        if batch_size is not None and batch_size < 1:
+            raise ValueError(_('--batch-size must be a positive integer'))
+
+        drivers = backends.load_backends()
+        pruned, elapsed = drivers['revoke_api'].prune_expired_events(
+            batch_size=batch_size)
+        print(_('Pruned %(pruned)d expired revocation events in '
+                '%(elapsed).3f seconds.') % {'pruned': pruned,
+                                             'elapsed': elapsed})
+
+
+class CacheWarm(BaseApp):
+    """Load the entities validating tokens requires into the cache."""
+
+    name = 'cache_warm'
+
+    @classmethod
+    def add_argument_parser(cls, subparsers):
+        parser = super(CacheWarm, cls).add_argument_parser(subparsers)
+        parser.add_argument('--max-time', default=None, type=int,
+                            help=('Number of seconds after which no more '
+                                  'entities are loaded, 0 for no limit. '
+                                  'Defaults to the [DEFAULT] '
+                                  'cache_warm_max_time option.'))
+        parser.add_argument('--max-entries', default=None, type=int,
+                            help=('Maximum number of cache entries loaded, 0 '
+                                  'for no limit. Defaults to the [DEFAULT] '
+                                  'cache_warm_max_entries option.'))
+        return parser
+
+    @staticmethod
+    def main():
+        max_time = CONF.command.max_time
+        if max_time is None:
+            max_time = CONF.cache_warm_max_time
+        max_entries = CONF.command.max_entries
+        if max_entries is None:
+            max_entries = CONF.cache_warm_max_entries
+        if max_time < 0 or max_entries < 0:
+            raise ValueError(_('--max-time and --max-entries must not be '
+                               'negative'))
+        if not CONF.cache.enabled:
+            print(_('Caching is disabled, see the [cache] enabled option.'))
+            return False
+
+        backends.load_backends()
+        report = cache.warm(max_time=max_time or None,
+                            max_entries=max_entries or None)
+        for name, loaded in sorted(report['loaded'].items()):
+            print(_('Loaded %(loaded)d cache entries for %(name)s.') % {
+                'loaded': loaded, 'name': name})
+        for name in report['skipped']:
+            print(_('Skipped %s.') % name)
+        for name in report['failed']:
+            print(_('Failed to load %s, see the logs.') % name)
+        print(_('Warmed up the cache in %.3f seconds.') % report['elapsed'])
+
+
+class EffectiveAssignmentsRebuild(BaseApp):
+    """Rebuild the table of effective role assignments."""
+
+    name = 'effective_assignments_rebuild'
+
+    @staticmethod
+    def main():
+        drivers = backends.load_backends()
+        count = drivers['assignment_api'].rebuild_effective_assignments()
+        print(_('Stored %d effective role assignments.') % count)
+        if not CONF.assignment.materialize_effective_assignments:
+            print(_('The table is only kept up to date when the '
+                    '[assignment] materialize_effective_assignments option '
+                    'is enabled.'))
+
+
 class MappingPurge(BaseApp):
     """Purge the mapping table."""
 
@@ -1143,6 +1235,7 @@ class MappingPopulate(BaseApp):
 
 CMDS = [
     BootStrap,
+    CacheWarm,
     CredentialMigrate,
     CredentialRotate,
     CredentialSetup,
@@ -1150,11 +1243,13 @@ CMDS = [
     DbVersion,
     Doctor,
     DomainConfigUpload,
+    EffectiveAssignmentsRebuild,
     FernetRotate,
     FernetSetup,
     MappingPopulate,
     MappingPurge,
     MappingEngineTester,
+    RevocationPrune,
     SamlIdentityProviderMetadata,
     TokenFlush,
     TokenRotate,
@@ -15,65 +15,199 @@ from dogpile.cache import api
 from dogpile.cache import proxy
 from oslo_context import context as oslo_context
 from oslo_serialization import msgpackutils
+import six
 
 
 # Register our new handler.
 _registry = msgpackutils.default_registry
 
+# The models registered with a handler, which are cached as is.
+_MODEL_TYPES = ()
+
 
 def _register_model_handler(handler_class):
-    """Register a new model handler."""
+    """Register a new model handler.
+
+    The instances of the models it handles are considered read only once
+    cached, so the request local cache holds them as is.
+
+    """
+    global _MODEL_TYPES
     _registry.frozen = False
     _registry.register(handler_class(registry=_registry))
     _registry.frozen = True
+    _MODEL_TYPES += tuple(handler_class.handles)
+
+
+_IMMUTABLE_TYPES = six.string_types + six.integer_types + (
+    six.binary_type, bool, float, type(None))
+
+
+def _is_immutable(value):
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return True
+    if isinstance(value, (tuple, frozenset)):
+        return all(_is_immutable(v) for v in value)
+    return False
+
+
+def _copy_as_is(value):
+    return value
+
+
+def _get_copier(value):
+    """Return a function copying the mutable containers of a value.
+
+    The function is built once for a cached value, following its shape, so
+    that reading the value only copies its containers, sharing the immutable
+    values they hold.
+
+    :returns: a function taking the value and returning its copy, or None if
+              the value isn't only made of dictionaries, lists, tuples and
+              sets of immutable values
+
+    """
+    if _is_immutable(value):
+        return _copy_as_is
+    if isinstance(value, dict):
+        nested = []
+        for k, v in value.items():
+            copier = _get_copier(v)
+            if copier is None or not isinstance(k, _IMMUTABLE_TYPES):
+                return None
+            if copier is not _copy_as_is:
+                nested.append((k, copier))
+        if not nested:
+            return dict.copy
+
+        def copy_dict(d):
+            copied = d.copy()
+            for k, copier in nested:
+                copied[k] = copier(d[k])
+            return copied
+        return copy_dict
+    if isinstance(value, (list, tuple)):
+        copiers = [_get_copier(v) for v in value]
+        if None in copiers:
+            return None
+        cls = type(value)
+        if all(copier is _copy_as_is for copier in copiers):
+            return cls
+
+        def copy_sequence(items):
+            return cls([copier(v) for copier, v in zip(copiers, items)])
+        return copy_sequence
+    if isinstance(value, set) and _is_immutable(tuple(value)):
+        return set
+    return None
+
+
+class _LocalValue(object):
+    """A cached value held in the request local cache.
+
+    Immutable payloads, and models such as tokens, which are read only once
+    cached, are held as is and returned without any copy. Payloads made of
+    dictionaries, lists and sets of immutable values, such as entities, are
+    copied on every read, so that callers modifying the values they are
+    returned can't alter the cached ones. Other payloads are serialized once
+    and deserialized on every read.
+
+    """
+
+    __slots__ = ('payload', 'copier', 'metadata')
+
+    def __init__(self, value):
+        payload = value.payload
+        if isinstance(payload, _MODEL_TYPES):
+            self.copier = _copy_as_is
+        else:
+            self.copier = _get_copier(payload)
+        if self.copier is None:
+            payload = msgpackutils.dumps(payload, registry=_registry)
+        else:
+            payload = self.copier(payload)
+        self.payload = payload
+        self.metadata = value.metadata
+
+    def get(self):
+        if self.copier is None:
+            payload = msgpackutils.loads(self.payload, registry=_registry)
+        else:
+            payload = self.copier(self.payload)
+        return api.CachedValue(payload=payload, metadata=self.metadata)
+
+
+def get_request_stats():
+    """Return the request local cache statistics of the current request.
+
+    :returns: a dictionary with the number of values read from the request
+              local cache (``local``), read from the cache backend
+              (``backend``) and found in neither (``miss``)
+
+    """
+    ctx = oslo_context.get_current()
+    stats = getattr(ctx, _ResponseCacheProxy.STATS_ATTRIBUTE, None)
+    return dict(stats or _new_stats())
+
+
+def _new_stats():
+    return {'local': 0, 'backend': 0, 'miss': 0}
 
 
 class _ResponseCacheProxy(proxy.ProxyBackend):
 
-    __key_pfx = '_request_cache_%s'
+    CACHE_ATTRIBUTE = '_keystone_request_cache'
+    STATS_ATTRIBUTE = '_keystone_request_cache_stats'
 
     def _get_request_context(self):
         # Return the current context or a new/empty context.
         return oslo_context.get_current() or oslo_context.RequestContext()
 
-    def _get_request_key(self, key):
-        return self.__key_pfx % key
+    def _get_request_cache(self, ctx=None):
+        ctx = ctx or self._get_request_context()
+        try:
+            return getattr(ctx, self.CACHE_ATTRIBUTE)
+        except AttributeError:
+            request_cache = {}
+            setattr(ctx, self.CACHE_ATTRIBUTE, request_cache)
+            return request_cache
 
-    def _set_local_cache(self, key, value):
-        # Set a serialized version of the returned value in local cache for
-        # subsequent calls to the memoized method.
+    def _count(self, counter, count=1):
         ctx = self._get_request_context()
-        serialize = {'payload': value.payload, 'metadata': value.metadata}
-        setattr(ctx, self._get_request_key(key), msgpackutils.dumps(serialize))
+        try:
+            stats = getattr(ctx, self.STATS_ATTRIBUTE)
+        except AttributeError:
+            stats = _new_stats()
+            setattr(ctx, self.STATS_ATTRIBUTE, stats)
+        stats[counter] += count
+
+    def _set_local_cache(self, key, value):
+        # Keep the value in the local request cache for subsequent calls to
+        # the memoized method.
+        self._get_request_cache()[key] = _LocalValue(value)
 
     def _get_local_cache(self, key):
         # Return the version from our local request cache if it exists.
-        ctx = self._get_request_context()
-        try:
-            value = getattr(ctx, self._get_request_key(key))
-        except AttributeError:
+        local_value = self._get_request_cache().get(key)
+        if local_value is None:
             return api.NO_VALUE
-
-        value = msgpackutils.loads(value)
-        return api.CachedValue(payload=value['payload'],
-                               metadata=value['metadata'])
+        return local_value.get()
 
     def _delete_local_cache(self, key):
         # On invalidate/delete remove the value from the local request cache
-        ctx = self._get_request_context()
-        try:
-            delattr(ctx, self._get_request_key(key))
-        except AttributeError:  # nosec
-            # NOTE(morganfainberg): We will simply pass here, this value has
-            # not been cached locally in the request.
-            pass
+        self._get_request_cache().pop(key, None)
 
     def get(self, key):
         value = self._get_local_cache(key)
+        if value is not api.NO_VALUE:
+            self._count('local')
+            return value
+        value = self.proxied.get(key)
         if value is api.NO_VALUE:
-            value = self.proxied.get(key)
-            if value is not api.NO_VALUE:
-                self._set_local_cache(key, value)
+            self._count('miss')
+        else:
+            self._count('backend')
+            self._set_local_cache(key, value)
         return value
 
     def set(self, key, value):
@@ -90,9 +224,16 @@ class _ResponseCacheProxy(proxy.ProxyBackend):
             v = self._get_local_cache(key)
             if v is not api.NO_VALUE:
                 values[key] = v
-        query_keys = set(keys).difference(set(values.keys()))
-        values.update(dict(
-            zip(query_keys, self.proxied.get_multi(query_keys))))
+        self._count('local', len(values))
+        query_keys = list(set(keys).difference(set(values.keys())))
+        if query_keys:
+            for key, v in zip(query_keys, self.proxied.get_multi(query_keys)):
+                if v is api.NO_VALUE:
+                    self._count('miss')
+                else:
+                    self._count('backend')
+                    self._set_local_cache(key, v)
+                values[key] = v
         return [values[k] for k in keys]
 
     def set_multi(self, mapping):
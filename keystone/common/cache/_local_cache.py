@@ -0,0 +1,188 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""A per-process cache in front of the cache backend for memoized functions.
+
+Each configuration group with ``local_cache_size`` and ``local_cache_time``
+options gets its own bounded cache, shared by all the functions memoized for
+that group. Entries are keyed by the same mangled key as in the cache backend,
+which includes the current region ID, so invalidating a region, even from
+another process, makes them unreachable right away. Deleting a single key from
+another process is only seen once the local entry expires.
+"""
+
+import collections
+import functools
+import threading
+import time
+
+from dogpile.cache import api
+from oslo_config import cfg
+from oslo_serialization import msgpackutils
+
+from keystone.common.cache import _context_cache
+from keystone.common.cache import _metrics
+import keystone.conf
+
+
+CONF = keystone.conf.CONF
+
+
+class LRUCache(object):
+    """A thread-safe least recently used cache with expiring entries."""
+
+    def __init__(self):
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            try:
+                expires_at, value = self._entries.pop(key)
+            except KeyError:
+                return api.NO_VALUE
+            if expires_at <= time.time():
+                return api.NO_VALUE
+            # Reinserting the entry marks it as the most recently used.
+            self._entries[key] = (expires_at, value)
+            return value
+
+    def set(self, key, value, size, ttl):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + ttl, value)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(group):
+    """Return the local cache of a configuration group."""
+    with _caches_lock:
+        if group not in _caches:
+            _caches[group] = LRUCache()
+        return _caches[group]
+
+
+def clear():
+    """Empty the local caches of every configuration group."""
+    with _caches_lock:
+        for local_cache in _caches.values():
+            local_cache.clear()
+
+
+def _get_settings(group):
+    """Return the size and TTL of a group's local cache, if enabled."""
+    if not CONF.cache.enabled:
+        return None
+    conf_group = getattr(CONF, group)
+    try:
+        if not (conf_group.caching and conf_group.local_cache_size):
+            return None
+        return conf_group.local_cache_size, conf_group.local_cache_time
+    except cfg.NoSuchOptError:
+        return None
+
+
+def _dumps(value):
+    # Values are stored serialized, so that callers modifying the values they
+    # are returned can't alter the cached ones.
+    return msgpackutils.dumps(value, registry=_context_cache._registry)
+
+
+def _loads(data):
+    return msgpackutils.loads(data, registry=_context_cache._registry)
+
+
+def memoize(memoize_decorator, region, group):
+    """Add a local cache to a memoization decorator.
+
+    :param memoize_decorator: a memoization decorator, as returned by
+        :func:`oslo_cache.core.get_memoization_decorator`
+    :param region: the region ``memoize_decorator`` caches in
+    :param group: the configuration group ``memoize_decorator`` was created
+        for, whose ``local_cache_size`` and ``local_cache_time`` options
+        control the local cache
+    :returns: a memoization decorator, with the same interface as
+              ``memoize_decorator``
+
+    """
+    def decorator(fn):
+        memoized = memoize_decorator(fn)
+        key_generator = region.function_key_generator(None, fn)
+        name = _metrics.function_name(region, fn)
+
+        def local_key(*args, **kwargs):
+            key = key_generator(*args, **kwargs)
+            if region.key_mangler:
+                key = region.key_mangler(key)
+            return key
+
+        def discard(*args, **kwargs):
+            if _get_settings(group):
+                get_cache(group).delete(local_key(*args, **kwargs))
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            settings = _get_settings(group)
+            if not settings:
+                return memoized(*args, **kwargs)
+
+            local_cache = get_cache(group)
+            key = local_key(*args, **kwargs)
+            data = local_cache.get(key)
+            if data is not api.NO_VALUE:
+                _metrics.record_function(name, local_hits=1)
+                return _loads(data)
+
+            value = memoized(*args, **kwargs)
+            if memoize_decorator.should_cache(value):
+                size, ttl = settings
+                local_cache.set(key, _dumps(value), size, ttl)
+            return value
+
+        def invalidate(*args, **kwargs):
+            discard(*args, **kwargs)
+            memoized.invalidate(*args, **kwargs)
+
+        def set_(value, *args, **kwargs):
+            discard(*args, **kwargs)
+            memoized.set(value, *args, **kwargs)
+
+        def refresh(*args, **kwargs):
+            discard(*args, **kwargs)
+            return memoized.refresh(*args, **kwargs)
+
+        wrapper.invalidate = invalidate
+        wrapper.set = set_
+        wrapper.get = memoized.get
+        wrapper.refresh = refresh
+        wrapper.original = fn
+        return wrapper
+
+    decorator.should_cache = memoize_decorator.should_cache
+    decorator.get_expiration_time = memoize_decorator.get_expiration_time
+    return decorator
@@ -0,0 +1,278 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Metrics about the use of the cache regions and memoized functions.
+
+Metrics are collected per process when the `[DEFAULT] cache_metrics` option
+is enabled. For each region, they count the reads from the cache backend and
+their outcome, the writes and the size of the values written, the deletions
+and the invalidations of the whole region, along with the time spent in the
+cache backend. For each memoized function, they count the calls, the values
+found in the per-process cache, and the values that had to be computed.
+"""
+
+import collections
+import datetime
+import functools
+import threading
+import time
+
+from dogpile.cache import api
+from dogpile.cache import proxy
+from oslo_log import log
+from six.moves import cPickle as pickle
+
+from keystone.common import utils
+import keystone.conf
+
+
+CONF = keystone.conf.CONF
+LOG = log.getLogger(__name__)
+
+_lock = threading.Lock()
+_regions = collections.defaultdict(lambda: collections.defaultdict(int))
+_functions = collections.defaultdict(lambda: collections.defaultdict(int))
+_started_at = time.time()
+_last_logged_at = time.time()
+# The memoized functions being called in each thread, innermost last.
+_calls = threading.local()
+
+
+def _enabled():
+    return CONF.cache_metrics
+
+
+def _record(metrics, name, counts):
+    with _lock:
+        for counter, count in counts.items():
+            metrics[name][counter] += count
+    _maybe_log()
+
+
+def record_region(region_name, **counts):
+    """Add to the metrics of a cache region, if enabled."""
+    if _enabled():
+        _record(_regions, region_name, counts)
+
+
+def record_function(function_name, **counts):
+    """Add to the metrics of a memoized function, if enabled."""
+    if _enabled():
+        _record(_functions, function_name, counts)
+
+
+def function_name(region, fn):
+    """Return the name a memoized function is reported under."""
+    return '%s.%s (%s)' % (fn.__module__,
+                           getattr(fn, '__qualname__', fn.__name__),
+                           region.name)
+
+
+def _ratio(part, total):
+    return round(float(part) / total, 4) if total else None
+
+
+def _mean_ms(seconds, count):
+    return round(seconds * 1000.0 / count, 3) if count else None
+
+
+def _region_report(metrics):
+    report = dict(metrics)
+    report['hit_ratio'] = _ratio(metrics['hits'], metrics['gets'])
+    report['mean_get_time_ms'] = _mean_ms(metrics['get_time'],
+                                          metrics['gets'])
+    report['mean_set_time_ms'] = _mean_ms(metrics['set_time'],
+                                          metrics['sets'])
+    report['mean_value_bytes'] = (
+        metrics['value_bytes'] // metrics['sized_sets']
+        if metrics['sized_sets'] else None)
+    return report
+
+
+def _function_report(metrics):
+    report = dict(metrics)
+    calls = metrics['calls'] + metrics['local_hits']
+    report['hit_ratio'] = _ratio(calls - metrics['misses'], calls)
+    report['mean_time_ms'] = _mean_ms(metrics['time'], metrics['calls'])
+    return report
+
+
+def get_report():
+    """Return the cache metrics collected by this process.
+
+    :returns: a dictionary with whether metrics are being collected
+              (``enabled``), when collecting them started (``since``), and
+              the metrics of each cache region (``regions``) and of each
+              memoized function (``functions``) by name
+
+    """
+    with _lock:
+        regions = dict((name, _region_report(metrics))
+                       for name, metrics in _regions.items())
+        functions = dict((name, _function_report(metrics))
+                         for name, metrics in _functions.items())
+    return {
+        'enabled': _enabled(),
+        'since': utils.isotime(
+            datetime.datetime.utcfromtimestamp(_started_at), subsecond=True),
+        'regions': regions,
+        'functions': functions,
+    }
+
+
+def reset():
+    """Discard the cache metrics collected by this process."""
+    global _started_at
+    with _lock:
+        _regions.clear()
+        _functions.clear()
+        _started_at = time.time()
+
+
+def _maybe_log():
+    global _last_logged_at
+    interval = CONF.cache_metrics_log_interval
+    if not interval:
+        return
+    now = time.time()
+    with _lock:
+        if now - _last_logged_at < interval:
+            return
+        _last_logged_at = now
+    LOG.info('Cache metrics: %s', get_report())
+
+
+def _value_size(value):
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        # The size of values the backend serializes differently is unknown.
+        return None
+
+
+class MetricsProxy(proxy.ProxyBackend):
+    """Collect the metrics of a region about its cache backend."""
+
+    def __init__(self, region_name):
+        super(MetricsProxy, self).__init__()
+        self._region_name = region_name
+
+    def _record_gets(self, values, elapsed):
+        misses = sum(1 for value in values if value is api.NO_VALUE)
+        record_region(self._region_name, gets=len(values),
+                      hits=len(values) - misses, misses=misses,
+                      get_time=elapsed)
+
+    def _record_sets(self, values, elapsed):
+        sizes = [size for size in map(_value_size, values) if size is not None]
+        record_region(self._region_name, sets=len(values), set_time=elapsed,
+                      sized_sets=len(sizes), value_bytes=sum(sizes))
+
+    def get(self, key):
+        if not _enabled():
+            return self.proxied.get(key)
+        start = time.time()
+        value = self.proxied.get(key)
+        self._record_gets([value], time.time() - start)
+        return value
+
+    def get_multi(self, keys):
+        if not _enabled():
+            return self.proxied.get_multi(keys)
+        start = time.time()
+        values = self.proxied.get_multi(keys)
+        self._record_gets(values, time.time() - start)
+        return values
+
+    def set(self, key, value):
+        if not _enabled():
+            return self.proxied.set(key, value)
+        start = time.time()
+        self.proxied.set(key, value)
+        self._record_sets([value], time.time() - start)
+
+    def set_multi(self, mapping):
+        if not _enabled():
+            return self.proxied.set_multi(mapping)
+        start = time.time()
+        self.proxied.set_multi(mapping)
+        self._record_sets(list(mapping.values()), time.time() - start)
+
+    def delete(self, key):
+        self.proxied.delete(key)
+        record_region(self._region_name, deletes=1)
+
+    def delete_multi(self, keys):
+        keys = list(keys)
+        self.proxied.delete_multi(keys)
+        record_region(self._region_name, deletes=len(keys))
+
+
+def _current_calls():
+    try:
+        return _calls.stack
+    except AttributeError:
+        _calls.stack = []
+        return _calls.stack
+
+
+def memoize(memoize_decorator, region):
+    """Collect the metrics of the functions a memoization decorator wraps.
+
+    :param memoize_decorator: a memoization decorator, as returned by
+        :func:`oslo_cache.core.get_memoization_decorator`
+    :param region: the region ``memoize_decorator`` caches in
+    :returns: a memoization decorator, with the same interface as
+              ``memoize_decorator``
+
+    """
+    def should_cache(value):
+        # The memoization decorator only asks whether to cache a value it has
+        # just computed, that is, on a cache miss of the innermost memoized
+        # function being called.
+        calls = _current_calls()
+        if calls:
+            record_function(calls[-1], misses=1)
+        return memoize_decorator.should_cache(value)
+
+    counting_decorator = region.cache_on_arguments(
+        should_cache_fn=should_cache,
+        expiration_time=memoize_decorator.get_expiration_time)
+
+    def decorator(fn):
+        name = function_name(region, fn)
+        # Keep the cache keys generated for ``fn`` itself.
+        memoized = counting_decorator(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled():
+                return memoized(*args, **kwargs)
+            calls = _current_calls()
+            calls.append(name)
+            start = time.time()
+            try:
+                return memoized(*args, **kwargs)
+            finally:
+                calls.pop()
+                record_function(name, calls=1, time=time.time() - start)
+
+        wrapper.invalidate = memoized.invalidate
+        wrapper.set = memoized.set
+        wrapper.get = memoized.get
+        wrapper.refresh = memoized.refresh
+        wrapper.original = fn
+        return wrapper
+
+    decorator.should_cache = memoize_decorator.should_cache
+    decorator.get_expiration_time = memoize_decorator.get_expiration_time
+    return decorator
@@ -0,0 +1,120 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Caching of the NotFound errors raised by memoized functions.
+
+Memoized functions only cache the values they return, so looking up an entity
+that doesn't exist reaches the backend every time. When the ``caching`` and
+``negative_cache_time`` options of a configuration group allow it, the errors
+are cached for that long next to the values, under the same key with a suffix.
+Invalidating or setting the value of a memoized function for some arguments
+discards the cached error as well, so creating an entity makes it visible
+right away.
+"""
+
+import functools
+
+from dogpile.cache import api
+from oslo_config import cfg
+import six
+
+import keystone.conf
+from keystone import exception
+
+
+CONF = keystone.conf.CONF
+
+_KEY_SUFFIX = ':not-found'
+
+
+def _get_expiration_time(group):
+    """Return how long a group caches NotFound errors, if it does."""
+    if not CONF.cache.enabled:
+        return None
+    conf_group = getattr(CONF, group)
+    try:
+        if not conf_group.caching:
+            return None
+        return conf_group.negative_cache_time or None
+    except cfg.NoSuchOptError:
+        return None
+
+
+def _dump(error):
+    # Only store errors which can be rebuilt from their class name.
+    name = error.__class__.__name__
+    if getattr(exception, name, None) is not error.__class__:
+        return None
+    return {'error': name, 'message': six.text_type(error)}
+
+
+def _load(data):
+    return getattr(exception, data['error'])(message=data['message'])
+
+
+def get_decorator(region, group):
+    """Return a decorator caching the NotFound errors of memoized functions.
+
+    :param region: the region the decorated functions are memoized in
+    :param group: the configuration group whose ``caching`` and
+        ``negative_cache_time`` options control caching the errors
+    :returns: a decorator, to apply on top of the memoization decorator
+
+    """
+    def decorator(memoized):
+        key_generator = region.function_key_generator(None, memoized.original)
+
+        def not_found_key(*args, **kwargs):
+            return key_generator(*args, **kwargs) + _KEY_SUFFIX
+
+        def discard(*args, **kwargs):
+            if _get_expiration_time(group):
+                region.delete(not_found_key(*args, **kwargs))
+
+        @functools.wraps(memoized)
+        def wrapper(*args, **kwargs):
+            expiration_time = _get_expiration_time(group)
+            if not expiration_time:
+                return memoized(*args, **kwargs)
+
+            key = not_found_key(*args, **kwargs)
+            data = region.get(key, expiration_time=expiration_time)
+            if data is not api.NO_VALUE:
+                raise _load(data)
+            try:
+                return memoized(*args, **kwargs)
+            except exception.NotFound as e:
+                data = _dump(e)
+                if data is not None:
+                    region.set(key, data)
+                raise
+
+        def invalidate(*args, **kwargs):
+            discard(*args, **kwargs)
+            memoized.invalidate(*args, **kwargs)
+
+        def set_(value, *args, **kwargs):
+            discard(*args, **kwargs)
+            memoized.set(value, *args, **kwargs)
+
+        def refresh(*args, **kwargs):
+            discard(*args, **kwargs)
+            return memoized.refresh(*args, **kwargs)
+
+        wrapper.invalidate = invalidate
+        wrapper.set = set_
+        wrapper.get = memoized.get
+        wrapper.refresh = refresh
+        wrapper.original = memoized.original
+        return wrapper
+
+    return decorator
@@ -0,0 +1,158 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Serving the values of an invalidated region while they are recomputed.
+
+Invalidating a region replaces its ID, which every cache key includes, so all
+its values have to be computed again. For the regions created with
+``serve_stale=True``, and when the `[DEFAULT] cache_stale_while_revalidate`
+option is set, the previous region ID is kept for that many seconds after an
+invalidation. During that window, a memoized function missing a value looks up
+the value cached under the previous region ID. If there is one, a single
+caller, holding a lock in the cache backend, computes the new value, while the
+others are returned the previous one instead of computing it as well.
+"""
+
+import functools
+import threading
+import time
+
+from dogpile.cache import api
+from dogpile.cache.backends import memcached
+from dogpile import util
+
+from keystone.common.cache import _metrics
+import keystone.conf
+
+
+CONF = keystone.conf.CONF
+
+
+class _ProcessLock(object):
+    """A lock for backends which can't provide one shared by processes."""
+
+    def __init__(self, key):
+        self._lock = threading.Lock()
+
+    def acquire(self, wait=True):
+        return self._lock.acquire(wait)
+
+    def release(self):
+        self._lock.release()
+
+
+_process_locks = util.NameRegistry(_ProcessLock)
+
+
+def _actual_backend(region):
+    backend = region.backend
+    while hasattr(backend, 'proxied'):
+        backend = backend.proxied
+    return backend
+
+
+def get_mutex(region, key):
+    """Return a lock on a key of a region, shared by processes if possible.
+
+    This is the lock of the cache backend when it provides one, as memcached
+    and redis do with the ``distributed_lock`` backend argument. Otherwise,
+    memcached backends are locked with an ``add`` of a lock key, expiring
+    after `[DEFAULT] cache_stale_while_revalidate` seconds in case its holder
+    dies, and other backends with a lock local to the process.
+
+    :param region: a cache region
+    :param key: the mangled key to lock
+    :returns: an object with ``acquire(wait)`` and ``release()`` methods
+
+    """
+    mutex = region.backend.get_mutex(key)
+    if mutex is not None:
+        return mutex
+    backend = _actual_backend(region)
+    if hasattr(getattr(backend, 'client', None), 'add'):
+        return memcached.MemcachedLock(
+            lambda: backend.client, key,
+            timeout=CONF.cache_stale_while_revalidate)
+    return _process_locks.get(key)
+
+
+def memoize(memoize_decorator, region):
+    """Serve stale values from a memoization decorator during regeneration.
+
+    :param memoize_decorator: a memoization decorator, as returned by
+        :func:`oslo_cache.core.get_memoization_decorator`
+    :param region: the region ``memoize_decorator`` caches in
+    :returns: a memoization decorator, with the same interface as
+              ``memoize_decorator``
+
+    """
+    def decorator(fn):
+        memoized = memoize_decorator(fn)
+        key_generator = region.function_key_generator(None, fn)
+        name = _metrics.function_name(region, fn)
+
+        def get_stale(key, expiration_time):
+            region_manager = getattr(region.region_invalidator,
+                                     'region_manager', None)
+            if region_manager is None:
+                return api.NO_VALUE
+            stale_region_id = region_manager.get_stale_region_id()
+            if stale_region_id is None:
+                return api.NO_VALUE
+            value = region.backend.get(
+                region.key_mangler(key, region_id=stale_region_id))
+            if value is api.NO_VALUE:
+                return api.NO_VALUE
+            if (expiration_time is not None and
+                    time.time() - value.metadata['ct'] >= expiration_time):
+                return api.NO_VALUE
+            return value.payload
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not CONF.cache_stale_while_revalidate:
+                return memoized(*args, **kwargs)
+
+            expiration_time = (memoize_decorator.get_expiration_time() or
+                               region.expiration_time)
+            key = key_generator(*args, **kwargs)
+            value = region.get(key, expiration_time=expiration_time)
+            if value is not api.NO_VALUE:
+                return value
+            stale_value = get_stale(key, expiration_time)
+            if stale_value is api.NO_VALUE:
+                return memoized(*args, **kwargs)
+
+            mutex = get_mutex(region, region.key_mangler(key))
+            if not mutex.acquire(False):
+                # Another caller is computing the value.
+                _metrics.record_function(name, stale_hits=1)
+                return stale_value
+            try:
+                value = fn(*args, **kwargs)
+                if memoize_decorator.should_cache(value):
+                    memoized.set(value, *args, **kwargs)
+                _metrics.record_function(name, regenerations=1)
+                return value
+            finally:
+                mutex.release()
+
+        wrapper.invalidate = memoized.invalidate
+        wrapper.set = memoized.set
+        wrapper.get = memoized.get
+        wrapper.refresh = memoized.refresh
+        wrapper.original = fn
+        return wrapper
+
+    decorator.should_cache = memoize_decorator.should_cache
+    decorator.get_expiration_time = memoize_decorator.get_expiration_time
+    return decorator
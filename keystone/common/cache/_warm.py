@@ -0,0 +1,117 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Preloading of the memoized entities the token validation path reads.
+
+The managers caching such entities provide methods which list them with a
+single driver call and store them under the keys their memoized getters would
+use. The entities are loaded in the order of their
+usefulness, so that the most useful ones are loaded when the budget is short.
+"""
+
+import time
+
+from oslo_log import log
+
+from keystone.common import driver_hints
+from keystone.common import provider_api
+import keystone.conf
+
+
+CONF = keystone.conf.CONF
+LOG = log.getLogger(__name__)
+PROVIDERS = provider_api.ProviderAPIs
+
+# The entities to load, with the configuration group that enables caching
+# them, and the API and method that load them.
+_WARMERS = [
+    ('roles', 'role', 'role_api', 'warm_cache'),
+    ('domains', 'resource', 'resource_api', 'warm_domain_cache'),
+    ('service_providers', 'federation', 'federation_api', 'warm_cache'),
+    ('catalog', 'catalog', 'catalog_api', 'warm_cache'),
+    ('projects', 'resource', 'resource_api', 'warm_project_cache'),
+]
+
+
+class Budget(object):
+    """The time and number of entries a cache warm-up may use.
+
+    :param max_time: the number of seconds after which no more entities are
+                     loaded, or None for no limit
+    :param max_entries: the maximum number of entries loaded, or None for no
+                        limit
+
+    """
+
+    def __init__(self, max_time=None, max_entries=None):
+        self._deadline = (time.time() + max_time
+                          if max_time is not None else None)
+        self.remaining = max_entries
+
+    @property
+    def exhausted(self):
+        if self.remaining is not None and self.remaining <= 0:
+            return True
+        return self._deadline is not None and time.time() >= self._deadline
+
+    def hints(self):
+        """Return driver hints limiting a listing to the remaining entries."""
+        hints = driver_hints.Hints()
+        if self.remaining is not None:
+            hints.set_limit(self.remaining)
+        return hints
+
+    def take(self, refs):
+        """Spend the budget on as many of ``refs`` as it allows.
+
+        :param refs: a list of the entities listed
+        :returns: the entities to load
+
+        """
+        if self.exhausted:
+            return []
+        if self.remaining is not None:
+            refs = refs[:self.remaining]
+            self.remaining -= len(refs)
+        return refs
+
+
+def warm(max_time=None, max_entries=None):
+    """Load the entities validating tokens requires into the cache.
+
+    :param max_time: the number of seconds after which no more entities are
+                     loaded, or None for no limit
+    :param max_entries: the maximum number of entries loaded, or None for no
+                        limit
+    :returns: a dictionary with the number of entries loaded for each kind of
+              entity (``loaded``), the kinds of entities which weren't loaded
+              because caching them is disabled or the budget was exhausted
+              (``skipped``) or because loading them failed (``failed``), and
+              the time spent in seconds (``elapsed``)
+
+    """
+    start = time.time()
+    budget = Budget(max_time, max_entries)
+    report = {'loaded': {}, 'skipped': [], 'failed': []}
+    for name, group, api_name, method_name in _WARMERS:
+        if (not CONF.cache.enabled or not getattr(CONF, group).caching or
+                budget.exhausted):
+            report['skipped'].append(name)
+            continue
+        warm_cache = getattr(getattr(PROVIDERS, api_name), method_name)
+        try:
+            report['loaded'][name] = warm_cache(budget)
+        except Exception:
+            LOG.exception('Failed to load the %s into the cache.', name)
+            report['failed'].append(name)
+    report['elapsed'] = time.time() - start
+    return report
@@ -15,38 +15,131 @@
 """Keystone Caching Layer Implementation."""
 
 import os
+import threading
+import time
+import uuid
 
 import dogpile.cache
+from dogpile.cache import api
 from dogpile.cache import region
 from dogpile.cache import util
 from oslo_cache import core as cache
+from oslo_log import log
 
 from keystone.common.cache import _context_cache
+from keystone.common.cache import _local_cache
+from keystone.common.cache import _metrics
+from keystone.common.cache import _negative_cache
+from keystone.common.cache import _stale_cache
+from keystone.common.cache import _warm
 import keystone.conf
 
 
 CONF = keystone.conf.CONF
+LOG = log.getLogger(__name__)
+
+GENERATION_KEY_PREFIX = '<<<generation>>>:'
 
 
 class RegionInvalidationManager(object):
 
     REGION_KEY_PREFIX = '<<<region>>>:'
+    STALE_REGION_KEY_PREFIX = '<<<stale region>>>:'
 
-    def __init__(self, invalidation_region, region_name):
+    def __init__(self, invalidation_region, region_name, serve_stale=False):
         self._invalidation_region = invalidation_region
+        self._region_name = region_name
         self._region_key = self.REGION_KEY_PREFIX + region_name
+        # The previous region ID and when it was replaced, kept for the
+        # `[DEFAULT] cache_stale_while_revalidate` option.
+        self._serve_stale = serve_stale
+        self._stale_region_key = self.STALE_REGION_KEY_PREFIX + region_name
+        # The region ID last read or set by this process, and when, see the
+        # `[DEFAULT] cache_region_id_max_staleness` option.
+        self._region_id = None
+        self._fetched_at = 0
+        self._invalidations = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
 
     def _generate_new_id(self):
         return os.urandom(10)
 
-    @property
-    def region_id(self):
+    def _get_region_id(self):
         return self._invalidation_region.get_or_create(
             self._region_key, self._generate_new_id, expiration_time=-1)
 
+    def _fetch_region_id(self):
+        invalidations = self._invalidations
+        fetched_at = time.time()
+        region_id = self._get_region_id()
+        with self._lock:
+            # Don't overwrite a region ID set by a concurrent invalidation.
+            if invalidations == self._invalidations:
+                self._region_id = region_id
+                self._fetched_at = fetched_at
+            return self._region_id
+
+    def _refresh_in_background(self):
+        try:
+            self._fetch_region_id()
+        except Exception:
+            LOG.exception('Failed to refresh the ID of cache region %s.',
+                          self._region_key)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _schedule_refresh(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        thread = threading.Thread(target=self._refresh_in_background)
+        thread.daemon = True
+        thread.start()
+
+    @property
+    def region_id(self):
+        max_staleness = CONF.cache_region_id_max_staleness
+        if not max_staleness:
+            return self._get_region_id()
+
+        age = time.time() - self._fetched_at
+        # A negative age means the clock was set back, so don't trust it.
+        if self._region_id is None or not 0 <= age < max_staleness:
+            return self._fetch_region_id()
+        if age >= max_staleness / 2.0:
+            self._schedule_refresh()
+        return self._region_id
+
+    def get_stale_region_id(self):
+        """Return the previous region ID, if its values may still be used."""
+        if not (self._serve_stale and CONF.cache_stale_while_revalidate):
+            return None
+        stale_region = self._invalidation_region.get(self._stale_region_key)
+        if stale_region is api.NO_VALUE:
+            return None
+        age = time.time() - stale_region['invalidated_at']
+        if not 0 <= age < CONF.cache_stale_while_revalidate:
+            return None
+        return stale_region['region_id']
+
     def invalidate_region(self):
+        stale_region_id = None
+        if self._serve_stale and CONF.cache_stale_while_revalidate:
+            stale_region_id = self.region_id
         new_region_id = self._generate_new_id()
         self._invalidation_region.set(self._region_key, new_region_id)
+        if stale_region_id is not None:
+            self._invalidation_region.set(
+                self._stale_region_key,
+                {'region_id': stale_region_id, 'invalidated_at': time.time()})
+        _metrics.record_region(self._region_name, invalidations=1)
+        with self._lock:
+            self._region_id = new_region_id
+            self._fetched_at = time.time()
+            self._invalidations += 1
         return new_region_id
 
     def is_region_key(self, key):
@@ -58,6 +151,10 @@ class DistributedInvalidationStrategy(region.RegionInvalidationStrategy):
     def __init__(self, region_manager):
         self._region_manager = region_manager
 
+    @property
+    def region_manager(self):
+        return self._region_manager
+
     def invalidate(self, hard=None):
         self._region_manager.invalidate_region()
 
@@ -78,20 +175,22 @@ class DistributedInvalidationStrategy(region.RegionInvalidationStrategy):
 
 
 def key_mangler_factory(invalidation_manager, orig_key_mangler):
-    def key_mangler(key):
+    def key_mangler(key, region_id=None):
         # NOTE(dstanek): Since *all* keys go through the key mangler we
         # need to make sure the region keys don't get the region_id added.
         # If it were there would be no way to get to it, making the cache
         # effectively useless.
         if not invalidation_manager.is_region_key(key):
-            key = '%s:%s' % (key, invalidation_manager.region_id)
+            if region_id is None:
+                region_id = invalidation_manager.region_id
+            key = '%s:%s' % (key, region_id)
         if orig_key_mangler:
             key = orig_key_mangler(key)
         return key
     return key_mangler
 
 
-def create_region(name):
+def create_region(name, serve_stale=False):
     """Create a dopile region.
 
     Wraps oslo_cache.core.create_region. This is used to ensure that the
@@ -99,12 +198,16 @@ def create_region(name):
     name.
 
     :param str name: The region name
+    :param bool serve_stale: Whether the values of the region keep being
+        served while they are computed again after an invalidation, see the
+        `[DEFAULT] cache_stale_while_revalidate` option.
     :returns: The new region.
     :rtype: :class:`dogpile.cache.region.CacheRegion`
 
     """
     region = cache.create_region()
     region.name = name  # oslo.cache doesn't allow this yet
+    region.serve_stale = serve_stale
     return region
 
 
@@ -112,6 +215,9 @@ CACHE_REGION = create_region(name='shared default')
 CACHE_INVALIDATION_REGION = create_region(name='invalidation region')
 
 register_model_handler = _context_cache._register_model_handler
+get_request_cache_stats = _context_cache.get_request_stats
+get_metrics_report = _metrics.get_report
+warm = _warm.warm
 
 
 def configure_cache(region=None):
@@ -125,10 +231,14 @@ def configure_cache(region=None):
     # Only wrap the region if it was not configured. This should be pushed
     # to oslo_cache lib somehow.
     if not configured:
+        # Proxies wrap the ones added before them, so the metrics proxy only
+        # sees the calls that reach the cache backend.
+        region.wrap(_metrics.MetricsProxy(region.name))
         region.wrap(_context_cache._ResponseCacheProxy)
 
         region_manager = RegionInvalidationManager(
-            CACHE_INVALIDATION_REGION, region.name)
+            CACHE_INVALIDATION_REGION, region.name,
+            serve_stale=getattr(region, 'serve_stale', False))
         region.key_mangler = key_mangler_factory(
             region_manager, region.key_mangler)
         region.region_invalidator = DistributedInvalidationStrategy(
@@ -166,6 +276,8 @@ def configure_invalidation_region():
 
     # NOTE(breton): Wrap the cache invalidation region to avoid excessive
     # calls to memcached, which would result in poor performance.
+    CACHE_INVALIDATION_REGION.wrap(
+        _metrics.MetricsProxy(CACHE_INVALIDATION_REGION.name))
     CACHE_INVALIDATION_REGION.wrap(_context_cache._ResponseCacheProxy)
 
     # NOTE(morganfainberg): if the backend requests the use of a
@@ -180,8 +292,160 @@ def configure_invalidation_region():
 def get_memoization_decorator(group, expiration_group=None, region=None):
     if region is None:
         region = CACHE_REGION
-    return cache.get_memoization_decorator(CONF, region, group,
-                                           expiration_group=expiration_group)
+    memoize = cache.get_memoization_decorator(
+        CONF, region, group, expiration_group=expiration_group)
+    memoize = _metrics.memoize(memoize, region)
+    if getattr(region, 'serve_stale', False):
+        memoize = _stale_cache.memoize(memoize, region)
+    return _local_cache.memoize(memoize, region, group)
+
+
+def get_not_found_cache_decorator(group, region=None):
+    """Return a decorator caching the NotFound errors of memoized functions.
+
+    It is applied on top of the memoization decorator of the same group, and
+    only caches errors when the group's ``negative_cache_time`` is set.
+
+    """
+    if region is None:
+        region = CACHE_REGION
+    return _negative_cache.get_decorator(region, group)
+
+
+def _memoized_keys(region, fn, args_list):
+    key_generator = region.function_key_generator(None, fn.original)
+    return [key_generator(*args) for args in args_list]
+
+
+def get_memoized_multi(region, memoize, fn, args_list):
+    """Look up several results of a memoized function in one round trip.
+
+    This reads the same cache keys as calling ``fn`` once for each set of
+    arguments would, but with a single ``get_multi`` against the backend.
+
+    :param region: the region ``fn`` is memoized in
+    :param memoize: the memoization decorator that was applied to ``fn``
+    :param fn: the memoized function or method
+    :param args_list: a list of argument tuples, as passed to ``fn`` (this
+                      includes ``self`` for methods)
+    :returns: a list of cached values, in the order of ``args_list``, with
+              ``dogpile.cache.api.NO_VALUE`` for each cache miss
+
+    """
+    if not args_list:
+        return []
+    keys = _memoized_keys(region, fn, args_list)
+    return region.get_multi(keys,
+                            expiration_time=memoize.get_expiration_time())
+
+
+def set_memoized_multi(region, memoize, fn, args_list, values):
+    """Store several results of a memoized function in one round trip.
+
+    Values that the memoization decorator wouldn't cache are skipped.
+
+    :param region: the region ``fn`` is memoized in
+    :param memoize: the memoization decorator that was applied to ``fn``
+    :param fn: the memoized function or method
+    :param args_list: a list of argument tuples, as passed to ``fn``
+    :param values: the results of ``fn``, in the order of ``args_list``
+
+    """
+    keys = _memoized_keys(region, fn, args_list)
+    mapping = dict((key, value) for key, value in zip(keys, values)
+                   if memoize.should_cache(value))
+    if mapping:
+        region.set_multi(mapping)
+
+
+def get_memoized_by_ids(region, memoize, fn, instance, ids, fetch):
+    """Look up a memoized method for several IDs, fetching misses at once.
+
+    The cached results of ``fn`` for each ID are read in one round trip to the
+    cache backend, the IDs that missed are passed to ``fetch`` all at once,
+    and its results are cached as if ``fn`` had been called for each of them.
+
+    :param region: the region ``fn`` is memoized in
+    :param memoize: the memoization decorator that was applied to ``fn``
+    :param fn: the memoized method, taking an ID as its only argument
+    :param instance: the object ``fn`` is called on
+    :param ids: an iterable of IDs
+    :param fetch: a function taking a list of IDs and returning the values of
+                  ``fn`` for them, as a dictionary which omits the IDs that
+                  don't exist. Any other ID it returns, such as one a backend
+                  matched case insensitively, is ignored.
+    :returns: a dictionary mapping each ID that exists to the value of ``fn``
+
+    """
+    ids = list(set(ids))
+    cached = get_memoized_multi(region, memoize, fn,
+                                [(instance, id_) for id_ in ids])
+
+    results, missed = {}, []
+    for id_, value in zip(ids, cached):
+        if value is api.NO_VALUE:
+            missed.append(id_)
+        else:
+            results[id_] = value
+
+    if missed:
+        missed_ids = set(missed)
+        fetched = [(id_, value) for id_, value in fetch(missed).items()
+                   if id_ in missed_ids]
+        set_memoized_multi(region, memoize, fn,
+                           [(instance, id_) for id_, value in fetched],
+                           [value for id_, value in fetched])
+        results.update(fetched)
+    return results
+
+
+def _new_generation():
+    return uuid.uuid4().hex
+
+
+def get_generations(region, names):
+    """Return the current generations of several names in a region.
+
+    A generation is a random value kept in the cache, which is replaced by
+    :func:`bump_generations`. Folding the generations of the entities a value
+    depends on into its cache key, or storing them with the value and
+    comparing them on read, allows invalidating only the values that depend on
+    a given entity rather than the whole region.
+
+    Names without a generation in the cache, either because they were never
+    bumped or because the generation was evicted, get a new one. Losing a
+    generation therefore turns the values depending on it into cache misses,
+    never into stale hits.
+
+    :param region: the region the generations are kept in
+    :param names: a list of strings naming the generations
+    :returns: a list of generations, in the order of ``names``
+
+    """
+    if not names:
+        return []
+    keys = [GENERATION_KEY_PREFIX + name for name in names]
+    generations = region.get_multi(keys)
+    missing = {}
+    for i, key in enumerate(keys):
+        if generations[i] is api.NO_VALUE:
+            generations[i] = missing[key] = _new_generation()
+    if missing:
+        region.set_multi(missing)
+    return generations
+
+
+def bump_generations(region, names):
+    """Replace the generations of several names in a region.
+
+    :param region: the region the generations are kept in
+    :param names: an iterable of strings naming the generations
+
+    """
+    mapping = dict((GENERATION_KEY_PREFIX + name, _new_generation())
+                   for name in names)
+    if mapping:
+        region.set_multi(mapping)
 
 
 # NOTE(stevemar): When memcache_pool, mongo and noop backends are removed
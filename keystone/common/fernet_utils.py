@@ -13,6 +13,7 @@
 import base64
 import os
 import stat
+import time
 
 from cryptography import fernet
 from oslo_log import log
@@ -32,6 +33,12 @@ CONF = keystone.conf.CONF
 # upgrades.
 NULL_KEY = base64.urlsafe_b64encode(b'\x00' * 32)
 
+# Some file systems only record modification times with a one second (or
+# coarser) granularity, so several changes to a key repository can share a
+# single timestamp. A key repository modified more recently than this many
+# seconds ago is never considered stable enough to be fingerprinted.
+KEY_REPOSITORY_SETTLE_TIME = 2
+
 
 class FernetUtils(object):
 
@@ -98,6 +105,30 @@ class FernetUtils(object):
                     'a keystone user ID and keystone group ID both being '
                     'provided: %s', self.key_repository)
 
+    def key_repository_signature(self):
+        """Return a cheap fingerprint of the key repository directory.
+
+        Creating, promoting and purging keys all add, rename or remove files
+        in the key repository, which updates the modification time of the
+        directory itself. Comparing the result of this method with a previous
+        one is enough to tell if the keys need to be reloaded, without listing
+        the directory or reading any of the key files.
+
+        :returns: a tuple identifying the current state of the directory, or
+                  None if the repository can't be inspected or was modified too
+                  recently for its modification time to be trusted
+
+        """
+        try:
+            stat_info = os.stat(self.key_repository)
+        except OSError:
+            return None
+
+        if time.time() - stat_info.st_mtime < KEY_REPOSITORY_SETTLE_TIME:
+            return None
+
+        return (stat_info.st_dev, stat_info.st_ino, stat_info.st_mtime)
+
     def _create_new_key(self, keystone_user_id, keystone_group_id):
         """Securely create a new encryption key.
 
@@ -272,6 +303,43 @@ class FernetUtils(object):
             LOG.info('Excess key to purge: %s', key_to_purge)
             os.remove(key_to_purge)
 
+    def load_keys_with_rotation_times(self):
+        """Load keys from disk along with the time each became the primary.
+
+        Keys are always created as the staged key (0) while rotating, so the
+        modification time of a key file records when the key numbered just
+        below it was promoted to primary. The primary key was promoted when
+        the current staged key was created.
+
+        :returns: a list of ``(key_id, key, promoted_at)`` tuples sorted by key
+                  number, descending, with the staged key last. ``promoted_at``
+                  is a timestamp, or None if it isn't known.
+
+        """
+        if not self.validate_key_repository():
+            return []
+
+        key_files, keys = self._get_key_files(self.key_repository)
+
+        mtimes = dict()
+        for key_id, path in key_files.items():
+            try:
+                mtimes[key_id] = os.stat(path).st_mtime
+            except OSError:
+                mtimes[key_id] = None
+
+        # the staged key records the promotion of the primary key, and every
+        # other key records the promotion of the one numbered just below it
+        key_ids = sorted(keys.keys(), reverse=True)
+        key_list = []
+        for index, key_id in enumerate(key_ids):
+            promoted_at = None
+            if key_id != 0:
+                promoted_by = key_ids[index - 1] if index else 0
+                promoted_at = mtimes.get(promoted_by)
+            key_list.append((key_id, keys[key_id], promoted_at))
+        return key_list
+
     def load_keys(self, use_null_key=False):
         """Load keys from disk into a list.
 
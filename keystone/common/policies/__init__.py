@@ -16,6 +16,7 @@ from keystone.common.policies import access_token
 from keystone.common.policies import application_credential
 from keystone.common.policies import auth
 from keystone.common.policies import base
+from keystone.common.policies import cache_metrics
 from keystone.common.policies import consumer
 from keystone.common.policies import credential
 from keystone.common.policies import domain
@@ -53,6 +54,7 @@ def list_rules():
         application_credential.list_rules(),
         access_token.list_rules(),
         auth.list_rules(),
+        cache_metrics.list_rules(),
         consumer.list_rules(),
         credential.list_rules(),
         domain.list_rules(),
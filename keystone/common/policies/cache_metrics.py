@@ -0,0 +1,31 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from oslo_policy import policy
+
+from keystone.common.policies import base
+
+cache_metrics_policies = [
+    policy.DocumentedRuleDefault(
+        name=base.IDENTITY % 'get_cache_metrics',
+        check_str=base.RULE_ADMIN_REQUIRED,
+        # The cache metrics describe the deployment rather than any project or
+        # domain, so only system administrators should see them.
+        scope_types=['system'],
+        description='Show the cache metrics of the keystone process.',
+        operations=[{'path': '/v3/cache/metrics',
+                     'method': 'GET'}])
+]
+
+
+def list_rules():
+    return cache_metrics_policies
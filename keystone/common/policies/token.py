@@ -44,7 +44,9 @@ token_policies = [
         # scope_types=['system', 'project'],
         description='Validate a token.',
         operations=[{'path': '/v3/auth/tokens',
-                     'method': 'GET'}]),
+                     'method': 'GET'},
+                    {'path': '/v3/auth/tokens/validate',
+                     'method': 'POST'}]),
     policy.DocumentedRuleDefault(
         name=base.IDENTITY % 'revoke_token',
         check_str=base.RULE_ADMIN_OR_TOKEN_SUBJECT,
@@ -611,7 +611,10 @@ def render_response(body=None, status=None, headers=None, method=None):
             content_type = None
 
         if content_type is None or content_type in JSON_ENCODE_CONTENT_TYPES:
-            body = jsonutils.dump_as_bytes(body, cls=utils.SmarterEncoder)
+            # Bodies that were already encoded, like cached token validation
+            # responses, are sent as they are.
+            if not isinstance(body, six.binary_type):
+                body = jsonutils.dump_as_bytes(body, cls=utils.SmarterEncoder)
             if content_type is None:
                 headers.append(('Content-Type', 'application/json'))
         status = status or (http_client.OK,
@@ -40,6 +40,21 @@ Time to cache application credential data in seconds. This has no effect
 unless global caching is enabled.
 """))
 
+negative_cache_time = cfg.IntOpt(
+    'negative_cache_time',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Time to cache the lookups of application credentials that don't exist, in
+seconds. When this is set above 0, looking up an application credential by ID
+that was just found not to exist fails without querying the backend again.
+Creating an application credential through keystone makes it visible
+immediately, but one created directly in the backend may only be seen after
+this long, so this should be kept short. Setting this to 0 disables caching
+such lookups. This has no effect unless both global and
+`[application_credential] caching` are enabled.
+"""))
+
 user_limit = cfg.IntOpt(
     'user_limit',
     default=-1,
@@ -56,6 +71,7 @@ ALL_OPTS = [
     driver,
     caching,
     cache_time,
+    negative_cache_time,
     user_limit,
 ]
 
@@ -32,11 +32,26 @@ prohibited_implied_role = cfg.ListOpt(
 A list of role names which are prohibited from being an implied role.
 """))
 
+materialize_effective_assignments = cfg.BoolOpt(
+    'materialize_effective_assignments',
+    default=False,
+    help=utils.fmt("""
+If set to true, the effective role assignments of users on projects and
+domains, after expanding group membership, inheritance and implied roles, are
+stored in a table of the assignment backend and updated whenever a change
+affects them. The roles of a user on a project or domain, and the projects and
+domains of a user, are then read from that table rather than computed from the
+direct role assignments. Only the SQL assignment driver supports this. The
+table isn't maintained while this option is disabled, so it has to be rebuilt
+with `keystone-manage effective_assignments_rebuild` before enabling it.
+"""))
+
 
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
     driver,
-    prohibited_implied_role
+    prohibited_implied_role,
+    materialize_effective_assignments,
 ]
 
 
@@ -51,6 +51,30 @@ typically does not change frequently, and so a longer duration than the global
 default may be desirable.
 """))
 
+local_cache_size = cfg.IntOpt(
+    'local_cache_size',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Maximum number of cached entries of catalog data kept in the memory of each
+keystone process, in front of the cache backend. These are used without a round
+trip to the cache backend, but entries deleted by other processes are only
+discarded locally once they expire (see `[catalog] local_cache_time`), while
+invalidating the whole cache region still takes effect immediately. Setting
+this to 0 disables the local cache. This has no effect unless both global and
+`[catalog] caching` are enabled.
+"""))
+
+local_cache_time = cfg.IntOpt(
+    'local_cache_time',
+    default=30,
+    min=1,
+    help=utils.fmt("""
+Time to keep entries of catalog data in the local cache of each keystone
+process, in seconds. This bounds how long changes made by other processes may
+go unnoticed. This has no effect unless `[catalog] local_cache_size` is set.
+"""))
+
 list_limit = cfg.IntOpt(
     'list_limit',
     help=utils.fmt("""
@@ -66,6 +90,8 @@ ALL_OPTS = [
     driver,
     caching,
     cache_time,
+    local_cache_size,
+    local_cache_time,
     list_limit,
 ]
 
@@ -167,6 +167,94 @@ to a reasonable number to prevent operations like listing all users and
 projects from placing an unnecessary load on the system.
 """))
 
+cache_region_id_max_staleness = cfg.IntOpt(
+    'cache_region_id_max_staleness',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Maximum age, in seconds, of the cache region IDs kept in the memory of each
+keystone process. Every cache key includes the ID of its region, which changes
+when the region is invalidated, so each process otherwise reads it from the
+cache backend before its first cache access in every request. When this is set
+above 0, region IDs are refreshed in the background once they are half that
+age, and read again before use once they are that old. Regions invalidated by
+the process itself are updated immediately, but invalidations made by other
+processes may then take up to this long to be seen. Setting this to 0 reads
+region IDs from the cache backend as needed.
+"""))
+
+cache_metrics = cfg.BoolOpt(
+    'cache_metrics',
+    default=False,
+    help=utils.fmt("""
+If set to true, each keystone process collects metrics about its use of the
+cache: the reads, hits, misses, writes, deletions and invalidations of each
+cache region with the time spent in the cache backend and the size of the
+values written, and the calls and cache misses of each cached method. They are
+available through the `GET /v3/cache/metrics` API, and can also be logged
+periodically (see `[DEFAULT] cache_metrics_log_interval`). Collecting them adds
+a small overhead to every cache access.
+"""))
+
+cache_metrics_log_interval = cfg.IntOpt(
+    'cache_metrics_log_interval',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Interval, in seconds, at which each keystone process logs its cache metrics,
+at the INFO level. Setting this to 0 disables logging them. This has no effect
+unless `[DEFAULT] cache_metrics` is enabled.
+"""))
+
+cache_stale_while_revalidate = cfg.IntOpt(
+    'cache_stale_while_revalidate',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Number of seconds during which the service catalogs computed for users keep
+being served after a change invalidates them, while they are computed again.
+When this is set above 0, a single caller computes each value again, holding a
+lock in the cache backend, while the others are returned the previous value,
+which avoids a burst of database queries after each change of the catalog. The
+lock is shared by all keystone processes with memcached backends, or with
+backends supporting the `distributed_lock` backend argument, and only by the
+threads of a process otherwise. Changes of the catalog may then take up to
+this long to be seen, so this should be kept short. Setting this to 0 computes
+the values again right away.
+"""))
+
+cache_warm_on_start = cfg.BoolOpt(
+    'cache_warm_on_start',
+    default=False,
+    help=utils.fmt("""
+If set to true, each keystone process loads the roles, domains, service
+providers, catalog and projects into the cache when it starts, as the
+`keystone-manage cache_warm` command does, within the limits set by `[DEFAULT]
+cache_warm_max_time` and `[DEFAULT] cache_warm_max_entries`. This avoids a
+burst of database queries when all processes start with an empty cache, for
+example after a deployment or a restart of the cache backend, at the expense
+of a longer start. This has no effect unless `[cache] enabled` is set.
+"""))
+
+cache_warm_max_time = cfg.IntOpt(
+    'cache_warm_max_time',
+    default=30,
+    min=0,
+    help=utils.fmt("""
+Number of seconds after which warming up the cache stops loading entities.
+Setting this to 0 removes the limit.
+"""))
+
+cache_warm_max_entries = cfg.IntOpt(
+    'cache_warm_max_entries',
+    default=10000,
+    min=0,
+    help=utils.fmt("""
+Maximum number of cache entries loaded when warming up the cache. Projects are
+loaded last, so in larger deployments this mostly limits the number of projects
+loaded. Setting this to 0 removes the limit.
+"""))
+
 strict_password_check = cfg.BoolOpt(
     'strict_password_check',
     default=False,
@@ -249,6 +337,13 @@ ALL_OPTS = [
     member_role_name,
     crypt_strength,
     list_limit,
+    cache_region_id_max_staleness,
+    cache_metrics,
+    cache_metrics_log_interval,
+    cache_stale_while_revalidate,
+    cache_warm_on_start,
+    cache_warm_max_time,
+    cache_warm_max_entries,
     strict_password_check,
     secure_proxy_ssl_header,
     insecure_debug,
@@ -53,11 +53,24 @@ highest numerical index), and one secondary key (every other index). Increasing
 this value means that additional secondary keys will be kept in the rotation.
 """))
 
+key_usage_log_interval = cfg.IntOpt(
+    'key_usage_log_interval',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Interval, in seconds, at which each keystone process logs the number of tokens
+decrypted by each key of the key repository since it was loaded, at the INFO
+level. A secondary key that no longer decrypts any tokens on any keystone node
+can be rotated out of the key repository without invalidating tokens still in
+use. Setting this to 0 disables logging them.
+"""))
+
 
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
     key_repository,
     max_active_keys,
+    key_usage_log_interval,
 ]
 
 
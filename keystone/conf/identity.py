@@ -93,6 +93,20 @@ Time to cache identity data (in seconds). This has no effect unless global and
 identity caching are enabled.
 """))
 
+negative_cache_time = cfg.IntOpt(
+    'negative_cache_time',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Time to cache the lookups of users that don't exist, in seconds. When this is
+set above 0, looking up a user by ID that was just found not to exist fails
+without querying the backend again. Creating a user through keystone makes it
+visible immediately, but one created directly in the backend may only be seen
+after this long, so this should be kept short. Setting this to 0 disables
+caching such lookups. This has no effect unless both global and `[identity]
+caching` are enabled.
+"""))
+
 max_password_length = cfg.IntOpt(
     'max_password_length',
     default=4096,
@@ -175,6 +189,7 @@ ALL_OPTS = [
     driver,
     caching,
     cache_time,
+    negative_cache_time,
     max_password_length,
     list_limit,
     password_hash_algorithm,
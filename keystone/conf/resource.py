@@ -49,6 +49,44 @@ Time to cache resource data in seconds. This has no effect unless global
 caching is enabled.
 """))
 
+local_cache_size = cfg.IntOpt(
+    'local_cache_size',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Maximum number of cached entries of resource data kept in the memory of each
+keystone process, in front of the cache backend. These are used without a round
+trip to the cache backend, but entries deleted by other processes are only
+discarded locally once they expire (see `[resource] local_cache_time`), while
+invalidating the whole cache region still takes effect immediately. Setting
+this to 0 disables the local cache. This has no effect unless both global and
+`[resource] caching` are enabled.
+"""))
+
+local_cache_time = cfg.IntOpt(
+    'local_cache_time',
+    default=30,
+    min=1,
+    help=utils.fmt("""
+Time to keep entries of resource data in the local cache of each keystone
+process, in seconds. This bounds how long changes made by other processes may
+go unnoticed. This has no effect unless `[resource] local_cache_size` is set.
+"""))
+
+negative_cache_time = cfg.IntOpt(
+    'negative_cache_time',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Time to cache the lookups of projects and domains that don't exist, in seconds.
+When this is set above 0, looking up a project or domain by ID that was just
+found not to exist fails without querying the backend again. Creating a project
+or domain through keystone makes it visible immediately, but one created
+directly in the backend may only be seen after this long, so this should be
+kept short. Setting this to 0 disables caching such lookups. This has no effect
+unless both global and `[resource] caching` are enabled.
+"""))
+
 list_limit = cfg.IntOpt(
     'list_limit',
     deprecated_opts=[cfg.DeprecatedOpt('list_limit', group='assignment')],
@@ -106,6 +144,9 @@ ALL_OPTS = [
     driver,
     caching,
     cache_time,
+    local_cache_size,
+    local_cache_time,
+    negative_cache_time,
     list_limit,
     admin_project_domain_name,
     admin_project_name,
@@ -51,6 +51,79 @@ Time to cache the revocation list and the revocation events (in seconds). This
 has no effect unless global and `[revoke] caching` are both enabled.
 """))
 
+local_cache_size = cfg.IntOpt(
+    'local_cache_size',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Maximum number of cached entries of revocation events kept in the memory of
+each keystone process, in front of the cache backend. These are used without a
+round trip to the cache backend, but entries deleted by other processes are
+only discarded locally once they expire (see `[revoke] local_cache_time`),
+while invalidating the whole cache region still takes effect immediately.
+Setting this to 0 disables the local cache. This has no effect unless both
+global and `[revoke] caching` are enabled.
+"""))
+
+local_cache_time = cfg.IntOpt(
+    'local_cache_time',
+    default=30,
+    min=1,
+    help=utils.fmt("""
+Time to keep entries of revocation events in the local cache of each keystone
+process, in seconds. This bounds how long changes made by other processes may
+go unnoticed. This has no effect unless `[revoke] local_cache_size` is set.
+"""))
+
+prune_batch_size = cfg.IntOpt(
+    'prune_batch_size',
+    default=1000,
+    min=1,
+    help=utils.fmt("""
+Maximum number of expired revocation events deleted from the backend in a
+single transaction when pruning. Expired events are deleted in as many
+batches as needed, keeping each transaction short so it does not hold up
+concurrent revocations.
+"""))
+
+prune_interval = cfg.IntOpt(
+    'prune_interval',
+    default=600,
+    min=0,
+    help=utils.fmt("""
+Minimum number of seconds between two prunes of expired revocation events by
+a keystone process. Pruning is started in the background by the first
+revocation recorded once this interval has elapsed. Set this option to 0 to
+disable background pruning, in which case `keystone-manage revocation_prune`
+should be run periodically instead.
+"""))
+
+index_resync_interval = cfg.IntOpt(
+    'index_resync_interval',
+    default=300,
+    min=1,
+    help=utils.fmt("""
+Maximum number of seconds between two full reads of the revocation events by a
+keystone process. In between, a process only reads the events revoked since
+shortly before the most recent event it knows of. An event recorded by a node
+whose clock lags behind, or committed late, can be older than that and is
+then only found by the next full read, so this bounds how long such a revoked
+token may still be accepted by a process.
+"""))
+
+index_poll_interval = cfg.IntOpt(
+    'index_poll_interval',
+    default=1,
+    min=0,
+    help=utils.fmt("""
+Minimum number of seconds between two reads of the new revocation events by a
+keystone process. Tokens validated in between are only checked against the
+events the process already knows of, along with those it recorded itself, so
+a revocation recorded by another keystone process may take this long to be
+enforced. Setting this to 0 reads the new events, from the `[revoke]` cache
+when enabled, on every token validation.
+"""))
+
 
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
@@ -58,6 +131,12 @@ ALL_OPTS = [
     expiration_buffer,
     caching,
     cache_time,
+    local_cache_size,
+    local_cache_time,
+    prune_batch_size,
+    prune_interval,
+    index_resync_interval,
+    index_poll_interval,
 ]
 
 
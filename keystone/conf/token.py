@@ -75,6 +75,31 @@ The number of seconds to cache token creation and validation data. This has no
 effect unless both global and `[token] caching` are enabled.
 """))
 
+local_cache_size = cfg.IntOpt(
+    'local_cache_size',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Maximum number of cached entries of token validation data kept in the memory of
+each keystone process, in front of the cache backend. These are used without a
+round trip to the cache backend, but entries deleted by other processes are
+only discarded locally once they expire (see `[token] local_cache_time`), while
+invalidating the whole cache region still takes effect immediately. Setting
+this to 0 disables the local cache. This has no effect unless both global and
+`[token] caching` are enabled.
+"""))
+
+local_cache_time = cfg.IntOpt(
+    'local_cache_time',
+    default=30,
+    min=1,
+    help=utils.fmt("""
+Time to keep entries of token validation data in the local cache of each
+keystone process, in seconds. This bounds how long changes made by other
+processes may go unnoticed. This has no effect unless `[token]
+local_cache_size` is set.
+"""))
+
 revoke_by_id = cfg.BoolOpt(
     'revoke_by_id',
     default=True,
@@ -133,6 +158,28 @@ the built-in expiry time. This allows long running operations to succeed.
 Defaults to two days.
 """))
 
+validate_batch_size = cfg.IntOpt(
+    'validate_batch_size',
+    default=100,
+    min=1,
+    help=utils.fmt("""
+The maximum number of tokens that can be validated with a single request to
+`POST /v3/auth/tokens/validate`. Larger batches save more round trips to the
+cache and the database, but make each request take longer.
+"""))
+
+cache_rendered_responses = cfg.BoolOpt(
+    'cache_rendered_responses',
+    default=False,
+    help=utils.fmt("""
+Enable caching the rendered bodies of token validation responses, along with
+their JSON encoding, so that validating a token again doesn't build the
+response, including its service catalog, all over again. Cached bodies are
+discarded along with the cached token, and whenever the catalog or the service
+providers change. This option has no effect unless global caching and token
+caching are enabled.
+"""))
+
 
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
@@ -140,11 +187,15 @@ ALL_OPTS = [
     provider,
     caching,
     cache_time,
+    local_cache_size,
+    local_cache_time,
     revoke_by_id,
     allow_rescope_scoped_token,
     infer_roles,
     cache_on_issue,
     allow_expired_window,
+    validate_batch_size,
+    cache_rendered_responses,
 ]
 
 
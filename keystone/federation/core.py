@@ -16,6 +16,7 @@ import uuid
 
 from oslo_log import log
 
+from keystone import catalog
 from keystone.common import cache
 from keystone.common import driver_hints
 from keystone.common import manager
@@ -148,18 +149,35 @@ class Manager(manager.Manager):
         service_providers = self.driver.get_enabled_service_providers()
         return [normalize(sp) for sp in service_providers]
 
+    def warm_cache(self, budget):
+        """Load the enabled service providers into the cache.
+
+        :param budget: a :class:`keystone.common.cache._warm.Budget`
+        :returns: the number of entries loaded
+
+        """
+        # The enabled service providers are cached as a single entry.
+        budget.take([self.get_enabled_service_providers.refresh(self)])
+        return 1
+
+    def _invalidate_service_providers(self):
+        self.get_enabled_service_providers.invalidate(self)
+        # Service providers are rendered in tokens along with the service
+        # catalog, so anything derived from the catalog is stale as well.
+        catalog.COMPUTED_CATALOG_REGION.invalidate()
+
     def create_sp(self, sp_id, service_provider):
         sp_ref = self.driver.create_sp(sp_id, service_provider)
-        self.get_enabled_service_providers.invalidate(self)
+        self._invalidate_service_providers()
         return sp_ref
 
     def delete_sp(self, sp_id):
         self.driver.delete_sp(sp_id)
-        self.get_enabled_service_providers.invalidate(self)
+        self._invalidate_service_providers()
 
     def update_sp(self, sp_id, service_provider):
         sp_ref = self.driver.update_sp(sp_id, service_provider)
-        self.get_enabled_service_providers.invalidate(self)
+        self._invalidate_service_providers()
         return sp_ref
 
     def evaluate(self, idp_id, protocol_id, assertion_data):
@@ -248,6 +248,19 @@ class IdentityDriverBase(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def list_users_in_groups(self, group_ids):
+        """List the users in several groups at once.
+
+        :param list group_ids: group IDs.
+
+        :returns: a dictionary mapping the ID of each group found to the list
+                  of the users in it, the IDs of groups that don't exist are
+                  ignored. See user schema in :class:`~.IdentityDriverBase`.
+        :rtype: dict
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
+
     @abc.abstractmethod
     def get_user(self, user_id):
         """Get a user by ID.
@@ -415,6 +428,32 @@ class IdentityDriverBase(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def list_users_from_ids(self, user_ids):
+        """List the users with the given IDs.
+
+        :param list user_ids: user IDs.
+
+        :returns: a list of the users found, the IDs of users that don't
+                  exist are ignored. See user schema in
+                  :class:`~.IdentityDriverBase`.
+        :rtype: list of dict
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
+
+    def list_groups_from_ids(self, group_ids):
+        """List the groups with the given IDs.
+
+        :param list group_ids: group IDs.
+
+        :returns: a list of the groups found, the IDs of groups that don't
+                  exist are ignored. See group schema in
+                  :class:`~.IdentityDriverBase`.
+        :rtype: list of dict
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
+
     @abc.abstractmethod
     def get_group_by_name(self, group_name, domain_id):
         """Get a group by name.
@@ -1285,6 +1285,36 @@ class BaseLdap(object):
     def _dn_to_id(dn):
         return utf8_decode(ldap.dn.str2dn(utf8_encode(dn))[0][0][1])
 
+    def _ids_filter(self, object_ids):
+        """Return a search filter matching any of the given IDs."""
+        return u'(|%s)' % u''.join(
+            u'(%s=%s)' % (self.id_attr,
+                          ldap.filter.escape_filter_chars(
+                              six.text_type(object_id)))
+            for object_id in object_ids)
+
+    @staticmethod
+    def _match_ids(object_ids, found):
+        """Match the objects found by an ID search to the requested IDs.
+
+        The directory may match the IDs case insensitively, so the IDs found
+        are compared with the requested ones regardless of case.
+
+        :param object_ids: the requested IDs
+        :param found: an iterable of pairs of an ID found and its value
+        :returns: a dictionary mapping each requested ID that was found to
+                  its value
+
+        """
+        found = dict((six.text_type(found_id).lower(), value)
+                     for found_id, value in found)
+        matched = {}
+        for object_id in object_ids:
+            value = found.get(six.text_type(object_id).lower())
+            if value is not None:
+                matched[object_id] = value
+        return matched
+
     def _ldap_res_to_model(self, res):
         # LDAP attribute names may be returned in a different case than
         # they are defined in the mapping, so we need to check for keys
@@ -12,6 +12,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 from __future__ import absolute_import
+import itertools
 import uuid
 
 import ldap.filter
@@ -38,6 +39,9 @@ READ_ONLY_LDAP_ERROR_MESSAGE = _("LDAP does not support write operations")
 
 LDAP_MATCHING_RULE_IN_CHAIN = "1.2.840.113556.1.4.1941"
 
+# The number of IDs searched for at once, to keep the search filters short.
+_IDS_PER_SEARCH = 100
+
 
 class Identity(base.IdentityDriverBase):
     def __init__(self, conf=None):
@@ -136,6 +140,28 @@ class Identity(base.IdentityDriverBase):
                 LOG.debug(msg, dict(user_id=user_id, group_id=group_id))
         return users
 
+    def list_users_in_groups(self, group_ids):
+        group_members = self.group.list_groups_users(group_ids)
+        member_ids = dict(
+            (group_id, list(self._transform_group_member_ids(members)))
+            for group_id, members in group_members.items())
+        users = self.user.get_filtered_by_ids(
+            set(itertools.chain.from_iterable(member_ids.values())))
+
+        group_users = {}
+        for group_id, user_ids in member_ids.items():
+            group_users[group_id] = []
+            for user_id in user_ids:
+                try:
+                    group_users[group_id].append(users[user_id])
+                except KeyError:
+                    msg = ('Group member `%(user_id)s` for group '
+                           '`%(group_id)s` not found in the directory. The '
+                           'user should be removed from the group. The user '
+                           'will be ignored.')
+                    LOG.debug(msg, dict(user_id=user_id, group_id=group_id))
+        return group_users
+
     def check_user_in_group(self, user_id, group_id):
         # Before doing anything, check that the user exists. This will raise
         # a not found error if the user doesn't exist so we avoid doing extra
@@ -314,6 +340,23 @@ class UserApi(common_ldap.EnabledEmuMixIn, common_ldap.BaseLdap):
         user = self.get(user_id)
         return self.filter_attributes(user)
 
+    def get_filtered_by_ids(self, user_ids):
+        """Return the users with the given IDs, with a search per batch.
+
+        :returns: a dictionary mapping each of the given IDs that was found
+                  to the user
+
+        """
+        user_ids = list(user_ids)
+        users = []
+        for i in range(0, len(user_ids), _IDS_PER_SEARCH):
+            query = (self.ldap_filter or '') + self._ids_filter(
+                user_ids[i:i + _IDS_PER_SEARCH])
+            users += [self.filter_attributes(user)
+                      for user in self.get_all(query)]
+        return self._match_ids(user_ids,
+                               ((user['id'], user) for user in users))
+
     def get_all(self, ldap_filter=None, hints=None):
         objs = super(UserApi, self).get_all(ldap_filter=ldap_filter,
                                             hints=hints)
@@ -455,6 +498,46 @@ class GroupApi(common_ldap.BaseLdap):
                 users.append(user_dn)
         return users
 
+    def list_groups_users(self, group_ids):
+        """Return the user dns which are members of several groups.
+
+        The groups are read with a search per batch of groups, unless nested
+        groups are searched for, which takes a search per group.
+
+        :returns: a dictionary mapping the ID of each group found to the list
+                  of user dns which are members of it
+
+        """
+        if self.group_ad_nesting:
+            users = {}
+            for group_id in group_ids:
+                try:
+                    users[group_id] = self.list_group_users(group_id)
+                except exception.GroupNotFound:
+                    continue
+            return users
+
+        group_ids = list(group_ids)
+        found = []
+        for i in range(0, len(group_ids), _IDS_PER_SEARCH):
+            query = u'(&(objectClass=%s)%s%s)' % (
+                self.object_class, self.ldap_filter or '',
+                self._ids_filter(group_ids[i:i + _IDS_PER_SEARCH]))
+            with self.get_connection() as conn:
+                try:
+                    res = conn.search_s(
+                        self.tree_dn, self.LDAP_SCOPE, query,
+                        [self.id_attr, self.member_attribute])
+                except ldap.NO_SUCH_OBJECT:
+                    continue
+            for dn, attrs in res:
+                attrs = dict((name.lower(), values)
+                             for name, values in attrs.items())
+                members = list(attrs.get(self.member_attribute.lower(), []))
+                found += [(value, members)
+                          for value in attrs.get(self.id_attr.lower(), [])]
+        return self._match_ids(group_ids, found)
+
     def get_filtered(self, group_id):
         group = self.get(group_id)
         return common_ldap.filter_entity(group)
@@ -188,6 +188,14 @@ class Identity(base.IdentityDriverBase):
             return base.filter_user(
                 self._get_user(session, user_id).to_dict())
 
+    def list_users_from_ids(self, user_ids):
+        if not user_ids:
+            return []
+        with sql.session_for_read() as session:
+            query = session.query(model.User)
+            query = query.filter(model.User.id.in_(user_ids))
+            return [base.filter_user(ref.to_dict()) for ref in query.all()]
+
     def get_user_by_name(self, user_name, domain_id):
         with sql.session_for_read() as session:
             query = session.query(model.User).join(model.LocalUser)
@@ -333,6 +341,26 @@ class Identity(base.IdentityDriverBase):
             query = sql.filter_limit_query(model.User, query, hints)
             return [base.filter_user(u.to_dict()) for u in query]
 
+    def list_users_in_groups(self, group_ids):
+        if not group_ids:
+            return {}
+        with sql.session_for_read() as session:
+            query = session.query(model.Group.id)
+            query = query.filter(model.Group.id.in_(group_ids))
+            users = dict((group_id, []) for group_id, in query)
+            if not users:
+                return users
+
+            query = session.query(model.UserGroupMembership.group_id,
+                                  model.User)
+            query = query.join(model.User, model.User.id ==
+                               model.UserGroupMembership.user_id)
+            query = query.filter(
+                model.UserGroupMembership.group_id.in_(list(users)))
+            for group_id, user_ref in query:
+                users[group_id].append(base.filter_user(user_ref.to_dict()))
+            return users
+
     @oslo_db_api.wrap_db_retry(retry_on_deadlock=True)
     def delete_user(self, user_id):
         with sql.session_for_write() as session:
@@ -370,6 +398,14 @@ class Identity(base.IdentityDriverBase):
         with sql.session_for_read() as session:
             return self._get_group(session, group_id).to_dict()
 
+    def list_groups_from_ids(self, group_ids):
+        if not group_ids:
+            return []
+        with sql.session_for_read() as session:
+            query = session.query(model.Group)
+            query = query.filter(model.Group.id.in_(group_ids))
+            return [ref.to_dict() for ref in query.all()]
+
     def get_group_by_name(self, group_name, domain_id):
         with sql.session_for_read() as session:
             query = session.query(model.Group)
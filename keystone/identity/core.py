@@ -14,6 +14,7 @@
 
 """Main entry point into the Identity service."""
 
+import collections
 import copy
 import functools
 import itertools
@@ -48,6 +49,7 @@ LOG = log.getLogger(__name__)
 PROVIDERS = provider_api.ProviderAPIs
 
 MEMOIZE = cache.get_memoization_decorator(group='identity')
+MEMOIZE_NOT_FOUND = cache.get_not_found_cache_decorator(group='identity')
 
 ID_MAPPING_REGION = cache.create_region(name='id mapping')
 MEMOIZE_ID_MAPPING = cache.get_memoization_decorator(group='identity',
@@ -956,11 +958,15 @@ class Manager(manager.Manager):
         user['id'] = uuid.uuid4().hex
         ref = driver.create_user(user['id'], user)
         notifications.Audit.created(self._USER, user['id'], initiator)
-        return self._set_domain_id_and_mapping(
+        ref = self._set_domain_id_and_mapping(
             ref, domain_id, driver, mapping.EntityType.USER)
+        # Forget that the user didn't exist, if that was cached.
+        self.get_user.invalidate(self, ref['id'])
+        return ref
 
     @domains_configured
     @exception_translated('user')
+    @MEMOIZE_NOT_FOUND
     @MEMOIZE
     def get_user(self, user_id):
         domain_id, driver, entity_id = (
@@ -969,6 +975,54 @@ class Manager(manager.Manager):
         return self._set_domain_id_and_mapping(
             ref, domain_id, driver, mapping.EntityType.USER)
 
+    def _get_entities_from_ids(self, entity_ids, entity_type):
+        # The entities can only be read with a single driver call when they
+        # all are in the default backend, under their public IDs.
+        if (not CONF.identity.domain_specific_drivers_enabled and
+                not self._needs_post_processing(self.driver)):
+            if entity_type == mapping.EntityType.USER:
+                list_from_ids = self.driver.list_users_from_ids
+            else:
+                list_from_ids = self.driver.list_groups_from_ids
+            try:
+                refs = list_from_ids(list(entity_ids))
+            except exception.NotImplemented:
+                pass
+            else:
+                return dict((ref['id'], ref) for ref in refs)
+
+        if entity_type == mapping.EntityType.USER:
+            get_entity = self.get_user
+        else:
+            get_entity = self.get_group
+        entities = {}
+        for entity_id in entity_ids:
+            try:
+                entities[entity_id] = get_entity(entity_id)
+            except exception.NotFound:
+                continue
+        return entities
+
+    def get_users(self, user_ids):
+        """Get several users at once.
+
+        This reads and fills the same cache entries as :meth:`get_user`. The
+        users missing from the cache are read with a single driver call if
+        they all are in a single backend which doesn't need ID mapping, or one
+        at a time with :meth:`get_user` otherwise.
+
+        :param user_ids: an iterable of user IDs
+        :returns: a dictionary mapping the ID of each user found to the user,
+                  users that don't exist are omitted
+
+        """
+        def fetch(missed_ids):
+            return self._get_entities_from_ids(missed_ids,
+                                               mapping.EntityType.USER)
+
+        return cache.get_memoized_by_ids(cache.CACHE_REGION, MEMOIZE,
+                                         self.get_user, self, user_ids, fetch)
+
     def assert_user_enabled(self, user_id, user=None):
         """Assert the user and the user's domain are enabled.
 
@@ -1122,7 +1176,8 @@ class Manager(manager.Manager):
                 'enforced accordingly the next time they authenticate or '
                 'validate a token.' % {'user_id': user_id}
             )
-            notifications.invalidate_token_cache_notification(reason)
+            notifications.invalidate_token_cache_notification(
+                reason, user_id=user_id)
 
         return self._set_domain_id_and_mapping(
             ref, domain_id, driver, mapping.EntityType.USER)
@@ -1154,9 +1209,9 @@ class Manager(manager.Manager):
         PROVIDERS.id_mapping_api.delete_id_mapping(user_id)
         notifications.Audit.deleted(self._USER, user_id, initiator)
 
-        # Invalidate user role assignments cache region, as it may be caching
-        # role assignments where the actor is the specified user
-        assignment.COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        # Invalidate the role assignments computed for the user, where the
+        # actor is the specified user
+        assignment.invalidate_computed_assignments(user_ids=[user_id])
 
     @domains_configured
     @exception_translated('group')
@@ -1192,6 +1247,26 @@ class Manager(manager.Manager):
         return self._set_domain_id_and_mapping(
             ref, domain_id, driver, mapping.EntityType.GROUP)
 
+    def get_groups(self, group_ids):
+        """Get several groups at once.
+
+        This reads and fills the same cache entries as :meth:`get_group`,
+        and reads the groups missing from the cache as :meth:`get_users`
+        reads users.
+
+        :param group_ids: an iterable of group IDs
+        :returns: a dictionary mapping the ID of each group found to the
+                  group, groups that don't exist are omitted
+
+        """
+        def fetch(missed_ids):
+            return self._get_entities_from_ids(missed_ids,
+                                               mapping.EntityType.GROUP)
+
+        return cache.get_memoized_by_ids(cache.CACHE_REGION, MEMOIZE,
+                                         self.get_group, self, group_ids,
+                                         fetch)
+
     @domains_configured
     @exception_translated('group')
     def get_group_by_name(self, group_name, domain_id):
@@ -1224,7 +1299,7 @@ class Manager(manager.Manager):
         roles = PROVIDERS.assignment_api.list_role_assignments(
             group_id=group_id
         )
-        user_ids = (u['id'] for u in self.list_users_in_group(group_id))
+        user_ids = [u['id'] for u in self.list_users_in_group(group_id)]
         driver.delete_group(entity_id)
         self.get_group.invalidate(self, group_id)
         PROVIDERS.id_mapping_api.delete_id_mapping(group_id)
@@ -1238,10 +1313,14 @@ class Manager(manager.Manager):
         if roles:
             for user_id in user_ids:
                 self._persist_revocation_event_for_user(user_id)
+            PROVIDERS.assignment_api.refresh_effective_assignments(
+                user_ids=user_ids)
 
-        # Invalidate user role assignments cache region, as it may be caching
-        # role assignments expanded from the specified group to its users
-        assignment.COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        # Invalidate the role assignments computed for the users of the group,
+        # as they may include role assignments expanded from the group, and
+        # the cached tokens of its federated users
+        assignment.invalidate_computed_assignments(
+            user_ids=user_ids, group_ids=[group_id] if roles else None)
 
     @domains_configured
     @exception_translated('group')
@@ -1261,10 +1340,12 @@ class Manager(manager.Manager):
             user_entity_id, user_driver, group_entity_id, group_driver)
 
         group_driver.add_user_to_group(user_entity_id, group_entity_id)
+        PROVIDERS.assignment_api.refresh_effective_assignments(
+            user_ids=[user_id])
 
-        # Invalidate user role assignments cache region, as it may now need to
-        # include role assignments from the specified group to its users
-        assignment.COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        # Invalidate the role assignments computed for the user, as they may
+        # now need to include role assignments from the specified group
+        assignment.invalidate_computed_assignments(user_ids=[user_id])
         notifications.Audit.added_to(self._GROUP, group_id, self._USER,
                                      user_id, initiator)
 
@@ -1287,10 +1368,12 @@ class Manager(manager.Manager):
 
         group_driver.remove_user_from_group(user_entity_id, group_entity_id)
         self._persist_revocation_event_for_user(user_id)
+        PROVIDERS.assignment_api.refresh_effective_assignments(
+            user_ids=[user_id])
 
-        # Invalidate user role assignments cache region, as it may be caching
-        # role assignments expanded from this group to this user
-        assignment.COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        # Invalidate the role assignments computed for the user, as they may
+        # include role assignments expanded from this group
+        assignment.invalidate_computed_assignments(user_ids=[user_id])
         notifications.Audit.removed_from(self._GROUP, group_id, self._USER,
                                          user_id, initiator)
 
@@ -1356,6 +1439,49 @@ class Manager(manager.Manager):
         return self._set_domain_id_and_mapping(
             ref_list, domain_id, driver, mapping.EntityType.USER)
 
+    @domains_configured
+    def list_users_in_groups(self, group_ids):
+        """List the users in several groups at once.
+
+        The memberships of the groups handled by the same identity driver are
+        read with a single driver call, or one call per group if the driver
+        can't read several at once.
+
+        :param group_ids: an iterable of group IDs
+        :returns: a dictionary mapping the ID of each group found to the list
+                  of the users in it, groups that don't exist are omitted
+
+        """
+        group_ids_by_driver = collections.defaultdict(dict)
+        for group_id in set(group_ids):
+            try:
+                domain_id, driver, entity_id = (
+                    self._get_domain_driver_and_entity_id(group_id))
+            except exception.PublicIDNotFound:
+                continue
+            group_ids_by_driver[(domain_id, driver)][entity_id] = group_id
+
+        users = {}
+        for (domain_id, driver), public_ids in group_ids_by_driver.items():
+            try:
+                ref_lists = driver.list_users_in_groups(list(public_ids))
+            except exception.NotImplemented:
+                ref_lists = {}
+                for entity_id in public_ids:
+                    try:
+                        ref_lists[entity_id] = driver.list_users_in_group(
+                            entity_id, driver_hints.Hints())
+                    except exception.GroupNotFound:
+                        continue
+            for entity_id, ref_list in ref_lists.items():
+                if entity_id not in public_ids:
+                    # The backend matched the ID case insensitively.
+                    continue
+                users[public_ids[entity_id]] = (
+                    self._set_domain_id_and_mapping(
+                        ref_list, domain_id, driver, mapping.EntityType.USER))
+        return users
+
     @domains_configured
     @exception_translated('group')
     def check_user_in_group(self, user_id, group_id):
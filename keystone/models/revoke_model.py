@@ -10,6 +10,10 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import collections
+import heapq
+import itertools
+
 from oslo_log import log
 from oslo_serialization import msgpackutils
 from oslo_utils import timeutils
@@ -145,7 +149,42 @@ def is_revoked(events, token_data):
               match any revocation events, meaning the token is considered
               valid by the revocation API.
     """
-    return any([matches(e, token_data) for e in events])
+    return any(matches(e, token_data) for e in events)
+
+
+def targets(event, token_values):
+    """See if the revocation event could apply to the token at all.
+
+    This is the pre-filtering that the backends perform when listing the
+    revocation events of a single token: the event must have been issued after
+    the token, and the event's user, project and audit ID must either be unset
+    or match the token. Events passing this check still need to be compared
+    with the token using :func:`matches`.
+
+    :param event: a RevokeEvent instance
+    :param token_values: dictionary with set of values taken from the
+                         token
+    :returns: True if the event targets the token
+
+    """
+    if event.issued_before < token_values['issued_at']:
+        return False
+
+    if event.user_id is not None and event.user_id not in (
+            token_values['user_id'],
+            token_values['trustor_id'],
+            token_values['trustee_id'],):
+        return False
+
+    if event.project_id is not None and event.project_id not in (
+            token_values['project_id'],):
+        return False
+
+    if event.audit_id is not None and event.audit_id not in (
+            token_values['audit_id'],):
+        return False
+
+    return True
 
 
 def matches(event, token_values):
@@ -204,6 +243,152 @@ def matches(event, token_values):
     return True
 
 
+# Event attributes used to index events in a RevokeIndex, most selective
+# first. An event is filed under the first of these attributes it has a value
+# for.
+_INDEX_NAMES = ['audit_id',
+                'audit_chain_id',
+                'trust_id',
+                'consumer_id',
+                'user_id',
+                'project_id',
+                'domain_scope_id',
+                'domain_id',
+                'role_id']
+
+# Immutable, hashable form of a RevokeEvent kept in a RevokeIndex. It has the
+# same attributes as a RevokeEvent so it can be passed to `matches`.
+_CompactEvent = collections.namedtuple('_CompactEvent',
+                                       _EVENT_NAMES + _EVENT_ARGS)
+
+
+def _compact(event):
+    return _CompactEvent(*[getattr(event, name)
+                           for name in _CompactEvent._fields])
+
+
+def _token_index_values(name, token_values):
+    if name == 'role_id':
+        return token_values.get('roles') or []
+    return [token_values.get(key) for key in ALTERNATIVES.get(name, [name])]
+
+
+class RevokeIndex(object):
+    """In-memory set of revocation events indexed by the values they revoke.
+
+    Each event is filed under the most selective attribute it has a value for
+    (see `_INDEX_NAMES`), events without any of these attributes are kept
+    apart. Checking a token then only compares it with the events filed under
+    one of its own values, instead of every known event.
+
+    The index is not thread-safe, callers are expected to serialize access.
+
+    """
+
+    def __init__(self):
+        self._events = set()
+        self._index = {name: collections.defaultdict(set)
+                       for name in _INDEX_NAMES}
+        self._unindexed = set()
+        # Events ordered by revoked_at, so expired events can be pruned
+        # without scanning the whole index.
+        self._by_age = []
+        self._counter = itertools.count()
+        # The most recent revoked_at of all the events added so far.
+        self.watermark = None
+
+    def __len__(self):
+        return len(self._events)
+
+    def _bucket(self, event):
+        for name in _INDEX_NAMES:
+            value = getattr(event, name)
+            if value is not None:
+                return self._index[name], value
+        return None, None
+
+    def add(self, events, update_watermark=True):
+        """Add revocation events to the index, ignoring known events.
+
+        :param events: an iterable of RevokeEvent instances
+        :param update_watermark: whether the events may move the watermark,
+                                 which is only meant for events read from the
+                                 backend, as the next reads start from it
+        :returns: the number of events that were not known yet
+
+        """
+        added = 0
+        for event in events:
+            event = _compact(event)
+            if update_watermark and (self.watermark is None or
+                                     event.revoked_at > self.watermark):
+                self.watermark = event.revoked_at
+            if event in self._events:
+                continue
+            self._events.add(event)
+            buckets, value = self._bucket(event)
+            if buckets is None:
+                self._unindexed.add(event)
+            else:
+                buckets[value].add(event)
+            heapq.heappush(self._by_age,
+                           (event.revoked_at, next(self._counter), event))
+            added += 1
+        return added
+
+    def prune(self, oldest):
+        """Remove the events revoked before `oldest`.
+
+        :param oldest: datetime before which events no longer apply to any
+                       valid token
+        :returns: the number of events removed
+
+        """
+        removed = 0
+        while self._by_age and self._by_age[0][0] < oldest:
+            event = heapq.heappop(self._by_age)[2]
+            self._events.discard(event)
+            buckets, value = self._bucket(event)
+            if buckets is None:
+                self._unindexed.discard(event)
+            else:
+                buckets[value].discard(event)
+                # Drop emptied buckets so the index does not keep growing
+                # with the values of long gone events.
+                if not buckets[value]:
+                    del buckets[value]
+            removed += 1
+        return removed
+
+    def candidates(self, token_values):
+        """Return the events that could revoke the token.
+
+        :param token_values: dictionary with set of values taken from the
+                             token
+        :returns: list of events filed under one of the token's values
+
+        """
+        events = list(self._unindexed)
+        for name, buckets in self._index.items():
+            for value in set(_token_index_values(name, token_values)):
+                if value is not None and value in buckets:
+                    events.extend(buckets[value])
+        return events
+
+    def is_revoked(self, token_values):
+        """Check if a token matches any of the events in the index.
+
+        :param token_values: dictionary with set of values taken from the
+                             token
+        :returns: True if the token has been revoked
+
+        """
+        return is_revoked(
+            (e for e in self.candidates(token_values)
+             if targets(e, token_values)),
+            token_values)
+
+
 def build_token_values(token):
 
     token_expires_at = timeutils.parse_isotime(token.expires_at)
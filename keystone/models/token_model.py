@@ -78,6 +78,8 @@ class TokenModel(object):
         self.application_credential_id = None
         self.__application_credential = None
 
+        self.__roles = None
+
     def __repr__(self):
         """Return string representation of TokenModel."""
         desc = ('<%(type)s (audit_id=%(audit_id)s, '
@@ -305,14 +307,11 @@ class TokenModel(object):
             set([x['role_id'] for x in trustor_assignments])
         )
 
-        for trust_role_id in effective_trust_role_ids:
-            if trust_role_id in current_effective_trustor_roles:
-                role = PROVIDERS.role_api.get_role(trust_role_id)
-                if role['domain_id'] is None:
-                    roles.append(role)
-            else:
-                raise exception.Forbidden(
-                    _('Trustee has no delegated roles.'))
+        if not effective_trust_role_ids <= current_effective_trustor_roles:
+            raise exception.Forbidden(_('Trustee has no delegated roles.'))
+        for role in self._get_roles(effective_trust_role_ids):
+            if role['domain_id'] is None:
+                roles.append(role)
 
         return roles
 
@@ -363,14 +362,29 @@ class TokenModel(object):
         # logic since they are both considered unique. By using `in` we're
         # performing a containment check, which also does a deep comparison
         # of the objects, which is what we want.
+        role_refs = self._get_roles(
+            [role for role in federated_roles if not isinstance(role, dict)])
+        role_refs = iter(role_refs)
         for role in federated_roles:
             if not isinstance(role, dict):
-                role = PROVIDERS.role_api.get_role(role)
+                role = next(role_refs)
             if role not in roles:
                 roles.append(role)
 
         return roles
 
+    @staticmethod
+    def _get_roles(role_ids):
+        # Look up all the roles at once, in the order of their IDs.
+        role_refs = PROVIDERS.role_api.get_roles(role_ids)
+        roles = []
+        for role_id in role_ids:
+            try:
+                roles.append(role_refs[role_id])
+            except KeyError:
+                raise exception.RoleNotFound(role_id=role_id)
+        return roles
+
     def _get_domain_roles(self):
         roles = []
         domain_roles = (
@@ -378,8 +392,7 @@ class TokenModel(object):
                 self.user_id, self.domain_id
             )
         )
-        for role_id in domain_roles:
-            role = PROVIDERS.role_api.get_role(role_id)
+        for role in self._get_roles(domain_roles):
             roles.append({'id': role['id'], 'name': role['name']})
 
         return roles
@@ -391,8 +404,7 @@ class TokenModel(object):
                 self.user_id, self.project_id
             )
         )
-        for role_id in project_roles:
-            r = PROVIDERS.role_api.get_role(role_id)
+        for r in self._get_roles(project_roles):
             roles.append({'id': r['id'], 'name': r['name']})
 
         return roles
@@ -413,6 +425,11 @@ class TokenModel(object):
 
     @property
     def roles(self):
+        # Roles are resolved once per token, like the entities above, and kept
+        # along with the token when it is cached. The token provider discards
+        # cached tokens once their roles could have changed.
+        if self.__roles is not None:
+            return self.__roles
         if self.system_scoped:
             roles = self._get_system_roles()
         elif self.trust_scoped:
@@ -427,6 +444,7 @@ class TokenModel(object):
             roles = self._get_project_roles()
         else:
             roles = []
+        self.__roles = roles
         return roles
 
     def _validate_token_resources(self):
@@ -516,14 +534,13 @@ class TokenModel(object):
             # Go through each of the effective trust roles, making sure the
             # trustor still has them, if any have been removed, then we
             # will treat the trust as invalid
-            for trust_role_id in effective_trust_role_ids:
-                if trust_role_id in current_effective_trustor_roles:
-                    role = PROVIDERS.role_api.get_role(trust_role_id)
-                    if role['domain_id'] is None:
-                        trust_roles.append(role)
-                else:
-                    raise exception.Forbidden(
-                        _('Trustee has no delegated roles.'))
+            if not (effective_trust_role_ids <=
+                    current_effective_trustor_roles):
+                raise exception.Forbidden(
+                    _('Trustee has no delegated roles.'))
+            for role in self._get_roles(effective_trust_role_ids):
+                if role['domain_id'] is None:
+                    trust_roles.append(role)
 
     def mint(self, token_id, issued_at):
         """Set the ``id`` and ``issued_at`` attributes of a token.
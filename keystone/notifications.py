@@ -179,12 +179,23 @@ class Audit(object):
                   public, reason)
 
 
-def invalidate_token_cache_notification(reason):
+def invalidate_token_cache_notification(reason, user_id=None,
+                                        project_id=None, domain_id=None,
+                                        trust_id=None, group_id=None):
     """A specific notification for invalidating the token cache.
 
     :param reason: The specific reason why the token cache is being
                    invalidated.
     :type reason: string
+    :param user_id: Only invalidate the cached tokens of this user.
+    :param project_id: Only invalidate the cached tokens bound to this
+                       project.
+    :param domain_id: Only invalidate the cached tokens bound to this domain.
+    :param trust_id: Only invalidate the cached tokens of this trust.
+    :param group_id: Only invalidate the cached federated tokens of this
+                     group.
+
+    If none of the IDs are given, the whole token cache is invalidated.
 
     """
     # Since keystone does a lot of work in the authentication and validation
@@ -196,7 +207,10 @@ def invalidate_token_cache_notification(reason):
     # cache DRY, instead of have each subsystem implement their own token cache
     # invalidation strategy or callbacks.
     LOG.debug(reason)
-    resource_id = None
+    scope = {'user_id': user_id, 'project_id': project_id,
+             'domain_id': domain_id, 'trust_id': trust_id,
+             'group_id': group_id}
+    resource_id = dict((k, v) for k, v in scope.items() if v) or None
     initiator = None
     public = False
     Audit._emit(
@@ -608,39 +622,81 @@ class CadfRoleAssignmentNotificationWrapper(object):
             """
             call_args = inspect.getcallargs(
                 f, wrapped_self, role_id, *args, **kwargs)
-            inherited = call_args['inherited_to_projects']
             context = call_args['context']
 
             initiator = _get_request_audit_info(context)
-            target = resource.Resource(typeURI=taxonomy.ACCOUNT_USER)
+            audit_kwargs = self._get_audit_kwargs(call_args)
 
-            audit_kwargs = {}
-            if call_args['project_id']:
-                audit_kwargs['project'] = call_args['project_id']
-            elif call_args['domain_id']:
-                audit_kwargs['domain'] = call_args['domain_id']
+            try:
+                result = f(wrapped_self, role_id, *args, **kwargs)
+            except Exception:
+                self._send(initiator, taxonomy.OUTCOME_FAILURE, [audit_kwargs])
+                raise
+            else:
+                self._send(initiator, taxonomy.OUTCOME_SUCCESS, [audit_kwargs])
+                return result
 
-            if call_args['user_id']:
-                audit_kwargs['user'] = call_args['user_id']
-            elif call_args['group_id']:
-                audit_kwargs['group'] = call_args['group_id']
+        return wrapper
 
-            audit_kwargs['inherited_to_projects'] = inherited
-            audit_kwargs['role'] = role_id
+    @staticmethod
+    def _get_audit_kwargs(grant):
+        audit_kwargs = {}
+        if grant.get('project_id'):
+            audit_kwargs['project'] = grant['project_id']
+        elif grant.get('domain_id'):
+            audit_kwargs['domain'] = grant['domain_id']
+
+        if grant.get('user_id'):
+            audit_kwargs['user'] = grant['user_id']
+        elif grant.get('group_id'):
+            audit_kwargs['group'] = grant['group_id']
+
+        audit_kwargs['inherited_to_projects'] = grant.get(
+            'inherited_to_projects', False)
+        audit_kwargs['role'] = grant.get('role_id')
+        return audit_kwargs
+
+    def _send(self, initiator, outcome, audit_kwargs_list):
+        target = resource.Resource(typeURI=taxonomy.ACCOUNT_USER)
+        for audit_kwargs in audit_kwargs_list:
+            _send_audit_notification(self.action, initiator, outcome,
+                                     target, self.event_type, **audit_kwargs)
+
+
+class CadfRoleAssignmentsNotificationWrapper(
+        CadfRoleAssignmentNotificationWrapper):
+    """Send CADF notifications for methods handling several role assignments.
+
+    The wrapped method takes a list of grants, as dictionaries with the
+    arguments of ``create_grant`` (or ``delete_grant``), and a ``context``.
+    Once it returns, or raises, one notification is sent for each distinct
+    grant, with the same ``action``, ``event_type`` and initiator as those of
+    :class:`CadfRoleAssignmentNotificationWrapper`, so that a batch of grants
+    is audited as if they had been made one by one, without sending anything
+    before all of them are made.
+
+    :param operation: one of the values from ACTIONS (created or deleted)
+    """
+
+    def __call__(self, f):
+        @functools.wraps(f)
+        def wrapper(wrapped_self, grants, context=None):
+            initiator = _get_request_audit_info(context)
+            audit_kwargs_list = []
+            for grant in grants:
+                audit_kwargs = self._get_audit_kwargs(grant)
+                if audit_kwargs not in audit_kwargs_list:
+                    audit_kwargs_list.append(audit_kwargs)
 
             try:
-                result = f(wrapped_self, role_id, *args, **kwargs)
+                result = f(wrapped_self, grants, context=context)
             except Exception:
-                _send_audit_notification(self.action, initiator,
-                                         taxonomy.OUTCOME_FAILURE,
-                                         target, self.event_type,
-                                         **audit_kwargs)
+                self._send(initiator, taxonomy.OUTCOME_FAILURE,
+                           audit_kwargs_list)
                 raise
             else:
-                _send_audit_notification(self.action, initiator,
-                                         taxonomy.OUTCOME_SUCCESS,
-                                         target, self.event_type,
-                                         **audit_kwargs)
+                self._send(initiator, taxonomy.OUTCOME_SUCCESS,
+                           audit_kwargs_list)
                 return result
 
         return wrapper
@@ -779,3 +835,4 @@ emit_event = CadfNotificationWrapper
 
 
 role_assignment = CadfRoleAssignmentNotificationWrapper
+role_assignments = CadfRoleAssignmentsNotificationWrapper
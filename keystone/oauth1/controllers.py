@@ -140,7 +140,8 @@ class AccessTokenCrudV3(controller.V3Controller):
             'accordingly the next time they authenticate or validate a '
             'token.' % {'consumer_id': access_token['consumer_id']}
         )
-        notifications.invalidate_token_cache_notification(reason)
+        notifications.invalidate_token_cache_notification(
+            reason, user_id=user_id)
         return PROVIDERS.oauth_api.delete_access_token(
             user_id, access_token_id, initiator=request.audit_initiator
         )
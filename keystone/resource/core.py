@@ -33,6 +33,7 @@ from keystone.token import provider as token_provider
 CONF = keystone.conf.CONF
 LOG = log.getLogger(__name__)
 MEMOIZE = cache.get_memoization_decorator(group='resource')
+MEMOIZE_NOT_FOUND = cache.get_not_found_cache_decorator(group='resource')
 PROVIDERS = provider_api.ProviderAPIs
 
 
@@ -232,8 +233,16 @@ class Manager(manager.Manager):
             self.get_project.set(ret, self, project_id)
             self.get_project_by_name.set(ret, self, ret['name'],
                                          ret['domain_id'])
+            if ret.get('is_domain'):
+                self.get_domain.set(self._get_domain_from_project(ret), self,
+                                    project_id)
 
-        assignment.COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        if not ret.get('is_domain'):
+            # The project inherits the assignments of its parents.
+            PROVIDERS.assignment_api.refresh_effective_assignments(
+                project_ids=[project_id])
+        # The project may be listed for users with inherited assignments.
+        assignment.invalidate_computed_assignments(targets=True)
 
         return ret
 
@@ -356,7 +365,15 @@ class Manager(manager.Manager):
             # Drop the computed assignments if the project is being disabled.
             # This ensures an accurate list of projects is returned when
             # listing projects/domains for a user based on role assignments.
-            assignment.COMPUTED_ASSIGNMENTS_REGION.invalidate()
+            project_ids = [project_id]
+            if cascade:
+                project_ids += [
+                    p['id'] for p in self.list_projects_in_subtree(project_id)]
+            assignment.invalidate_computed_assignments(
+                project_ids=project_ids,
+                domain_ids=([project_id] if original_project.get('is_domain')
+                            else []),
+                targets=True)
 
         if cascade:
             self._only_allow_enabled_to_update_cascade(project,
@@ -378,10 +395,15 @@ class Manager(manager.Manager):
                                                 original_project['domain_id'])
             if ('domain_id' in project and
                project['domain_id'] != original_project['domain_id']):
-                # If the project's domain_id has been updated, invalidate user
-                # role assignments cache region, as it may be caching inherited
-                # assignments from the old domain to the specified project
-                assignment.COMPUTED_ASSIGNMENTS_REGION.invalidate()
+                # If the project's domain_id has been updated, invalidate the
+                # role assignments computed on its subtree, as they may include
+                # inherited assignments from the old domain
+                project_ids = [project_id] + [
+                    p['id'] for p in self.list_projects_in_subtree(project_id)]
+                PROVIDERS.assignment_api.refresh_effective_assignments(
+                    project_ids=project_ids)
+                assignment.invalidate_computed_assignments(
+                    project_ids=project_ids, targets=True)
         finally:
             # attempt to send audit event even if the cache invalidation raises
             notifications.Audit.updated(self._PROJECT, project_id, initiator)
@@ -392,14 +414,15 @@ class Manager(manager.Manager):
                 # notification as well
                 if original_project_enabled and not project_enabled:
                     # NOTE(lbragstad): When a domain is disabled, we have to
-                    # invalidate the entire token cache. With persistent
+                    # invalidate the cached tokens bound to it. With persistent
                     # tokens, we did something similar where all tokens for a
                     # specific domain were deleted when that domain was
                     # disabled. This effectively offers the same behavior for
                     # non-persistent tokens by removing them from the cache and
                     # requiring the authorization context to be rebuilt the
                     # next time they're validated.
-                    token_provider.TOKENS_REGION.invalidate()
+                    token_provider.invalidate_token_cache(
+                        domain_id=project_id)
                     notifications.Audit.disabled(self._DOMAIN, project_id,
                                                  public=False)
 
@@ -446,10 +469,12 @@ class Manager(manager.Manager):
             self.get_project_by_name.invalidate(self, project['name'],
                                                 project['domain_id'])
             PROVIDERS.assignment_api.delete_project_assignments(project_id)
-            # Invalidate user role assignments cache region, as it may
-            # be caching role assignments where the target is
+            # Invalidate the role assignments computed where the target is
             # the specified project
-            assignment.COMPUTED_ASSIGNMENTS_REGION.invalidate()
+            assignment.invalidate_computed_assignments(
+                project_ids=[project_id],
+                domain_ids=[project_id] if project.get('is_domain') else [],
+                targets=True)
             PROVIDERS.credential_api.delete_credentials_for_project(project_id)
             PROVIDERS.trust_api.delete_trusts_for_project(project_id)
             PROVIDERS.unified_limit_api.delete_limits_for_project(project_id)
@@ -517,7 +542,10 @@ class Manager(manager.Manager):
             'and enforced accordingly the next time users authenticate or '
             'validate a token.' % {'project_id': project_id}
         )
-        notifications.invalidate_token_cache_notification(reason)
+        # The projects of a subtree can only be deleted once disabled, which
+        # already invalidated the tokens scoped to them.
+        notifications.invalidate_token_cache_notification(
+            reason, project_id=project_id)
         return ret
 
     def _filter_projects_list(self, projects_list, user_id):
@@ -693,6 +721,7 @@ class Manager(manager.Manager):
 
         return domains
 
+    @MEMOIZE_NOT_FOUND
     @MEMOIZE
     def get_domain(self, domain_id):
         try:
@@ -708,6 +737,41 @@ class Manager(manager.Manager):
         # Return its correspondent domain
         return self._get_domain_from_project(project)
 
+    def get_domains(self, domain_ids):
+        """Get several domains at once.
+
+        This reads and fills the same cache entries as :meth:`get_domain`, and
+        reads the domains missing from the cache with a single driver call.
+
+        :param domain_ids: an iterable of domain IDs
+        :returns: a dictionary mapping the ID of each domain found to the
+                  domain, domains that don't exist are omitted
+
+        """
+        def fetch(missed_ids):
+            refs = self.driver.list_projects_from_ids(missed_ids)
+            return dict((ref['id'], self._get_domain_from_project(ref))
+                        for ref in refs if ref['is_domain'])
+
+        return cache.get_memoized_by_ids(cache.CACHE_REGION, MEMOIZE,
+                                         self.get_domain, self, domain_ids,
+                                         fetch)
+
+    def warm_domain_cache(self, budget):
+        """Load the domains into the cache, within a cache warm-up budget.
+
+        :param budget: a :class:`keystone.common.cache._warm.Budget`
+        :returns: the number of domains loaded
+
+        """
+        projects = budget.take(
+            self.driver.list_projects_acting_as_domain(budget.hints()))
+        cache.set_memoized_multi(
+            cache.CACHE_REGION, MEMOIZE, self.get_domain,
+            [(self, project['id']) for project in projects],
+            [self._get_domain_from_project(project) for project in projects])
+        return len(projects)
+
     @MEMOIZE
     def get_domain_by_name(self, domain_name):
         try:
@@ -878,10 +942,43 @@ class Manager(manager.Manager):
         return self.driver.list_projects_acting_as_domain(
             hints or driver_hints.Hints())
 
+    @MEMOIZE_NOT_FOUND
     @MEMOIZE
     def get_project(self, project_id):
         return self.driver.get_project(project_id)
 
+    def get_projects(self, project_ids):
+        """Get several projects at once.
+
+        This reads and fills the same cache entries as :meth:`get_project`,
+        and reads the projects missing from the cache with a single driver
+        call.
+
+        :param project_ids: an iterable of project IDs
+        :returns: a dictionary mapping the ID of each project found to the
+                  project, projects that don't exist are omitted
+
+        """
+        def fetch(missed_ids):
+            refs = self.driver.list_projects_from_ids(missed_ids)
+            return dict((ref['id'], ref) for ref in refs)
+
+        return cache.get_memoized_by_ids(cache.CACHE_REGION, MEMOIZE,
+                                         self.get_project, self, project_ids,
+                                         fetch)
+
+    def warm_project_cache(self, budget):
+        """Load the projects into the cache, within a cache warm-up budget.
+
+        :param budget: a :class:`keystone.common.cache._warm.Budget`
+        :returns: the number of projects loaded
+
+        """
+        refs = budget.take(self.driver.list_projects(budget.hints()))
+        cache.set_memoized_multi(cache.CACHE_REGION, MEMOIZE, self.get_project,
+                                 [(self, ref['id']) for ref in refs], refs)
+        return len(refs)
+
     @MEMOIZE
     def get_project_by_name(self, project_name, domain_id):
         return self.driver.get_project_by_name(project_name, domain_id)
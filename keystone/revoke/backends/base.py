@@ -52,6 +52,16 @@ class RevokeDriverBase(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def prune_expired_events(self, oldest, batch_size):
+        """Remove the revocation events revoked before a given time.
+
+        :param oldest: datetime; events revoked before it are removed
+        :param batch_size: maximum number of events removed per transaction
+        :returns: the number of events removed
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
+
     @abc.abstractmethod
     def revoke(self, event):
         """register a revocation event.
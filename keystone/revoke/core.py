@@ -12,6 +12,12 @@
 
 """Main entry point into the Revoke service."""
 
+import datetime
+import threading
+import time
+
+from oslo_log import log
+
 from keystone.common import cache
 from keystone.common import manager
 import keystone.conf
@@ -19,9 +25,11 @@ from keystone import exception
 from keystone.i18n import _
 from keystone.models import revoke_model
 from keystone import notifications
+from keystone.revoke.backends import base
 
 
 CONF = keystone.conf.CONF
+LOG = log.getLogger(__name__)
 
 # This builds a discrete cache region dedicated to revoke events. The API can
 # return a filtered list based upon last fetchtime. This is deprecated but
@@ -31,6 +39,52 @@ MEMOIZE = cache.get_memoization_decorator(
     group='revoke',
     region=REVOKE_REGION)
 
+# Events are fetched again from this many seconds before the most recent event
+# already indexed. Revocation times are only accurate to the second and come
+# from the clocks of different keystone nodes, so events recorded elsewhere
+# may be older than the last one seen here. Events older still are caught by
+# the full reads made every `[revoke] index_resync_interval` seconds.
+INDEX_SYNC_OVERLAP = 60
+
+# Rather than invalidating the whole region on every revocation, memoized
+# listings are keyed by the generations of the scopes they are used for. A
+# scope's generation is bumped when an event that may apply to it is recorded,
+# so a new event only expires the listings used for the tokens it can revoke.
+# Bumped by every event, for the listings of the revocation events API.
+ALL_SCOPE = 'all'
+# Bumped by the events without an audit ID, audit chain ID, user or project,
+# which may apply to any token.
+UNSCOPED = 'unscoped'
+
+
+def _event_scope(event):
+    for kind, name in (('audit', 'audit_id'),
+                       ('audit', 'audit_chain_id'),
+                       ('user', 'user_id'),
+                       ('project', 'project_id')):
+        value = getattr(event, name)
+        if value is not None:
+            return '%s:%s' % (kind, value)
+    return UNSCOPED
+
+
+def _last_fetch(watermark):
+    if watermark is None:
+        return None
+    return watermark - datetime.timedelta(seconds=INDEX_SYNC_OVERLAP)
+
+
+def _token_scopes(token):
+    scopes = set([UNSCOPED])
+    for kind, names in (('audit', ['audit_id', 'audit_chain_id']),
+                        ('user', revoke_model.ALTERNATIVES['user_id']),
+                        ('project', ['project_id'])):
+        for name in names:
+            value = token.get(name)
+            if value is not None:
+                scopes.add('%s:%s' % (kind, value))
+    return scopes
+
 
 class Manager(manager.Manager):
     """Default pivot point for the Revoke backend.
@@ -49,13 +103,37 @@ class Manager(manager.Manager):
         super(Manager, self).__init__(CONF.revoke.driver)
         self._register_listeners()
         self.model = revoke_model
+        self._index = revoke_model.RevokeIndex()
+        self._index_lock = threading.Lock()
+        # The times of the last full read of the events into the index, and
+        # of the last read of the new events.
+        self._last_resync = None
+        self._last_poll = None
+        self._prune_lock = threading.Lock()
+        self._pruning = False
+        self._prune_supported = True
+        # The first background prune happens one interval after startup.
+        self._last_prune = time.time()
 
     @MEMOIZE
-    def _list_events(self, last_fetch):
+    def _list_events(self, last_fetch, generations):
         return self.driver.list_events(last_fetch)
 
     def list_events(self, last_fetch=None):
-        return self._list_events(last_fetch)
+        return self._list_events(last_fetch,
+                                 self._get_generations([ALL_SCOPE]))
+
+    def _caching_enabled(self):
+        return CONF.cache.enabled and CONF.revoke.caching
+
+    def _get_generations(self, scopes):
+        if not self._caching_enabled():
+            return ()
+        return tuple(cache.get_generations(REVOKE_REGION, sorted(scopes)))
+
+    def _bump_generations(self, scopes):
+        if self._caching_enabled():
+            cache.bump_generations(REVOKE_REGION, scopes)
 
     def _user_callback(self, service, resource_type, operation,
                        payload):
@@ -126,6 +204,65 @@ class Manager(manager.Manager):
         self.revoke(
             revoke_model.RevokeEvent(project_id=project_id, user_id=user_id))
 
+    def _sync_index(self, scopes):
+        """Bring the in-memory index of revocation events up to date.
+
+        Only the events revoked since the last ones already in the index are
+        listed. Those listings are memoized under the generations of the
+        given scopes, so unless an event that may apply to them was recorded
+        since the last check, this does not reach the backend.
+
+        The new events are read at most once every `[revoke]
+        index_poll_interval` seconds, the tokens checked in between are only
+        checked against the index. Since such a read may then be used for the
+        tokens of any scope, it is memoized under the generation bumped by
+        every event rather than those of the given scopes.
+
+        Every `[revoke] index_resync_interval` seconds, all the events are
+        read from the backend instead, bypassing the cache, to catch the
+        events recorded with a revocation time older than the listings made
+        since.
+
+        :param scopes: the revocation scopes of the tokens about to be checked
+
+        """
+        now = time.time()
+        poll_interval = CONF.revoke.index_poll_interval
+        with self._index_lock:
+            if (poll_interval and self._last_poll is not None and
+                    now - self._last_poll < poll_interval):
+                return
+            self._last_poll = now
+            watermark = self._index.watermark
+            resync = (self._last_resync is None or
+                      now - self._last_resync >=
+                      CONF.revoke.index_resync_interval)
+            if resync:
+                self._last_resync = now
+        if poll_interval:
+            scopes = [ALL_SCOPE]
+        generations = self._get_generations(scopes)
+        if resync:
+            events = self.driver.list_events()
+        else:
+            events = self._list_events(_last_fetch(watermark), generations)
+        oldest = base.revoked_before_cutoff_time()
+        with self._index_lock:
+            self._index.add(events)
+            self._index.prune(oldest)
+            new_watermark = self._index.watermark
+        if self._caching_enabled() and new_watermark != watermark:
+            # The next check lists the events from the new watermark onwards,
+            # which are all part of this listing, so save it the round trip.
+            last_fetch = _last_fetch(new_watermark)
+            self._list_events.set(
+                [e for e in events if e.revoked_at > last_fetch],
+                self, last_fetch, generations)
+
+    def _is_revoked(self, token):
+        with self._index_lock:
+            return self._index.is_revoked(token)
+
     def check_token(self, token):
         """Check the values from a token against the revocation list.
 
@@ -136,10 +273,81 @@ class Manager(manager.Manager):
         :raises keystone.exception.TokenNotFound: If the token is invalid.
 
         """
-        if revoke_model.is_revoked(self.driver.list_events(token=token),
-                                   token):
+        self._sync_index(_token_scopes(token))
+        if self._is_revoked(token):
             raise exception.TokenNotFound(_('Failed to validate token'))
 
+    def check_tokens(self, tokens):
+        """Check the values from several tokens against the revocation list.
+
+        The revocation events are synchronized once and every token is then
+        compared with the in-memory index.
+
+        :param tokens: list of dictionaries of values from tokens, as expected
+                       by :meth:`check_token`
+
+        :returns: a list of booleans, in the order of ``tokens``, which are
+                  True for each token that has been revoked
+
+        """
+        if not tokens:
+            return []
+        self._sync_index(set().union(*[_token_scopes(t) for t in tokens]))
+        return [self._is_revoked(token) for token in tokens]
+
+    def prune_expired_events(self, batch_size=None):
+        """Remove the revocation events that no longer apply to any token.
+
+        :param batch_size: maximum number of events removed per transaction,
+                           defaults to `[revoke] prune_batch_size`
+        :returns: a tuple with the number of events removed and the time it
+                  took, in seconds
+
+        """
+        start = time.time()
+        pruned = self.driver.prune_expired_events(
+            base.revoked_before_cutoff_time(),
+            batch_size or CONF.revoke.prune_batch_size)
+        elapsed = time.time() - start
+        LOG.info('Pruned %(pruned)d expired revocation events in '
+                 '%(elapsed).3f seconds.',
+                 {'pruned': pruned, 'elapsed': elapsed})
+        return pruned, elapsed
+
+    def _prune_in_background(self):
+        try:
+            self.prune_expired_events()
+        except exception.NotImplemented:
+            # Pruning is left to the driver, so it isn't scheduled again.
+            LOG.debug('The revocation driver does not support pruning '
+                      'expired revocation events, background pruning is '
+                      'disabled.')
+            self._prune_supported = False
+        except Exception:
+            LOG.exception('Failed to prune expired revocation events.')
+        finally:
+            with self._prune_lock:
+                self._pruning = False
+
+    def _schedule_prune(self):
+        interval = CONF.revoke.prune_interval
+        if not interval or not self._prune_supported:
+            return
+        now = time.time()
+        with self._prune_lock:
+            if self._pruning or now - self._last_prune < interval:
+                return
+            self._pruning = True
+            self._last_prune = now
+        thread = threading.Thread(target=self._prune_in_background)
+        thread.daemon = True
+        thread.start()
+
     def revoke(self, event):
         self.driver.revoke(event)
-        REVOKE_REGION.invalidate()
+        # The event is enforced by this process right away, without waiting
+        # for the next read of the new events.
+        with self._index_lock:
+            self._index.add([event], update_watermark=False)
+        self._bump_generations([ALL_SCOPE, _event_scope(event)])
+        self._schedule_prune()
@@ -14,6 +14,7 @@
 
 from oslo_log import log
 
+from keystone.common import cache
 from keystone.common import sql
 import keystone.conf
 from keystone.server import backends
@@ -41,9 +42,18 @@ def configure(version=None, config_files=None,
             'information.')
 
 
+def _warm_cache():
+    report = cache.warm(max_time=CONF.cache_warm_max_time or None,
+                        max_entries=CONF.cache_warm_max_entries or None)
+    LOG.info('Warmed up the cache in %(elapsed).3f seconds, loaded: '
+             '%(loaded)s, skipped: %(skipped)s, failed: %(failed)s.', report)
+
+
 def setup_backends(load_extra_backends_fn=lambda: {},
                    startup_application_fn=lambda: None):
     drivers = backends.load_backends()
     drivers.update(load_extra_backends_fn())
+    if CONF.cache_warm_on_start and CONF.cache.enabled:
+        _warm_cache()
     res = startup_application_fn()
     return drivers, res
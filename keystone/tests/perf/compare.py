@@ -0,0 +1,95 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare the results of a benchmark run against a baseline.
+
+Usage::
+
+    python -m keystone.tests.perf.compare RESULTS [--baseline BASELINE]
+        [--tolerance TOLERANCE] [--save-baseline BASELINE]
+
+Prints a JSON report of every benchmark with its baseline and change, and
+exits with a non-zero status if any of them regressed.
+
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from keystone.tests.perf import core
+
+
+def compare(results, baseline, tolerance):
+    """Compare benchmark results with their baseline.
+
+    :param results: a dictionary of results, as returned by
+                    :func:`keystone.tests.perf.core.load_results`
+    :param baseline: a dictionary of baseline results
+    :param tolerance: how much slower than their baseline results are allowed
+                      to be, as a fraction of the baseline
+    :returns: a list of the comparisons, sorted by name
+
+    """
+    report = []
+    for name in sorted(results):
+        result = results[name]
+        comparison = {'name': name, 'seconds': result['seconds']}
+        if name in baseline:
+            expected = baseline[name]
+            comparison['baseline'] = expected['seconds']
+            comparison['change'] = (
+                result['seconds'] / expected['seconds'] - 1
+                if expected['seconds'] else 0.0)
+            comparison['regression'] = core.is_regression(
+                result, expected, tolerance)
+        report.append(comparison)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Compare benchmark results against a baseline.')
+    parser.add_argument('results',
+                        help='results written by a benchmark run')
+    parser.add_argument('--baseline',
+                        default=os.environ.get('KSTEST_PERF_BASELINE'),
+                        help='results to compare with, defaults to '
+                             '$KSTEST_PERF_BASELINE')
+    parser.add_argument('--tolerance', type=float,
+                        default=core.get_tolerance(),
+                        help='how much slower than their baseline results '
+                             'are allowed to be, as a fraction of the '
+                             'baseline')
+    parser.add_argument('--save-baseline', metavar='BASELINE',
+                        help='save the results as a baseline for later runs')
+    args = parser.parse_args(argv)
+
+    results = core.load_results(args.results)
+    baseline = {}
+    if args.baseline and os.path.exists(args.baseline):
+        baseline = core.load_results(args.baseline)
+
+    report = compare(results, baseline, args.tolerance)
+    json.dump({'tolerance': args.tolerance, 'benchmarks': report},
+              sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+
+    if args.save_baseline:
+        core.save_results(args.save_baseline, results)
+
+    return 1 if any(c.get('regression') for c in report) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Base classes and helpers for benchmarks of keystone's hot paths.
+
+Benchmarks are test cases that time a function and record how long a single
+call takes, with the best of several repetitions. They run offline against an
+in-memory SQLite database and the in-memory cache backend, like the unit tests.
+
+The following environment variables control them:
+
+``KSTEST_PERF_RESULTS``
+    File to which results are appended, as one JSON object per line.
+
+``KSTEST_PERF_BASELINE``
+    File of results from a previous run, as written by
+    ``python -m keystone.tests.perf.compare --save-baseline``. A benchmark
+    fails if it's slower than its baseline by more than the tolerance.
+
+``KSTEST_PERF_TOLERANCE``
+    How much slower than their baseline benchmarks are allowed to be, as a
+    fraction of the baseline. Defaults to 0.5.
+
+"""
+
+import json
+import os
+import timeit
+
+from testtools import content
+
+from keystone.tests import unit
+from keystone.tests.unit.ksfixtures import database
+
+
+DEFAULT_TOLERANCE = 0.5
+
+_baseline = None
+
+
+def load_results(path):
+    """Load benchmark results from a file.
+
+    :param path: a file written by a benchmark run, or a baseline saved from
+                 one, with one JSON object per line
+    :returns: a dictionary mapping the name of each benchmark to its result,
+              the last one if it was run several times
+
+    """
+    results = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                result = json.loads(line)
+                results[result['name']] = result
+    return results
+
+
+def save_results(path, results):
+    """Save benchmark results to a file, in the format of a run."""
+    with open(path, 'w') as f:
+        for name in sorted(results):
+            f.write(json.dumps(results[name], sort_keys=True) + '\n')
+
+
+def get_baseline():
+    global _baseline
+    if _baseline is None:
+        path = os.environ.get('KSTEST_PERF_BASELINE')
+        _baseline = load_results(path) if path else {}
+    return _baseline
+
+
+def get_tolerance():
+    return float(os.environ.get('KSTEST_PERF_TOLERANCE', DEFAULT_TOLERANCE))
+
+
+def is_regression(result, baseline, tolerance):
+    """Tell whether a result is slower than its baseline beyond tolerance."""
+    return result['seconds'] > baseline['seconds'] * (1 + tolerance)
+
+
+def measure(func, setup=None, number=100, repeat=5):
+    """Time calls to a function.
+
+    :param func: the function to time, called without arguments
+    :param setup: an optional function called before each call to ``func``,
+                  which isn't timed
+    :param number: the number of calls in each repetition
+    :param repeat: the number of repetitions
+    :returns: the durations of each repetition, in seconds
+
+    """
+    timer = timeit.default_timer
+    durations = []
+    for i in range(repeat):
+        elapsed = 0.0
+        for j in range(number):
+            if setup is not None:
+                setup()
+            start = timer()
+            func()
+            elapsed += timer() - start
+        durations.append(elapsed)
+    return durations
+
+
+class BenchmarkMixin(object):
+    """Mixin of test cases that time functions."""
+
+    def benchmark(self, name, func, setup=None, number=100, repeat=5):
+        """Time a function, record the result and check it for regressions.
+
+        :param name: the name of the benchmark, unique across the suite
+        :param func: the function to time, called without arguments
+        :param setup: an optional function called before each call to
+                      ``func``, which isn't timed
+        :param number: the number of calls in each repetition
+        :param repeat: the number of repetitions
+        :returns: the result of the benchmark, as a dictionary
+
+        """
+        durations = measure(func, setup=setup, number=number, repeat=repeat)
+        result = {
+            'name': name,
+            'seconds': min(durations) / number,
+            'mean': sum(durations) / (number * repeat),
+            'number': number,
+            'repeat': repeat,
+        }
+        self.addDetail(name, content.text_content(json.dumps(result)))
+
+        path = os.environ.get('KSTEST_PERF_RESULTS')
+        if path:
+            # Appending a single line keeps the file consistent when
+            # benchmarks run concurrently.
+            with open(path, 'a') as f:
+                f.write(json.dumps(result, sort_keys=True) + '\n')
+
+        baseline = get_baseline().get(name)
+        tolerance = get_tolerance()
+        if baseline and is_regression(result, baseline, tolerance):
+            self.fail('%s took %.6fs per call, which is more than %d%% '
+                      'slower than its baseline of %.6fs' % (
+                          name, result['seconds'], tolerance * 100,
+                          baseline['seconds']))
+        return result
+
+
+class BenchmarkTestCase(BenchmarkMixin, unit.TestCase):
+    """Base class of benchmarks that need keystone's backends."""
+
+    def setUp(self):
+        super(BenchmarkTestCase, self).setUp()
+        self.useFixture(database.Database())
+        self.load_backends()
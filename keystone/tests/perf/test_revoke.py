@@ -0,0 +1,64 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import datetime
+import uuid
+
+from oslo_utils import timeutils
+
+from keystone.models import revoke_model
+from keystone.tests.perf import core
+from keystone.tests import unit
+
+
+# Numbers of revocation events to check tokens against.
+EVENT_COUNTS = [10, 100, 1000, 10000, 100000]
+
+
+class RevocationBenchmark(core.BenchmarkMixin, unit.BaseTestCase):
+
+    def _token_values(self):
+        issued_at = timeutils.utcnow() - datetime.timedelta(minutes=2)
+        token_values = revoke_model.blank_token_data(issued_at)
+        token_values['user_id'] = uuid.uuid4().hex
+        token_values['project_id'] = uuid.uuid4().hex
+        token_values['audit_id'] = uuid.uuid4().hex
+        return token_values
+
+    def _events(self, count):
+        # None of the events revoke the token, so that every one of them has
+        # to be checked, which is the common case.
+        return [revoke_model.RevokeEvent(user_id=uuid.uuid4().hex)
+                for i in range(count)]
+
+    def _number(self, count):
+        return max(1, 10000 // count)
+
+    def test_is_revoked(self):
+        token_values = self._token_values()
+        for count in EVENT_COUNTS:
+            events = self._events(count)
+            self.assertFalse(revoke_model.is_revoked(events, token_values))
+            self.benchmark(
+                'revoke_model.is_revoked.%d' % count,
+                lambda: revoke_model.is_revoked(events, token_values),
+                number=self._number(count))
+
+    def test_revoke_index_is_revoked(self):
+        token_values = self._token_values()
+        for count in EVENT_COUNTS:
+            index = revoke_model.RevokeIndex()
+            index.add(self._events(count))
+            self.assertFalse(index.is_revoked(token_values))
+            self.benchmark(
+                'revoke_model.RevokeIndex.is_revoked.%d' % count,
+                lambda: index.is_revoked(token_values))
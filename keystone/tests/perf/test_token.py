@@ -0,0 +1,122 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import uuid
+
+from oslo_utils import timeutils
+
+from keystone.common import controller
+from keystone.common import provider_api
+from keystone.common import utils
+from keystone.tests.perf import core
+from keystone.tests import unit
+from keystone.token import provider
+from keystone.token import token_formatters
+
+
+PROVIDERS = provider_api.ProviderAPIs
+
+
+def _federated_arguments(**kwargs):
+    kwargs.update(federated_group_ids=[{'id': uuid.uuid4().hex}],
+                  identity_provider_id=uuid.uuid4().hex,
+                  protocol_id='saml2')
+    return kwargs
+
+
+# Arguments of TokenFormatter.create_token selecting each payload class.
+PAYLOAD_ARGUMENTS = {
+    token_formatters.UnscopedPayload: {},
+    token_formatters.SystemScopedPayload: {'system': 'all'},
+    token_formatters.DomainScopedPayload: {'domain_id': uuid.uuid4().hex},
+    token_formatters.ProjectScopedPayload: {'project_id': uuid.uuid4().hex},
+    token_formatters.TrustScopedPayload: {
+        'project_id': uuid.uuid4().hex, 'trust_id': uuid.uuid4().hex},
+    token_formatters.FederatedUnscopedPayload: _federated_arguments(),
+    token_formatters.FederatedProjectScopedPayload: _federated_arguments(
+        project_id=uuid.uuid4().hex),
+    token_formatters.FederatedDomainScopedPayload: _federated_arguments(
+        domain_id=uuid.uuid4().hex),
+    token_formatters.OauthScopedPayload: {
+        'project_id': uuid.uuid4().hex, 'access_token_id': uuid.uuid4().hex},
+    token_formatters.ApplicationCredentialScopedPayload: {
+        'project_id': uuid.uuid4().hex, 'app_cred_id': uuid.uuid4().hex},
+}
+
+
+class TokenFormatterBenchmark(core.BenchmarkTestCase):
+
+    def test_every_payload_class_is_benchmarked(self):
+        self.assertEqual(set(token_formatters.PAYLOAD_CLASSES),
+                         set(PAYLOAD_ARGUMENTS))
+
+    def test_create_and_validate_token(self):
+        formatter = token_formatters.TokenFormatter()
+        user_id = uuid.uuid4().hex
+        expires_at = utils.isotime(timeutils.utcnow(), subsecond=True)
+        audit_ids = [provider.random_urlsafe_str()]
+        for payload_class in token_formatters.PAYLOAD_CLASSES:
+            name = payload_class.__name__
+            arguments = PAYLOAD_ARGUMENTS[payload_class]
+
+            def create_token():
+                return formatter.create_token(
+                    user_id, expires_at, audit_ids, methods=['password'],
+                    **arguments)
+
+            self.benchmark('token_formatter.create_token.%s' % name,
+                           create_token)
+
+            token = create_token()
+            self.benchmark('token_formatter.validate_token.%s' % name,
+                           lambda: formatter.validate_token(token))
+
+
+class TokenProviderBenchmark(core.BenchmarkTestCase):
+
+    def setUp(self):
+        super(TokenProviderBenchmark, self).setUp()
+        domain = unit.new_domain_ref()
+        PROVIDERS.resource_api.create_domain(domain['id'], domain)
+        project = unit.new_project_ref(domain_id=domain['id'])
+        PROVIDERS.resource_api.create_project(project['id'], project)
+        user = PROVIDERS.identity_api.create_user(
+            unit.new_user_ref(domain_id=domain['id']))
+        role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(role['id'], role)
+        PROVIDERS.assignment_api.create_grant(
+            role['id'], user_id=user['id'], project_id=project['id'])
+
+        self.token = PROVIDERS.token_provider_api.issue_token(
+            user['id'], ['password'], project_id=project['id'])
+
+    def test_validate_token(self):
+        token_api = PROVIDERS.token_provider_api
+        self.benchmark('token_provider.validate_token.warm',
+                       lambda: token_api.validate_token(self.token.id))
+        self.benchmark('token_provider.validate_token.cold',
+                       lambda: token_api.validate_token(self.token.id),
+                       setup=provider.TOKENS_REGION.invalidate)
+
+    def test_render_token_response(self):
+        token = PROVIDERS.token_provider_api.validate_token(self.token.id)
+        self.benchmark(
+            'controller.render_token_response_from_model',
+            lambda: controller.render_token_response_from_model(token))
+
+    def test_render_cached_token_response(self):
+        self.config_fixture.config(group='token',
+                                   cache_rendered_responses=True)
+        token_api = PROVIDERS.token_provider_api
+        token = token_api.validate_token(self.token.id)
+        self.benchmark('token_provider.render_token_response.cached',
+                       lambda: token_api.render_token_response(token))
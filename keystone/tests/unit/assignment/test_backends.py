@@ -2653,6 +2653,260 @@ class AssignmentTests(AssignmentTestHelperMixin):
             role_id=role['id'])
         self.assertEqual([], role_assignments)
 
+    def _assert_effective_assignments_stored(self):
+        expected = PROVIDERS.assignment_api._compute_effective_assignments()
+        stored = PROVIDERS.assignment_api.driver.list_effective_assignments()
+        self.assertItemsEqual(expected, stored)
+
+    def test_materialized_effective_assignments(self):
+        self.config_fixture.config(group='assignment',
+                                   materialize_effective_assignments=True)
+        PROVIDERS.assignment_api.rebuild_effective_assignments()
+        self._assert_effective_assignments_stored()
+
+        role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(role['id'], role)
+        implied_role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(implied_role['id'], implied_role)
+        user = unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
+        user = PROVIDERS.identity_api.create_user(user)
+        group = unit.new_group_ref(domain_id=CONF.identity.default_domain_id)
+        group = PROVIDERS.identity_api.create_group(group)
+        project = unit.new_project_ref(
+            domain_id=CONF.identity.default_domain_id)
+        PROVIDERS.resource_api.create_project(project['id'], project)
+
+        PROVIDERS.assignment_api.create_grant(
+            role['id'], group_id=group['id'], project_id=project['id'],
+            inherited_to_projects=True)
+        self._assert_effective_assignments_stored()
+        PROVIDERS.identity_api.add_user_to_group(user['id'], group['id'])
+        self._assert_effective_assignments_stored()
+
+        subproject = unit.new_project_ref(
+            domain_id=CONF.identity.default_domain_id,
+            parent_id=project['id'])
+        PROVIDERS.resource_api.create_project(subproject['id'], subproject)
+        self._assert_effective_assignments_stored()
+        self.assertEqual(
+            [role['id']],
+            PROVIDERS.assignment_api.get_roles_for_user_and_project(
+                user['id'], subproject['id']))
+
+        PROVIDERS.role_api.create_implied_role(role['id'],
+                                               implied_role['id'])
+        self._assert_effective_assignments_stored()
+        PROVIDERS.assignment_api.create_grant(
+            role['id'], user_id=user['id'],
+            domain_id=CONF.identity.default_domain_id)
+        self._assert_effective_assignments_stored()
+        self.assertItemsEqual(
+            [role['id'], implied_role['id']],
+            PROVIDERS.assignment_api.get_roles_for_user_and_domain(
+                user['id'], CONF.identity.default_domain_id))
+        self.assertEqual(
+            [subproject['id']],
+            [p['id'] for p in
+             PROVIDERS.assignment_api.list_projects_for_user(user['id'])])
+
+        PROVIDERS.identity_api.remove_user_from_group(user['id'],
+                                                      group['id'])
+        self._assert_effective_assignments_stored()
+        PROVIDERS.role_api.delete_implied_role(role['id'],
+                                               implied_role['id'])
+        self._assert_effective_assignments_stored()
+        PROVIDERS.identity_api.delete_user(user['id'])
+        self._assert_effective_assignments_stored()
+
+    def test_create_and_delete_grants(self):
+        user = unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
+        user = PROVIDERS.identity_api.create_user(user)
+        group = unit.new_group_ref(domain_id=CONF.identity.default_domain_id)
+        group = PROVIDERS.identity_api.create_group(group)
+        PROVIDERS.identity_api.add_user_to_group(user['id'], group['id'])
+        grants = [
+            {'role_id': self.role_member['id'], 'user_id': user['id'],
+             'project_id': self.tenant_bar['id']},
+            {'role_id': self.role_other['id'], 'user_id': user['id'],
+             'project_id': self.tenant_bar['id']},
+            {'role_id': self.role_admin['id'], 'group_id': group['id'],
+             'domain_id': CONF.identity.default_domain_id,
+             'inherited_to_projects': True}]
+        # Making a grant twice, or making an existing one, has no effect.
+        PROVIDERS.assignment_api.create_grants(grants + grants[:1])
+        PROVIDERS.assignment_api.create_grants(grants[:1])
+        self.assertItemsEqual(
+            [self.role_member['id'], self.role_other['id'],
+             self.role_admin['id']],
+            PROVIDERS.assignment_api.get_roles_for_user_and_project(
+                user['id'], self.tenant_bar['id']))
+
+        # Nothing is removed if any of the grants doesn't exist.
+        missing_grant = {'role_id': self.role_admin['id'],
+                         'user_id': user['id'],
+                         'project_id': self.tenant_bar['id']}
+        self.assertRaises(exception.RoleAssignmentNotFound,
+                          PROVIDERS.assignment_api.delete_grants,
+                          grants + [missing_grant])
+        self.assertEqual(
+            3, len(PROVIDERS.assignment_api.get_roles_for_user_and_project(
+                user['id'], self.tenant_bar['id'])))
+
+        PROVIDERS.assignment_api.delete_grants(grants[1:])
+        self.assertEqual(
+            [self.role_member['id']],
+            PROVIDERS.assignment_api.get_roles_for_user_and_project(
+                user['id'], self.tenant_bar['id']))
+
+    def test_create_grants_validates_all_grants_first(self):
+        user = unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
+        user = PROVIDERS.identity_api.create_user(user)
+        grant = {'role_id': self.role_member['id'], 'user_id': user['id'],
+                 'project_id': self.tenant_bar['id']}
+        for invalid_grant, error in [
+                (dict(grant, role_id=uuid.uuid4().hex),
+                 exception.RoleNotFound),
+                (dict(grant, project_id=uuid.uuid4().hex),
+                 exception.ProjectNotFound),
+                (dict(grant, group_id=uuid.uuid4().hex),
+                 exception.ValidationError),
+                (dict(grant, project_id=None), exception.ValidationError)]:
+            self.assertRaises(error, PROVIDERS.assignment_api.create_grants,
+                              [dict(grant, role_id=self.role_other['id']),
+                               invalid_grant])
+        self.assertEqual(
+            [], PROVIDERS.assignment_api.list_role_assignments(
+                user_id=user['id']))
+
+    def test_effective_assignments_list_group_users_at_once(self):
+        user = unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
+        user = PROVIDERS.identity_api.create_user(user)
+        for x in range(3):
+            group = unit.new_group_ref(
+                domain_id=CONF.identity.default_domain_id)
+            group = PROVIDERS.identity_api.create_group(group)
+            PROVIDERS.identity_api.add_user_to_group(user['id'], group['id'])
+            PROVIDERS.assignment_api.create_grant(
+                self.role_member['id'], group_id=group['id'],
+                project_id=self.tenant_bar['id'])
+
+        identity_api = PROVIDERS.identity_api
+        with mock.patch.object(identity_api, 'list_users_in_groups',
+                               wraps=identity_api.list_users_in_groups
+                               ) as mock_list_users_in_groups, \
+                mock.patch.object(identity_api, 'list_users_in_group'
+                                  ) as mock_list_users_in_group:
+            assignments = PROVIDERS.assignment_api.list_role_assignments(
+                project_id=self.tenant_bar['id'], effective=True)
+            self.assertEqual(1, mock_list_users_in_groups.call_count)
+            mock_list_users_in_group.assert_not_called()
+        self.assertEqual(
+            3, len([a for a in assignments if a['user_id'] == user['id']]))
+
+    def test_list_role_assignments_page(self):
+        implied_role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(implied_role['id'], implied_role)
+        group = unit.new_group_ref(domain_id=CONF.identity.default_domain_id)
+        group = PROVIDERS.identity_api.create_group(group)
+        for i in range(3):
+            user = unit.new_user_ref(
+                domain_id=CONF.identity.default_domain_id)
+            user = PROVIDERS.identity_api.create_user(user)
+            PROVIDERS.identity_api.add_user_to_group(user['id'], group['id'])
+            PROVIDERS.assignment_api.create_grant(
+                self.role_member['id'], user_id=user['id'],
+                project_id=self.tenant_bar['id'])
+        PROVIDERS.assignment_api.create_grant(
+            self.role_other['id'], group_id=group['id'],
+            domain_id=CONF.identity.default_domain_id,
+            inherited_to_projects=True)
+        PROVIDERS.role_api.create_implied_role(self.role_member['id'],
+                                               implied_role['id'])
+
+        project_id = self.tenant_bar['id']
+        for filters in ({}, {'effective': True},
+                        {'effective': True, 'project_id': project_id},
+                        {'effective': True, 'role_id': implied_role['id']}):
+            expected = PROVIDERS.assignment_api.list_role_assignments(
+                **filters)
+            for limit in (1, 2, len(expected)):
+                assignments = []
+                marker = None
+                while True:
+                    page, marker = (
+                        PROVIDERS.assignment_api.list_role_assignments_page(
+                            limit=limit, marker=marker, **filters))
+                    self.assertLessEqual(len(page), limit)
+                    assignments += page
+                    if marker is None:
+                        break
+                self.assertItemsEqual(expected, assignments)
+                self.assertEqual(len(expected), len(assignments))
+
+        self.assertRaises(exception.ValidationError,
+                          PROVIDERS.assignment_api.list_role_assignments_page,
+                          limit=1, marker=uuid.uuid4().hex)
+
+    @unit.skip_if_cache_disabled('role')
+    def test_computed_assignments_invalidated_per_user_and_target(self):
+        role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(role['id'], role)
+        other_role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(other_role['id'], other_role)
+        user = unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
+        user = PROVIDERS.identity_api.create_user(user)
+        other_user = unit.new_user_ref(
+            domain_id=CONF.identity.default_domain_id)
+        other_user = PROVIDERS.identity_api.create_user(other_user)
+        group = unit.new_group_ref(domain_id=CONF.identity.default_domain_id)
+        group = PROVIDERS.identity_api.create_group(group)
+        PROVIDERS.identity_api.add_user_to_group(user['id'], group['id'])
+        project = unit.new_project_ref(
+            domain_id=CONF.identity.default_domain_id)
+        PROVIDERS.resource_api.create_project(project['id'], project)
+        for user_id in (user['id'], other_user['id']):
+            PROVIDERS.assignment_api.create_grant(
+                role['id'], user_id=user_id, project_id=project['id'])
+            PROVIDERS.assignment_api.get_roles_for_user_and_project(
+                user_id, project['id'])
+        PROVIDERS.assignment_api.list_projects_for_user(other_user['id'])
+
+        with mock.patch.object(
+                PROVIDERS.assignment_api.driver, 'list_role_assignments',
+                wraps=PROVIDERS.assignment_api.driver.list_role_assignments
+        ) as list_role_assignments:
+            # A grant to a user, or to a group, only discards what was
+            # computed for that user, or for the members of the group.
+            PROVIDERS.assignment_api.create_grant(
+                other_role['id'], user_id=user['id'],
+                project_id=project['id'])
+            PROVIDERS.assignment_api.create_grant(
+                other_role['id'], group_id=group['id'],
+                domain_id=CONF.identity.default_domain_id)
+            self.assertEqual(
+                [role['id']],
+                PROVIDERS.assignment_api.get_roles_for_user_and_project(
+                    other_user['id'], project['id']))
+            self.assertEqual(0, list_role_assignments.call_count)
+            self.assertItemsEqual(
+                [role['id'], other_role['id']],
+                PROVIDERS.assignment_api.get_roles_for_user_and_project(
+                    user['id'], project['id']))
+            self.assertEqual(
+                [other_role['id']],
+                PROVIDERS.assignment_api.get_roles_for_user_and_domain(
+                    user['id'], CONF.identity.default_domain_id))
+            self.assertNotEqual(0, list_role_assignments.call_count)
+
+            # Disabling a project discards the projects listed for users.
+            PROVIDERS.resource_api.update_project(project['id'],
+                                                  {'enabled': False})
+            self.assertEqual(
+                [False],
+                [p['enabled'] for p in
+                 PROVIDERS.assignment_api.list_projects_for_user(
+                     other_user['id'])])
+
 
 class InheritanceTests(AssignmentTestHelperMixin):
 
@@ -3687,6 +3941,67 @@ class ImpliedRoleTests(AssignmentTestHelperMixin):
                           uuid.uuid4().hex,
                           uuid.uuid4().hex)
 
+    def test_implied_roles_closure(self):
+        role_ids = []
+        for _ in range(4):
+            role_ref = unit.new_role_ref()
+            PROVIDERS.role_api.create_role(role_ref['id'], role_ref)
+            role_ids.append(role_ref['id'])
+        PROVIDERS.role_api.create_implied_role(role_ids[0], role_ids[1])
+        PROVIDERS.role_api.create_implied_role(role_ids[1], role_ids[2])
+        PROVIDERS.role_api.create_implied_role(role_ids[1], role_ids[3])
+
+        closure = PROVIDERS.role_api.get_implied_roles_closure()
+        self.assertItemsEqual([(role_ids[1], role_ids[0]),
+                               (role_ids[2], role_ids[1]),
+                               (role_ids[3], role_ids[1])],
+                              closure[role_ids[0]])
+        self.assertItemsEqual([(role_ids[2], role_ids[1]),
+                               (role_ids[3], role_ids[1])],
+                              closure[role_ids[1]])
+        self.assertNotIn(role_ids[2], closure)
+
+    @unit.skip_if_cache_disabled('role')
+    def test_implied_roles_closure_is_kept_until_rules_change(self):
+        prior_role_ref = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(prior_role_ref['id'], prior_role_ref)
+        implied_role_ref = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(
+            implied_role_ref['id'], implied_role_ref
+        )
+        role_refs = [{'role_id': prior_role_ref['id'],
+                      'user_id': uuid.uuid4().hex,
+                      'project_id': uuid.uuid4().hex}]
+        PROVIDERS.assignment_api.add_implied_roles(role_refs)
+
+        with mock.patch.object(
+                PROVIDERS.role_api.driver, 'list_role_inference_rules',
+                wraps=PROVIDERS.role_api.driver.list_role_inference_rules
+        ) as list_rules:
+            self.assertEqual(
+                role_refs, PROVIDERS.assignment_api.add_implied_roles(
+                    role_refs))
+            self.assertEqual(0, list_rules.call_count)
+
+            PROVIDERS.role_api.create_implied_role(
+                prior_role_ref['id'], implied_role_ref['id'])
+            expected_ref = dict(role_refs[0],
+                                role_id=implied_role_ref['id'],
+                                indirect={'role_id': prior_role_ref['id']})
+            self.assertEqual(
+                role_refs + [expected_ref],
+                PROVIDERS.assignment_api.add_implied_roles(role_refs))
+            self.assertEqual(1, list_rules.call_count)
+            # The refs passed in are left untouched.
+            self.assertNotIn('indirect', role_refs[0])
+
+            PROVIDERS.role_api.delete_implied_role(
+                prior_role_ref['id'], implied_role_ref['id'])
+            self.assertEqual(
+                role_refs, PROVIDERS.assignment_api.add_implied_roles(
+                    role_refs))
+            self.assertEqual(2, list_rules.call_count)
+
     def test_role_assignments_simple_tree_of_implied_roles(self):
         """Test that implied roles are expanded out."""
         test_plan = {
@@ -30,6 +30,33 @@ class RoleTests(object):
                           PROVIDERS.role_api.get_role,
                           uuid.uuid4().hex)
 
+    def test_get_roles(self):
+        role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(role['id'], role)
+        missing_role_id = uuid.uuid4().hex
+        roles = PROVIDERS.role_api.get_roles(
+            [role['id'], self.role_member['id'], missing_role_id,
+             role['id']])
+        self.assertEqual(set([role['id'], self.role_member['id']]),
+                         set(roles))
+        self.assertDictEqual(PROVIDERS.role_api.get_role(role['id']),
+                             roles[role['id']])
+        self.assertEqual({}, PROVIDERS.role_api.get_roles([]))
+
+    @unit.skip_if_cache_disabled('role')
+    def test_cache_layer_get_roles(self):
+        role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(role['id'], role)
+        # Cache the role through the bulk lookup.
+        role_ref = PROVIDERS.role_api.get_roles([role['id']])[role['id']]
+        PROVIDERS.role_api.driver.delete_role(role['id'])
+        # Both lookups use the same cache entry.
+        self.assertDictEqual(role_ref, PROVIDERS.role_api.get_role(role['id']))
+        self.assertDictEqual(
+            role_ref, PROVIDERS.role_api.get_roles([role['id']])[role['id']])
+        PROVIDERS.role_api.get_role.invalidate(PROVIDERS.role_api, role['id'])
+        self.assertEqual({}, PROVIDERS.role_api.get_roles([role['id']]))
+
     def test_get_unique_role_by_name_returns_not_found(self):
         self.assertRaises(exception.RoleNotFound,
                           PROVIDERS.role_api.get_unique_role_by_name,
@@ -82,6 +109,36 @@ class RoleTests(object):
                           PROVIDERS.role_api.get_role,
                           role['id'])
 
+    @unit.skip_if_cache_disabled('role')
+    def test_cache_layer_role_not_found(self):
+        self.config_fixture.config(group='role', negative_cache_time=60)
+        role = unit.new_role_ref()
+        self.assertRaises(exception.RoleNotFound,
+                          PROVIDERS.role_api.get_role,
+                          role['id'])
+        # Create role, bypassing the role api manager
+        PROVIDERS.role_api.driver.create_role(role['id'], role)
+        # Verify get_role still raises RoleNotFound
+        self.assertRaises(exception.RoleNotFound,
+                          PROVIDERS.role_api.get_role,
+                          role['id'])
+        # Invalidate cache
+        PROVIDERS.role_api.get_role.invalidate(PROVIDERS.role_api, role['id'])
+        # Verify get_role now returns the role
+        self.assertEqual(role['name'],
+                         PROVIDERS.role_api.get_role(role['id'])['name'])
+
+    @unit.skip_if_cache_disabled('role')
+    def test_create_role_after_role_not_found(self):
+        self.config_fixture.config(group='role', negative_cache_time=60)
+        role = unit.new_role_ref()
+        self.assertRaises(exception.RoleNotFound,
+                          PROVIDERS.role_api.get_role,
+                          role['id'])
+        PROVIDERS.role_api.create_role(role['id'], role)
+        self.assertEqual(role['name'],
+                         PROVIDERS.role_api.get_role(role['id'])['name'])
+
     def test_update_role_returns_not_found(self):
         role = unit.new_role_ref()
         self.assertRaises(exception.RoleNotFound,
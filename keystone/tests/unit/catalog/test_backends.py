@@ -491,6 +491,19 @@ class CatalogTests(object):
                           PROVIDERS.catalog_api.get_endpoint,
                           uuid.uuid4().hex)
 
+    def test_get_endpoints(self):
+        dummy_service, enabled_endpoint, disabled_endpoint = (
+            self._create_endpoints())
+        endpoints = PROVIDERS.catalog_api.get_endpoints(
+            [enabled_endpoint['id'], disabled_endpoint['id'],
+             uuid.uuid4().hex])
+        self.assertEqual(
+            set([enabled_endpoint['id'], disabled_endpoint['id']]),
+            set(endpoints))
+        self.assertDictEqual(
+            PROVIDERS.catalog_api.get_endpoint(enabled_endpoint['id']),
+            endpoints[enabled_endpoint['id']])
+
     def test_delete_endpoint_returns_not_found(self):
         self.assertRaises(exception.EndpointNotFound,
                           PROVIDERS.catalog_api.delete_endpoint,
@@ -10,14 +10,19 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import datetime
 import uuid
 
 from dogpile.cache import api as dogpile
 from dogpile.cache.backends import memory
+import freezegun
+import mock
 from oslo_config import fixture as config_fixture
+from oslo_context import context as oslo_context
 
 from keystone.common import cache
 import keystone.conf
+from keystone.models import token_model
 from keystone.tests import unit
 
 
@@ -195,3 +200,382 @@ class TestCacheRegion(unit.BaseTestCase):
         # test invalidation
         cache.CACHE_INVALIDATION_REGION.delete(region_key)
         self.assertIsInstance(self.region0.get(key), dogpile.NoValue)
+
+    def test_generations(self):
+        names = [uuid.uuid4().hex for i in range(3)]
+        generations = cache.get_generations(self.region0, names)
+        self.assertEqual(3, len(set(generations)))
+        self.assertEqual(generations,
+                         cache.get_generations(self.region1, names))
+
+        cache.bump_generations(self.region0, names[:1])
+        new_generations = cache.get_generations(self.region0, names)
+        self.assertNotEqual(generations[0], new_generations[0])
+        self.assertEqual(generations[1:], new_generations[1:])
+
+    def test_lost_generation_is_replaced(self):
+        name = uuid.uuid4().hex
+        generation = cache.get_generations(self.region0, [name])[0]
+        self.region0.delete(cache.GENERATION_KEY_PREFIX + name)
+        self.assertNotEqual(generation,
+                            cache.get_generations(self.region0, [name])[0])
+
+    def test_generations_are_invalidated_with_the_region(self):
+        name = uuid.uuid4().hex
+        generation = cache.get_generations(self.region0, [name])[0]
+        self.region0.invalidate()
+        self.assertNotEqual(generation,
+                            cache.get_generations(self.region0, [name])[0])
+
+    def _local_memoize(self):
+        self.config_fixture.config(group='cache', enabled=True)
+        self.config_fixture.config(group='role', local_cache_size=2)
+        self.addCleanup(cache._local_cache.clear)
+        return cache.get_memoization_decorator('role', region=self.region0)
+
+    def test_local_cache_avoids_the_backend(self):
+        memoize = self._local_memoize()
+
+        @memoize
+        def func(value):
+            return value + uuid.uuid4().hex
+
+        key = uuid.uuid4().hex
+        return_value = func(key)
+        # Only the local cache still holds the value.
+        self.cache_dict.clear()
+        self.assertEqual(return_value, func(key))
+
+        func.invalidate(key)
+        self.assertNotEqual(return_value, func(key))
+
+    def test_local_cache_when_invalidating_the_region(self):
+        memoize = self._local_memoize()
+
+        @memoize
+        def func(value):
+            return value + uuid.uuid4().hex
+
+        key = uuid.uuid4().hex
+        return_value = func(key)
+        # Invalidating the region from another process changes the region ID
+        # the local entries are keyed with.
+        self.region1.invalidate()
+        self.assertNotEqual(return_value, func(key))
+
+    def test_local_cache_is_bounded(self):
+        memoize = self._local_memoize()
+
+        @memoize
+        def func(value):
+            return value + uuid.uuid4().hex
+
+        keys = [uuid.uuid4().hex for i in range(3)]
+        return_values = [func(key) for key in keys]
+        self.cache_dict.clear()
+        # The least recently used entry was evicted.
+        self.assertNotEqual(return_values[0], func(keys[0]))
+        self.assertEqual(return_values[2], func(keys[2]))
+
+    def test_local_cache_entries_expire(self):
+        memoize = self._local_memoize()
+
+        @memoize
+        def func(value):
+            return value + uuid.uuid4().hex
+
+        key = uuid.uuid4().hex
+        with freezegun.freeze_time() as frozen_time:
+            return_value = func(key)
+            self.cache_dict.clear()
+            frozen_time.tick(
+                delta=datetime.timedelta(seconds=CONF.role.local_cache_time))
+            self.assertNotEqual(return_value, func(key))
+
+    def test_local_cache_returns_copies(self):
+        memoize = self._local_memoize()
+
+        @memoize
+        def func(value):
+            return {'value': value}
+
+        key = uuid.uuid4().hex
+        func(key)['value'] = None
+        self.assertEqual({'value': key}, func(key))
+
+    def test_region_id_is_kept_in_process(self):
+        self.config_fixture.config(group='cache', enabled=True)
+        self.config_fixture.config(cache_region_id_max_staleness=60)
+        memoize = cache.get_memoization_decorator('cache', region=self.region0)
+
+        @memoize
+        def func(value):
+            return value + uuid.uuid4().hex
+
+        key = uuid.uuid4().hex
+        with freezegun.freeze_time() as frozen_time:
+            return_value = func(key)
+
+            # Invalidating the region in this process is seen right away.
+            self.region0.invalidate()
+            new_value = func(key)
+            self.assertNotEqual(return_value, new_value)
+
+            # Invalidations from other processes are only seen once the
+            # region ID is too old to be used.
+            self.region1.invalidate()
+            self.assertEqual(new_value, func(key))
+            frozen_time.tick(delta=datetime.timedelta(seconds=60))
+            self.assertNotEqual(new_value, func(key))
+
+    def test_region_id_is_refreshed_in_background(self):
+        self.config_fixture.config(cache_region_id_max_staleness=60)
+        region_manager = cache.RegionInvalidationManager(
+            cache.CACHE_INVALIDATION_REGION, self.region0.name)
+        with freezegun.freeze_time() as frozen_time:
+            region_id = region_manager.region_id
+            self.region1.invalidate()
+
+            with mock.patch.object(region_manager,
+                                   '_schedule_refresh') as schedule_refresh:
+                self.assertEqual(region_id, region_manager.region_id)
+                schedule_refresh.assert_not_called()
+
+                frozen_time.tick(delta=datetime.timedelta(seconds=30))
+                self.assertEqual(region_id, region_manager.region_id)
+                schedule_refresh.assert_called_once_with()
+
+            region_manager._refresh_in_background()
+            self.assertNotEqual(region_id, region_manager.region_id)
+
+    def _use_request_local_cache(self):
+        # The regions' backend was replaced with a bare memory backend.
+        for region in (self.region0, self.region1):
+            region.wrap(cache._context_cache._ResponseCacheProxy)
+        oslo_context.RequestContext()
+
+    def test_request_local_cache(self):
+        self._use_request_local_cache()
+        key = uuid.uuid4().hex
+        value = {'value': [uuid.uuid4().hex]}
+
+        self.assertIsInstance(self.region0.get(key), dogpile.NoValue)
+        self.region0.set(key, value)
+        # The value is now read from the request local cache only.
+        self.cache_dict.clear()
+        cached_value = self.region0.get(key)
+        self.assertEqual(value, cached_value)
+
+        # Callers can't alter the cached value.
+        cached_value['value'].append(uuid.uuid4().hex)
+        self.assertEqual(value, self.region0.get(key))
+
+        self.assertEqual({'local': 2, 'backend': 0, 'miss': 1},
+                         cache.get_request_cache_stats())
+
+    def test_request_local_cache_immutable_values(self):
+        self._use_request_local_cache()
+        key = uuid.uuid4().hex
+        value = (uuid.uuid4().hex, 1)
+        self.region0.set(key, value)
+        self.cache_dict.clear()
+        # Immutable values are held as is.
+        self.assertIs(value, self.region0.get(key))
+
+    def test_request_local_cache_is_not_serialized(self):
+        self._use_request_local_cache()
+        token_key = uuid.uuid4().hex
+        token = token_model.TokenModel()
+        token.user_id = uuid.uuid4().hex
+        key = uuid.uuid4().hex
+        value = {'id': uuid.uuid4().hex, 'options': {},
+                 'tags': [uuid.uuid4().hex]}
+        with mock.patch.object(cache._context_cache, 'msgpackutils'
+                               ) as mock_msgpackutils:
+            self.region0.set(token_key, token)
+            self.region0.set(key, value)
+            self.cache_dict.clear()
+            for i in range(2):
+                # Tokens are read only once cached, so they are held as is.
+                self.assertIs(token, self.region0.get(token_key))
+                self.assertEqual(value, self.region0.get(key))
+            mock_msgpackutils.dumps.assert_not_called()
+            mock_msgpackutils.loads.assert_not_called()
+
+        # Callers can't alter the cached dictionaries.
+        cached_value = self.region0.get(key)
+        cached_value['tags'].append(uuid.uuid4().hex)
+        cached_value['options']['immutable'] = True
+        self.assertEqual(value, self.region0.get(key))
+
+    def test_request_local_cache_multi(self):
+        self._use_request_local_cache()
+        keys = [uuid.uuid4().hex for i in range(3)]
+        self.region0.set(keys[0], uuid.uuid4().hex)
+        self.region0.set(keys[1], uuid.uuid4().hex)
+
+        # A new request starts with an empty request local cache.
+        oslo_context.RequestContext()
+        values = self.region0.get_multi(keys)
+        self._assert_has_no_value(values[2:])
+        # Values read from the backend are kept in the request local cache.
+        self.cache_dict.clear()
+        self.assertEqual(values[:2], self.region0.get_multi(keys[:2]))
+
+        self.assertEqual({'local': 2, 'backend': 2, 'miss': 1},
+                         cache.get_request_cache_stats())
+
+    def test_request_cache_stats_without_request(self):
+        self.assertEqual({'local': 0, 'backend': 0, 'miss': 0},
+                         cache.get_request_cache_stats())
+
+    def _collect_metrics(self):
+        self.config_fixture.config(group='cache', enabled=True)
+        self.config_fixture.config(cache_metrics=True)
+        cache._metrics.reset()
+        self.addCleanup(cache._metrics.reset)
+
+    def test_function_metrics(self):
+        self._collect_metrics()
+        memoize = cache.get_memoization_decorator('cache', region=self.region0)
+
+        @memoize
+        def func(value):
+            return value + uuid.uuid4().hex
+
+        key = uuid.uuid4().hex
+        func(key)
+        func(key)
+
+        name = cache._metrics.function_name(self.region0, func.original)
+        metrics = cache.get_metrics_report()['functions'][name]
+        self.assertEqual(2, metrics['calls'])
+        self.assertEqual(1, metrics['misses'])
+        self.assertEqual(0.5, metrics['hit_ratio'])
+
+    def test_region_metrics(self):
+        self._collect_metrics()
+        # The region's backend was replaced with a bare memory backend.
+        self.region0.wrap(cache._metrics.MetricsProxy(self.region0.name))
+        keys = [uuid.uuid4().hex for i in range(3)]
+
+        self.region0.set(keys[0], uuid.uuid4().hex)
+        self.region0.get_multi(keys[:2])
+        self.region0.delete(keys[0])
+        self.region0.invalidate()
+
+        metrics = cache.get_metrics_report()['regions'][self.region0.name]
+        self.assertEqual(2, metrics['gets'])
+        self.assertEqual(1, metrics['hits'])
+        self.assertEqual(1, metrics['misses'])
+        self.assertEqual(0.5, metrics['hit_ratio'])
+        self.assertEqual(1, metrics['sets'])
+        self.assertGreater(metrics['value_bytes'], 0)
+        self.assertEqual(1, metrics['deletes'])
+        self.assertEqual(1, metrics['invalidations'])
+
+    def test_metrics_are_not_collected_by_default(self):
+        cache._metrics.reset()
+        memoize = cache.get_memoization_decorator('cache', region=self.region0)
+
+        @memoize
+        def func(value):
+            return value + uuid.uuid4().hex
+
+        func(uuid.uuid4().hex)
+        self.assertEqual({}, cache.get_metrics_report()['functions'])
+
+    def _stale_region(self):
+        self.config_fixture.config(group='cache', enabled=True)
+        self.config_fixture.config(cache_stale_while_revalidate=60)
+        region = cache.create_region(uuid.uuid4().hex, serve_stale=True)
+        cache.configure_cache(region=region)
+        return region
+
+    def _lock_func_key(self, region, func, *args):
+        key = region.function_key_generator(None, func.original)(*args)
+        return cache._stale_cache.get_mutex(region, region.key_mangler(key))
+
+    def test_stale_values_are_served_while_regenerating(self):
+        region = self._stale_region()
+        memoize = cache.get_memoization_decorator('cache', region=region)
+        values = ['old']
+
+        @memoize
+        def func(value):
+            return values[0]
+
+        key = uuid.uuid4().hex
+        self.assertEqual('old', func(key))
+        values[0] = 'new'
+        region.invalidate()
+
+        # The previous value is served while another caller computes it.
+        mutex = self._lock_func_key(region, func, key)
+        self.assertTrue(mutex.acquire(False))
+        self.assertEqual('old', func(key))
+        mutex.release()
+
+        self.assertEqual('new', func(key))
+        values[0] = 'newer'
+        self.assertEqual('new', func(key))
+
+    def test_stale_values_are_served_for_a_bounded_time(self):
+        region = self._stale_region()
+        memoize = cache.get_memoization_decorator('cache', region=region)
+        values = ['old']
+
+        @memoize
+        def func(value):
+            return values[0]
+
+        key = uuid.uuid4().hex
+        with freezegun.freeze_time(datetime.datetime.utcnow()) as frozen_time:
+            self.assertEqual('old', func(key))
+            values[0] = 'new'
+            region.invalidate()
+            frozen_time.tick(delta=datetime.timedelta(seconds=61))
+
+            mutex = self._lock_func_key(region, func, key)
+            self.assertTrue(mutex.acquire(False))
+            self.addCleanup(mutex.release)
+            self.assertEqual('new', func(key))
+
+    def test_stale_values_are_not_served_by_default(self):
+        region = self._stale_region()
+        self.config_fixture.config(cache_stale_while_revalidate=0)
+        memoize = cache.get_memoization_decorator('cache', region=region)
+        values = ['old']
+
+        @memoize
+        def func(value):
+            return values[0]
+
+        key = uuid.uuid4().hex
+        self.assertEqual('old', func(key))
+        values[0] = 'new'
+        region.invalidate()
+        self.assertEqual('new', func(key))
+
+    def test_stale_values_metrics(self):
+        self._collect_metrics()
+        region = self._stale_region()
+        memoize = cache.get_memoization_decorator('cache', region=region)
+
+        @memoize
+        def func(value):
+            return uuid.uuid4().hex
+
+        key = uuid.uuid4().hex
+        func(key)
+        region.invalidate()
+        mutex = self._lock_func_key(region, func, key)
+        mutex.acquire(False)
+        func(key)
+        mutex.release()
+        func(key)
+
+        name = cache._metrics.function_name(region, func.original)
+        metrics = cache.get_metrics_report()['functions'][name]
+        self.assertEqual(1, metrics['stale_hits'])
+        self.assertEqual(1, metrics['regenerations'])
@@ -1200,6 +1200,36 @@ class CadfNotificationsWrapperTestCase(test_v3.RestfulTestCase):
                                    domain=self.domain_id,
                                    group=group['id'])
 
+    def test_bulk_role_assignments(self):
+        group_ref = unit.new_group_ref(domain_id=self.domain_id)
+        group = PROVIDERS.identity_api.create_group(group_ref)
+        role_assignments = [
+            {'role': {'id': self.role_id},
+             'user': {'id': self.user_id},
+             'scope': {'project': {'id': self.project_id}}},
+            {'role': {'id': self.role_id},
+             'group': {'id': group['id']},
+             'scope': {'domain': {'id': self.domain_id},
+                       'OS-INHERIT:inherited_to': 'projects'}}]
+        body = {'role_assignments': role_assignments}
+
+        for method, operation in ((self.put, CREATED_OPERATION),
+                                  (self.delete, DELETED_OPERATION)):
+            del self._notifications[:]
+            method('/role_assignments', body=body)
+            # One notification is sent for each role assignment.
+            self.assertEqual(2, len(self._notifications))
+            action = '%s.%s' % (operation, self.ROLE_ASSIGNMENT)
+            event_type = '%s.%s.%s' % (notifications.SERVICE,
+                                       self.ROLE_ASSIGNMENT, operation)
+            self._assert_last_note(action, self.user_id, event_type)
+            self._assert_event(self.role_id, domain=self.domain_id,
+                               group=group['id'], inherit=True)
+            self._notifications.pop()
+            self._assert_last_note(action, self.user_id, event_type)
+            self._assert_event(self.role_id, project=self.project_id,
+                               user=self.user_id)
+
     def test_add_role_to_user_and_project(self):
         # A notification is sent when add_role_to_user_and_project is called on
         # the assignment manager.
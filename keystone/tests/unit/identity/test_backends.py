@@ -14,6 +14,7 @@
 
 import uuid
 
+import mock
 from six.moves import range
 from testtools import matchers
 
@@ -128,6 +129,49 @@ class IdentityTests(object):
         self.assertIn('options', user_ref)
         self.assertDictEqual(self.user_foo, user_ref)
 
+    def test_get_users(self):
+        missing_user_id = uuid.uuid4().hex
+        users = PROVIDERS.identity_api.get_users(
+            [self.user_foo['id'], self.user_two['id'], missing_user_id])
+        self.assertEqual(set([self.user_foo['id'], self.user_two['id']]),
+                         set(users))
+        self.assertDictEqual(
+            PROVIDERS.identity_api.get_user(self.user_foo['id']),
+            users[self.user_foo['id']])
+
+    def test_get_groups(self):
+        group = unit.new_group_ref(domain_id=CONF.identity.default_domain_id)
+        group = PROVIDERS.identity_api.create_group(group)
+        missing_group_id = uuid.uuid4().hex
+        groups = PROVIDERS.identity_api.get_groups(
+            [group['id'], missing_group_id])
+        self.assertEqual([group['id']], list(groups))
+        self.assertDictEqual(
+            PROVIDERS.identity_api.get_group(group['id']),
+            groups[group['id']])
+
+    def test_get_users_reads_missed_users_at_once(self):
+        user_ids = [self.user_foo['id'], self.user_two['id']]
+        for user_id in user_ids:
+            PROVIDERS.identity_api.get_user.invalidate(
+                PROVIDERS.identity_api, user_id)
+        try:
+            users_from_ids = (
+                PROVIDERS.identity_api.driver.list_users_from_ids)
+            users_from_ids(user_ids)
+        except exception.NotImplemented:
+            self.skipTest('Backend cannot list users from IDs')
+
+        with mock.patch.object(PROVIDERS.identity_api.driver,
+                               'list_users_from_ids',
+                               side_effect=users_from_ids) as mock_list, \
+                mock.patch.object(PROVIDERS.identity_api.driver, 'get_user'
+                                  ) as mock_get_user:
+            users = PROVIDERS.identity_api.get_users(user_ids)
+            self.assertEqual(set(user_ids), set(users))
+            self.assertEqual(1, mock_list.call_count)
+            mock_get_user.assert_not_called()
+
     def test_get_user_returns_required_attributes(self):
         user_ref = PROVIDERS.identity_api.get_user(self.user_foo['id'])
         self.assertIn('id', user_ref)
@@ -173,6 +217,26 @@ class IdentityTests(object):
                 ref['name'], ref['domain_id']), user_updated
         )
 
+    @unit.skip_if_cache_disabled('identity')
+    def test_cache_layer_get_user_not_found(self):
+        self.config_fixture.config(group='identity', negative_cache_time=60)
+        user_id = uuid.uuid4().hex
+        get_user = PROVIDERS.identity_api.driver.get_user
+        with mock.patch.object(PROVIDERS.identity_api.driver, 'get_user',
+                               side_effect=get_user) as mock_get_user:
+            self.assertRaises(exception.UserNotFound,
+                              PROVIDERS.identity_api.get_user, user_id)
+            self.assertRaises(exception.UserNotFound,
+                              PROVIDERS.identity_api.get_user, user_id)
+            # The second lookup didn't reach the backend.
+            self.assertEqual(1, mock_get_user.call_count)
+
+            PROVIDERS.identity_api.get_user.invalidate(
+                PROVIDERS.identity_api, user_id)
+            self.assertRaises(exception.UserNotFound,
+                              PROVIDERS.identity_api.get_user, user_id)
+            self.assertEqual(2, mock_get_user.call_count)
+
     def test_get_user_returns_not_found(self):
         self.assertRaises(exception.UserNotFound,
                           PROVIDERS.identity_api.get_user,
@@ -782,6 +846,30 @@ class IdentityTests(object):
                           PROVIDERS.identity_api.list_users_in_group,
                           uuid.uuid4().hex)
 
+    def test_list_users_in_groups(self):
+        domain = self._get_domain_fixture()
+        groups = []
+        for x in range(3):
+            new_group = unit.new_group_ref(domain_id=domain['id'])
+            groups.append(PROVIDERS.identity_api.create_group(new_group))
+        for x in range(2):
+            new_user = unit.new_user_ref(domain_id=domain['id'])
+            new_user = PROVIDERS.identity_api.create_user(new_user)
+            for group in groups[x + 1:]:
+                PROVIDERS.identity_api.add_user_to_group(
+                    new_user['id'], group['id'])
+
+        group_ids = [group['id'] for group in groups]
+        users = PROVIDERS.identity_api.list_users_in_groups(
+            group_ids + [uuid.uuid4().hex])
+        self.assertItemsEqual(group_ids, users)
+        for group_id in group_ids:
+            self.assertItemsEqual(
+                PROVIDERS.identity_api.list_users_in_group(group_id),
+                users[group_id])
+        self.assertEqual([0, 1, 2],
+                         [len(users[group_id]) for group_id in group_ids])
+
     def test_list_groups_for_user(self):
         domain = self._get_domain_fixture()
         test_groups = []
@@ -43,6 +43,35 @@ class ResourceTests(object):
                           PROVIDERS.resource_api.get_project,
                           uuid.uuid4().hex)
 
+    def test_get_projects(self):
+        missing_project_id = uuid.uuid4().hex
+        projects = PROVIDERS.resource_api.get_projects(
+            [self.tenant_bar['id'], self.tenant_baz['id'],
+             missing_project_id])
+        self.assertEqual(set([self.tenant_bar['id'], self.tenant_baz['id']]),
+                         set(projects))
+        self.assertDictEqual(self.tenant_bar, projects[self.tenant_bar['id']])
+
+    def test_get_projects_ignores_ids_not_asked_for(self):
+        # The backend may match the IDs case insensitively.
+        project_id = self.tenant_bar['id'].upper()
+        with mock.patch.object(PROVIDERS.resource_api.driver,
+                               'list_projects_from_ids',
+                               return_value=[self.tenant_bar]):
+            projects = PROVIDERS.resource_api.get_projects([project_id])
+        self.assertEqual({}, projects)
+
+    def test_get_domains(self):
+        domains = PROVIDERS.resource_api.get_domains(
+            [CONF.identity.default_domain_id, self.tenant_bar['id'],
+             uuid.uuid4().hex])
+        # Only projects acting as domains are returned.
+        self.assertEqual([CONF.identity.default_domain_id], list(domains))
+        self.assertDictEqual(
+            PROVIDERS.resource_api.get_domain(
+                CONF.identity.default_domain_id),
+            domains[CONF.identity.default_domain_id])
+
     def test_get_project_by_name(self):
         tenant_ref = PROVIDERS.resource_api.get_project_by_name(
             self.tenant_bar['name'],
@@ -1381,6 +1410,24 @@ class ResourceTests(object):
                           PROVIDERS.resource_api.get_domain_by_name,
                           domain_name)
 
+    @unit.skip_if_cache_disabled('resource')
+    def test_create_domain_after_domain_not_found(self):
+        self.config_fixture.config(group='resource', negative_cache_time=60)
+        domain = unit.new_domain_ref()
+        self.assertRaises(exception.DomainNotFound,
+                          PROVIDERS.resource_api.get_domain,
+                          domain['id'])
+        self.assertRaises(exception.ProjectNotFound,
+                          PROVIDERS.resource_api.get_project,
+                          domain['id'])
+        PROVIDERS.resource_api.create_domain(domain['id'], domain)
+        self.assertEqual(
+            domain['name'],
+            PROVIDERS.resource_api.get_domain(domain['id'])['name'])
+        self.assertEqual(
+            domain['name'],
+            PROVIDERS.resource_api.get_project(domain['id'])['name'])
+
     @unit.skip_if_cache_disabled('resource')
     def test_cache_layer_domain_crud(self):
         domain = unit.new_domain_ref()
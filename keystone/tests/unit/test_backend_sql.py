@@ -203,6 +203,13 @@ class SqlModels(SqlTests):
                 ('inherited', sql.Boolean, False))
         self.assertExpectedSchema('assignment', cols)
 
+    def test_effective_role_assignment_model(self):
+        cols = (('user_id', sql.String, 64),
+                ('target_type', sql.String, 64),
+                ('target_id', sql.String, 64),
+                ('role_id', sql.String, 64))
+        self.assertExpectedSchema('effective_assignment', cols)
+
     def test_user_group_membership(self):
         cols = (('group_id', sql.String, 64),
                 ('user_id', sql.String, 64))
@@ -39,6 +39,7 @@ from keystone.cmd.doctor import ldap
 from keystone.cmd.doctor import security_compliance
 from keystone.cmd.doctor import tokens
 from keystone.cmd.doctor import tokens_fernet
+from keystone.common import cache
 from keystone.common import provider_api
 from keystone.common.sql import upgrades
 import keystone.conf
@@ -1327,6 +1328,155 @@ class TokenFernetDoctorTests(unit.TestCase):
             tokens_fernet.symptom_usability_of_Fernet_key_repository())
 
 
+class TestRevocationPrune(unit.SQLDriverOverrides, unit.BaseTestCase):
+
+    def setUp(self):
+        super(TestRevocationPrune, self).setUp()
+        self.config_fixture = self.useFixture(oslo_config.fixture.Config(CONF))
+        self.config_fixture.register_cli_opt(cli.command_opt)
+        parser_test = argparse.ArgumentParser()
+        subparsers = parser_test.add_subparsers()
+        self.parser = cli.RevocationPrune.add_argument_parser(subparsers)
+
+    def test_revocation_prune_with_batch_size(self):
+        res = self.parser.parse_args(['--batch-size', '50'])
+        self.assertEqual(50, vars(res)['batch_size'])
+
+    def test_revocation_prune_without_batch_size(self):
+        res = self.parser.parse_args([])
+        self.assertIsNone(vars(res)['batch_size'])
+
+    def test_revocation_prune_with_invalid_batch_size_fails(self):
+        self.assertRaises(unit.UnexpectedExit, self.parser.parse_args,
+                          ['--batch-size', 'all'])
+
+        class FakeConfCommand(object):
+            batch_size = 0
+
+        self.useFixture(fixtures.MockPatchObject(
+            CONF, 'command', FakeConfCommand()))
+        self.assertRaises(ValueError, cli.RevocationPrune.main)
+
+
+class TestCacheWarm(unit.SQLDriverOverrides, unit.BaseTestCase):
+
+    def setUp(self):
+        super(TestCacheWarm, self).setUp()
+        self.config_fixture = self.useFixture(oslo_config.fixture.Config(CONF))
+        self.config_fixture.register_cli_opt(cli.command_opt)
+        parser_test = argparse.ArgumentParser()
+        subparsers = parser_test.add_subparsers()
+        self.parser = cli.CacheWarm.add_argument_parser(subparsers)
+
+    def test_cache_warm_with_budget(self):
+        res = self.parser.parse_args(['--max-time', '10',
+                                      '--max-entries', '100'])
+        self.assertEqual(10, vars(res)['max_time'])
+        self.assertEqual(100, vars(res)['max_entries'])
+
+    def test_cache_warm_without_budget(self):
+        res = self.parser.parse_args([])
+        self.assertIsNone(vars(res)['max_time'])
+        self.assertIsNone(vars(res)['max_entries'])
+
+    def test_cache_warm_with_invalid_budget_fails(self):
+        self.assertRaises(unit.UnexpectedExit, self.parser.parse_args,
+                          ['--max-entries', 'all'])
+
+        class FakeConfCommand(object):
+            max_time = None
+            max_entries = -1
+
+        self.useFixture(fixtures.MockPatchObject(
+            CONF, 'command', FakeConfCommand()))
+        self.assertRaises(ValueError, cli.CacheWarm.main)
+
+
+class TestCacheWarmFunctional(unit.SQLDriverOverrides, unit.TestCase):
+
+    def setUp(self):
+        self.useFixture(database.Database())
+        super(TestCacheWarmFunctional, self).setUp()
+        self.load_backends()
+        self.load_fixtures(default_fixtures)
+        cache.CACHE_REGION.invalidate()
+
+    def test_cache_warm(self):
+        role = unit.new_role_ref()
+        PROVIDERS.role_api.driver.create_role(role['id'], role)
+        project = unit.new_project_ref(
+            domain_id=CONF.identity.default_domain_id)
+        PROVIDERS.resource_api.driver.create_project(project['id'], project)
+
+        report = cache.warm()
+        self.assertEqual([], report['skipped'])
+        self.assertEqual([], report['failed'])
+        self.assertEqual(len(default_fixtures.ROLES) + 1,
+                         report['loaded']['roles'])
+
+        # The entities are now read from the cache.
+        PROVIDERS.role_api.driver.delete_role(role['id'])
+        PROVIDERS.resource_api.driver.delete_project(project['id'])
+        self.assertEqual(role['name'],
+                         PROVIDERS.role_api.get_role(role['id'])['name'])
+        self.assertEqual(
+            project['name'],
+            PROVIDERS.resource_api.get_project(project['id'])['name'])
+        self.assertEqual(
+            CONF.identity.default_domain_id,
+            PROVIDERS.resource_api.get_domain(
+                CONF.identity.default_domain_id)['id'])
+
+    def test_cache_warm_with_entries_budget(self):
+        report = cache.warm(max_entries=1)
+        self.assertEqual({'roles': 1}, report['loaded'])
+        self.assertEqual(
+            ['domains', 'service_providers', 'catalog', 'projects'],
+            report['skipped'])
+
+    def test_cache_warm_with_caching_disabled(self):
+        self.config_fixture.config(group='role', caching=False)
+        report = cache.warm()
+        self.assertIn('roles', report['skipped'])
+        self.assertNotIn('roles', report['loaded'])
+
+
+class TestEffectiveAssignmentsRebuildFunctional(unit.SQLDriverOverrides,
+                                                unit.TestCase):
+
+    def setUp(self):
+        self.useFixture(database.Database())
+        super(TestEffectiveAssignmentsRebuildFunctional, self).setUp()
+        self.load_backends()
+        self.load_fixtures(default_fixtures)
+
+    def config_files(self):
+        self.config_fixture.register_cli_opt(cli.command_opt)
+        return super(
+            TestEffectiveAssignmentsRebuildFunctional, self
+        ).config_files()
+
+    def test_effective_assignments_rebuild(self):
+        group = unit.new_group_ref(domain_id=CONF.identity.default_domain_id)
+        group = PROVIDERS.identity_api.create_group(group)
+        PROVIDERS.identity_api.add_user_to_group(
+            self.user_foo['id'], group['id'])
+        PROVIDERS.assignment_api.driver.create_grant(
+            self.role_member['id'], group_id=group['id'],
+            domain_id=CONF.identity.default_domain_id,
+            inherited_to_projects=True)
+
+        provider_api.ProviderAPIs._clear_registry_instances()
+        cli.EffectiveAssignmentsRebuild.main()
+
+        assignments = (
+            PROVIDERS.assignment_api.driver.list_effective_assignments(
+                user_id=self.user_foo['id'], target_type='project',
+                target_id=self.tenant_bar['id']))
+        self.assertIn(self.role_member['id'],
+                      [a['role_id'] for a in assignments])
+
+
 class TestMappingPurge(unit.SQLDriverOverrides, unit.BaseTestCase):
 
     class FakeConfCommand(object):
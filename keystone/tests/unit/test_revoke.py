@@ -14,6 +14,7 @@
 import datetime
 import uuid
 
+import freezegun
 import mock
 from oslo_utils import timeutils
 from testtools import matchers
@@ -24,6 +25,7 @@ import keystone.conf
 from keystone import exception
 from keystone.models import revoke_model
 from keystone.revoke.backends import sql
+from keystone.revoke import core as revoke_core
 from keystone.tests import unit
 from keystone.tests.unit import ksfixtures
 from keystone.tests.unit import test_backend_sql
@@ -396,6 +398,140 @@ class RevokeTests(object):
         self._assertTokenRevoked(token)
         self.assertEqual(1, len(revocation_backend.list_events(token=token)))
 
+    def test_check_tokens(self):
+        revoked_user_token = _sample_blank_token()
+        revoked_user_token['user_id'] = uuid.uuid4().hex
+        PROVIDERS.revoke_api.revoke_by_user(
+            user_id=revoked_user_token['user_id'])
+
+        revoked_audit_token = _sample_blank_token()
+        revoked_audit_token['audit_id'] = uuid.uuid4().hex
+        PROVIDERS.revoke_api.revoke_by_audit_id(
+            audit_id=revoked_audit_token['audit_id'])
+
+        valid_token = _sample_blank_token()
+        valid_token['user_id'] = uuid.uuid4().hex
+        valid_token['audit_id'] = uuid.uuid4().hex
+
+        # tokens issued after a revocation event aren't affected by it
+        reissued_token = _sample_blank_token()
+        reissued_token['user_id'] = revoked_user_token['user_id']
+        reissued_token['issued_at'] = _future_time()
+
+        tokens = [revoked_user_token, valid_token, revoked_audit_token,
+                  reissued_token]
+        self.assertEqual([True, False, True, False],
+                         PROVIDERS.revoke_api.check_tokens(tokens))
+        self.assertEqual([True],
+                         PROVIDERS.revoke_api.check_tokens(tokens[:1]))
+        self.assertEqual([], PROVIDERS.revoke_api.check_tokens([]))
+
+    def test_check_token_only_lists_new_events(self):
+        token = _sample_blank_token()
+        token['user_id'] = uuid.uuid4().hex
+        PROVIDERS.revoke_api.revoke_by_user(user_id=uuid.uuid4().hex)
+        self._assertTokenNotRevoked(token)
+
+        with mock.patch.object(PROVIDERS.revoke_api.driver, 'list_events',
+                               wraps=PROVIDERS.revoke_api.driver.list_events
+                               ) as mock_list_events:
+            PROVIDERS.revoke_api.revoke_by_user(user_id=token['user_id'])
+            self._assertTokenRevoked(token)
+            # The index was already populated, so only the events revoked
+            # around or after the last known event are listed.
+            self.assertEqual(1, mock_list_events.call_count)
+            last_fetch = mock_list_events.call_args[0][0]
+            self.assertIsNotNone(last_fetch)
+
+    def test_check_token_polls_new_events_periodically(self):
+        self.config_fixture.config(group='revoke', caching=False,
+                                   index_poll_interval=60)
+        token = _sample_blank_token()
+        token['user_id'] = uuid.uuid4().hex
+        self._assertTokenNotRevoked(token)
+
+        with mock.patch.object(PROVIDERS.revoke_api.driver, 'list_events',
+                               wraps=PROVIDERS.revoke_api.driver.list_events
+                               ) as mock_list_events:
+            self._assertTokenNotRevoked(token)
+            # The revocations recorded by this process are enforced right
+            # away.
+            PROVIDERS.revoke_api.revoke_by_user(user_id=token['user_id'])
+            self._assertTokenRevoked(token)
+            self.assertFalse(mock_list_events.called)
+
+            # Those recorded by other processes once the interval elapses.
+            other_token = _sample_blank_token()
+            other_token['user_id'] = uuid.uuid4().hex
+            PROVIDERS.revoke_api.driver.revoke(
+                revoke_model.RevokeEvent(user_id=other_token['user_id']))
+            self._assertTokenNotRevoked(other_token)
+            self.assertFalse(mock_list_events.called)
+            PROVIDERS.revoke_api._last_poll -= 60
+            self._assertTokenRevoked(other_token)
+            self.assertEqual(1, mock_list_events.call_count)
+
+    def test_check_token_rereads_all_events_periodically(self):
+        self.config_fixture.config(group='revoke', index_resync_interval=300)
+        token = _sample_blank_token()
+        token['user_id'] = uuid.uuid4().hex
+        PROVIDERS.revoke_api.revoke_by_user(user_id=uuid.uuid4().hex)
+        self._assertTokenNotRevoked(token)
+
+        # An event recorded by a node whose clock lags behind is older than
+        # the events listed since the last one in the index.
+        watermark = PROVIDERS.revoke_api._index.watermark
+        revoked_at = watermark - datetime.timedelta(
+            seconds=revoke_core.INDEX_SYNC_OVERLAP + 60)
+        PROVIDERS.revoke_api.driver.revoke(revoke_model.RevokeEvent(
+            user_id=token['user_id'], issued_before=timeutils.utcnow(),
+            revoked_at=revoked_at))
+        PROVIDERS.revoke_api._bump_generations(['user:' + token['user_id']])
+        self._assertTokenNotRevoked(token)
+
+        # It is caught once the interval between two full reads elapses.
+        PROVIDERS.revoke_api._last_resync -= 300
+        self._assertTokenRevoked(token)
+
+    @unit.skip_if_cache_disabled('revoke')
+    def test_check_token_without_new_events_uses_cache(self):
+        token = _sample_blank_token()
+        token['user_id'] = uuid.uuid4().hex
+        PROVIDERS.revoke_api.revoke_by_user(user_id=uuid.uuid4().hex)
+        self._assertTokenNotRevoked(token)
+
+        with mock.patch.object(PROVIDERS.revoke_api.driver,
+                               'list_events') as mock_list_events:
+            self._assertTokenNotRevoked(token)
+            self.assertFalse(mock_list_events.called)
+
+    @unit.skip_if_cache_disabled('revoke')
+    def test_revoke_does_not_affect_cache_of_unrelated_tokens(self):
+        token = _sample_blank_token()
+        token['user_id'] = uuid.uuid4().hex
+        token['audit_id'] = uuid.uuid4().hex
+        token['audit_chain_id'] = token['audit_id']
+        other_token = _sample_blank_token()
+        other_token['user_id'] = uuid.uuid4().hex
+        other_token['audit_id'] = uuid.uuid4().hex
+        other_token['audit_chain_id'] = other_token['audit_id']
+        self._assertTokenNotRevoked(token)
+        self._assertTokenNotRevoked(other_token)
+
+        with mock.patch.object(PROVIDERS.revoke_api.driver, 'list_events',
+                               wraps=PROVIDERS.revoke_api.driver.list_events
+                               ) as mock_list_events:
+            PROVIDERS.revoke_api.revoke_by_audit_id(token['audit_id'])
+            PROVIDERS.revoke_api.revoke_by_user(user_id=token['user_id'])
+            self._assertTokenNotRevoked(other_token)
+            self.assertFalse(mock_list_events.called)
+
+            self._assertTokenRevoked(token)
+            self.assertEqual(1, mock_list_events.call_count)
+
+        # The revocation events API sees every new event.
+        self.assertEqual(2, len(PROVIDERS.revoke_api.list_events()))
+
     @mock.patch.object(timeutils, 'utcnow')
     def test_expired_events_are_removed(self, mock_utcnow):
         def _sample_token_values():
@@ -428,6 +564,74 @@ class RevokeTests(object):
                           PROVIDERS.revoke_api.check_token,
                           token_values)
 
+    def _revoke_expired_events(self, count):
+        expired = (timeutils.utcnow() -
+                   datetime.timedelta(seconds=CONF.token.expiration +
+                                      CONF.revoke.expiration_buffer + 60))
+        with freezegun.freeze_time(expired):
+            for _ in range(count):
+                PROVIDERS.revoke_api.revoke_by_user(
+                    user_id=uuid.uuid4().hex)
+
+    def test_revoke_does_not_prune_expired_events(self):
+        revocation_backend = sql.Revoke()
+        self._revoke_expired_events(2)
+        PROVIDERS.revoke_api.revoke_by_user(user_id=uuid.uuid4().hex)
+        self.assertEqual(3, len(revocation_backend.list_events()))
+
+    def test_prune_expired_events(self):
+        revocation_backend = sql.Revoke()
+        self._revoke_expired_events(5)
+        PROVIDERS.revoke_api.revoke_by_user(user_id=uuid.uuid4().hex)
+
+        with mock.patch.object(revocation_backend, '_prune_batch',
+                               wraps=revocation_backend._prune_batch
+                               ) as mock_prune_batch:
+            pruned = revocation_backend.prune_expired_events(
+                timeutils.utcnow() - datetime.timedelta(
+                    seconds=CONF.token.expiration +
+                    CONF.revoke.expiration_buffer),
+                batch_size=2)
+        self.assertEqual(5, pruned)
+        # Two full batches, then a last one with the remaining event.
+        self.assertEqual(3, mock_prune_batch.call_count)
+        self.assertEqual(1, len(revocation_backend.list_events()))
+
+        pruned, elapsed = PROVIDERS.revoke_api.prune_expired_events()
+        self.assertEqual(0, pruned)
+        self.assertGreaterEqual(elapsed, 0)
+
+    def test_revoke_schedules_background_prune(self):
+        self.config_fixture.config(group='revoke', prune_interval=60)
+        with mock.patch('threading.Thread') as mock_thread:
+            # The first prune happens one interval after startup.
+            PROVIDERS.revoke_api.revoke_by_user(user_id=uuid.uuid4().hex)
+            self.assertFalse(mock_thread.called)
+
+            PROVIDERS.revoke_api._last_prune -= 60
+            PROVIDERS.revoke_api.revoke_by_user(user_id=uuid.uuid4().hex)
+            self.assertEqual(1, mock_thread.call_count)
+            mock_thread.return_value.start.assert_called_once_with()
+
+            # No other prune is started until the interval elapses again.
+            PROVIDERS.revoke_api._pruning = False
+            PROVIDERS.revoke_api.revoke_by_user(user_id=uuid.uuid4().hex)
+            self.assertEqual(1, mock_thread.call_count)
+
+    def test_background_prune_stops_when_not_implemented(self):
+        self.config_fixture.config(group='revoke', prune_interval=60)
+        revoke_api = PROVIDERS.revoke_api
+        with mock.patch.object(revoke_api.driver, 'prune_expired_events',
+                               side_effect=exception.NotImplemented()
+                               ) as mock_prune:
+            revoke_api._prune_in_background()
+            self.assertEqual(1, mock_prune.call_count)
+
+            with mock.patch('threading.Thread') as mock_thread:
+                revoke_api._last_prune -= 60
+                revoke_api.revoke_by_user(user_id=uuid.uuid4().hex)
+                self.assertFalse(mock_thread.called)
+
     def test_delete_group_without_role_does_not_revoke_users(self):
         revocation_backend = sql.Revoke()
         domain = unit.new_domain_ref()
@@ -483,6 +687,74 @@ class RevokeTests(object):
         self.assertEqual(2, len(revocation_backend.list_events()))
 
 
+class RevokeIndexTests(unit.BaseTestCase):
+
+    def setUp(self):
+        super(RevokeIndexTests, self).setUp()
+        self.index = revoke_model.RevokeIndex()
+
+    def test_add_ignores_known_events(self):
+        events = [revoke_model.RevokeEvent(user_id=uuid.uuid4().hex),
+                  revoke_model.RevokeEvent(audit_id=uuid.uuid4().hex)]
+        self.assertEqual(2, self.index.add(events))
+        self.assertEqual(0, self.index.add(events))
+        self.assertEqual(2, len(self.index))
+        self.assertEqual(max(e.revoked_at for e in events),
+                         self.index.watermark)
+
+    def test_is_revoked(self):
+        user_id = uuid.uuid4().hex
+        domain_id = uuid.uuid4().hex
+        role_id = uuid.uuid4().hex
+        project_id = uuid.uuid4().hex
+        self.index.add([
+            revoke_model.RevokeEvent(user_id=user_id),
+            revoke_model.RevokeEvent(domain_id=domain_id),
+            revoke_model.RevokeEvent(role_id=role_id, project_id=project_id),
+        ])
+
+        token = _sample_blank_token()
+        token['roles'] = []
+        self.assertFalse(self.index.is_revoked(token))
+
+        for key in ('user_id', 'trustor_id', 'trustee_id'):
+            user_token = dict(token, **{key: user_id})
+            self.assertTrue(self.index.is_revoked(user_token))
+
+        for key in ('identity_domain_id', 'assignment_domain_id'):
+            domain_token = dict(token, **{key: domain_id})
+            self.assertTrue(self.index.is_revoked(domain_token))
+
+        role_token = dict(token, roles=[role_id])
+        self.assertFalse(self.index.is_revoked(role_token))
+        role_token['project_id'] = project_id
+        self.assertTrue(self.index.is_revoked(role_token))
+
+        # Tokens issued after the revocation are not affected by it.
+        reissued_token = dict(token, user_id=user_id,
+                              issued_at=_future_time())
+        self.assertFalse(self.index.is_revoked(reissued_token))
+
+    def test_prune(self):
+        now = timeutils.utcnow().replace(microsecond=0)
+        user_id = uuid.uuid4().hex
+        self.index.add([
+            revoke_model.RevokeEvent(
+                user_id=user_id,
+                revoked_at=now - datetime.timedelta(hours=2)),
+            revoke_model.RevokeEvent(audit_id=uuid.uuid4().hex,
+                                     revoked_at=now),
+        ])
+
+        oldest = now - datetime.timedelta(hours=1)
+        self.assertEqual(1, self.index.prune(oldest))
+        self.assertEqual(1, len(self.index))
+        token = _sample_blank_token()
+        token['user_id'] = user_id
+        token['issued_at'] = now - datetime.timedelta(hours=3)
+        self.assertFalse(self.index.is_revoked(token))
+
+
 class FernetSqlRevokeTests(test_backend_sql.SqlTests, RevokeTests):
     def config_overrides(self):
         super(FernetSqlRevokeTests, self).config_overrides()
@@ -490,6 +762,9 @@ class FernetSqlRevokeTests(test_backend_sql.SqlTests, RevokeTests):
             group='token',
             provider='fernet',
             revoke_by_id=False)
+        # Some tests record events with the backend directly, as another
+        # keystone process would, and expect them to be enforced right away.
+        self.config_fixture.config(group='revoke', index_poll_interval=0)
         self.useFixture(
             ksfixtures.KeyRepository(
                 self.config_fixture,
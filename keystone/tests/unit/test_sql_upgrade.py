@@ -3140,6 +3140,36 @@ class FullMigration(SqlMigrateBase, unit.TestCase):
         )
         self.assertTrue(self.does_fk_exist('limit', 'registered_limit_id'))
 
+    def test_migration_049_adds_effective_assignment_table(self):
+        self.expand(48)
+        self.migrate(48)
+        self.contract(48)
+
+        effective_assignment_table_name = 'effective_assignment'
+        self.assertTableDoesNotExist(effective_assignment_table_name)
+
+        self.expand(49)
+        self.migrate(49)
+        self.contract(49)
+
+        self.assertTableExists(effective_assignment_table_name)
+        self.assertTableColumns(
+            effective_assignment_table_name,
+            ['user_id', 'target_type', 'target_id', 'role_id']
+        )
+
+        effective_assignment_table = sqlalchemy.Table(
+            effective_assignment_table_name, self.metadata, autoload=True
+        )
+        effective_assignment = {
+            'user_id': uuid.uuid4().hex,
+            'target_type': 'project',
+            'target_id': uuid.uuid4().hex,
+            'role_id': uuid.uuid4().hex
+        }
+        effective_assignment_table.insert().values(
+            effective_assignment).execute()
+
 
 class MySQLOpportunisticFullMigration(FullMigration):
     FIXTURE = db_fixtures.MySQLOpportunisticFixture
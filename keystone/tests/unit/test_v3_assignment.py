@@ -185,6 +185,100 @@ class AssignmentTestCase(test_v3.RestfulTestCase,
         self.head(member_url, expected_status=http_client.NOT_FOUND)
         self.get(member_url, expected_status=http_client.NOT_FOUND)
 
+    def test_bulk_role_assignments(self):
+        role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(role['id'], role)
+        role_assignments = [
+            {'role': {'id': role['id']},
+             'user': {'id': self.user['id']},
+             'scope': {'project': {'id': self.project['id']}}},
+            {'role': {'id': role['id']},
+             'group': {'id': self.group['id']},
+             'scope': {'domain': {'id': self.domain_id}}}]
+        project_url = '/projects/%s/users/%s/roles/%s' % (
+            self.project['id'], self.user['id'], role['id'])
+        domain_url = '/domains/%s/groups/%s/roles/%s' % (
+            self.domain_id, self.group['id'], role['id'])
+
+        self.put('/role_assignments',
+                 body={'role_assignments': role_assignments})
+        self.head(project_url)
+        self.head(domain_url)
+        # Making existing role assignments again succeeds.
+        self.put('/role_assignments',
+                 body={'role_assignments': role_assignments})
+
+        # None is removed if any of them doesn't exist.
+        missing = {'role': {'id': self.role_id},
+                   'group': {'id': self.group['id']},
+                   'scope': {'project': {'id': self.project['id']}}}
+        self.delete('/role_assignments',
+                    body={'role_assignments': role_assignments + [missing]},
+                    expected_status=http_client.NOT_FOUND)
+        self.head(project_url)
+
+        self.delete('/role_assignments',
+                    body={'role_assignments': role_assignments})
+        self.head(project_url, expected_status=http_client.NOT_FOUND)
+        self.head(domain_url, expected_status=http_client.NOT_FOUND)
+
+    def test_bulk_role_assignments_validation(self):
+        assignment = {'role': {'id': self.role_id},
+                      'user': {'id': self.user['id']},
+                      'scope': {'project': {'id': self.project['id']}}}
+        for invalid in [
+                [],
+                [dict(assignment, group={'id': self.group['id']})],
+                [dict(assignment, scope={})],
+                [dict(assignment, scope={'system': 'all'})],
+                [dict(assignment, role={'name': self.role['name']})]]:
+            self.put('/role_assignments',
+                     body={'role_assignments': invalid},
+                     expected_status=http_client.BAD_REQUEST)
+        # Nothing is granted if any role doesn't exist.
+        user = unit.create_user(PROVIDERS.identity_api,
+                                domain_id=self.domain_id)
+        valid = dict(assignment, user={'id': user['id']})
+        invalid = dict(assignment, role={'id': uuid.uuid4().hex})
+        self.put('/role_assignments',
+                 body={'role_assignments': [valid, invalid]},
+                 expected_status=http_client.NOT_FOUND)
+        self.assertEqual(
+            [], PROVIDERS.assignment_api.list_role_assignments(
+                user_id=user['id']))
+
+    def test_list_role_assignments_in_pages(self):
+        for i in range(2):
+            user = unit.create_user(PROVIDERS.identity_api,
+                                    domain_id=self.domain_id)
+            PROVIDERS.identity_api.add_user_to_group(user['id'],
+                                                     self.group['id'])
+        PROVIDERS.assignment_api.create_grant(
+            self.role_id, group_id=self.group['id'],
+            project_id=self.project_id)
+
+        collection_url = '/role_assignments?effective&include_names'
+        r = self.get(collection_url)
+        expected = self.assertValidRoleAssignmentListResponse(r)
+        self.assertIsNone(r.result['links']['next'])
+
+        assignments = []
+        url = collection_url + '&limit=2'
+        while url:
+            r = self.get(url)
+            entities = self.assertValidRoleAssignmentListResponse(r)
+            self.assertThat(len(entities), matchers.LessThan(3))
+            assignments += entities
+            url = r.result['links']['next']
+            if url:
+                self.assertIn('include_names', url)
+                url = url.split('/v3', 1)[1]
+        self.assertItemsEqual(expected, assignments)
+
+        for params in ('limit=0', 'limit=x', 'limit=1&marker=x'):
+            self.get('/role_assignments?' + params,
+                     expected_status=http_client.BAD_REQUEST)
+
     def test_crud_user_domain_role_grants(self):
         time = datetime.datetime.utcnow()
         with freezegun.freeze_time(time) as frozen_datetime:
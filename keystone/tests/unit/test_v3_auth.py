@@ -34,17 +34,20 @@ from testtools import testcase
 
 from keystone import auth
 from keystone.auth.plugins import totp
+from keystone.common import controller
 from keystone.common import provider_api
 from keystone.common.rbac_enforcer import policy
 from keystone.common import utils
 import keystone.conf
 from keystone.credential.providers import fernet as credential_fernet
 from keystone import exception
+from keystone.federation import constants as federation_constants
 from keystone.identity.backends import resource_options as ro
 from keystone.tests.common import auth as common_auth
 from keystone.tests import unit
 from keystone.tests.unit import ksfixtures
 from keystone.tests.unit import test_v3
+from keystone.token import provider as token_provider
 
 
 CONF = keystone.conf.CONF
@@ -1719,6 +1722,264 @@ class TokenAPITests(object):
             headers={'X-Subject-Token': v3_token})
         self.assertValidProjectScopedTokenResponse(r, require_catalog=False)
 
+    def test_validate_tokens(self):
+        project_token = self._get_project_scoped_token()
+        revoked_token = self._get_unscoped_token()
+        self.delete('/auth/tokens', headers={'X-Subject-Token': revoked_token})
+        invalid_token = uuid.uuid4().hex
+        token_ids = [self.v3_token, project_token, revoked_token,
+                     invalid_token]
+
+        r = self.post('/auth/tokens/validate', body={'tokens': token_ids},
+                      expected_status=http_client.OK)
+        tokens = r.result['tokens']
+        self.assertEqual(token_ids, [t['id'] for t in tokens])
+        self.assertEqual([True, True, False, False],
+                         [t['valid'] for t in tokens])
+        self.assertEqual(self.user['id'], tokens[0]['token']['user']['id'])
+        self.assertEqual(self.project['id'],
+                         tokens[1]['token']['project']['id'])
+        self.assertIn('catalog', tokens[1]['token'])
+        for t in tokens[2:]:
+            self.assertNotIn('token', t)
+            self.assertEqual(http_client.NOT_FOUND, t['error']['code'])
+
+    def test_validate_tokens_nocatalog(self):
+        project_token = self._get_project_scoped_token()
+        r = self.post('/auth/tokens/validate?nocatalog',
+                      body={'tokens': [project_token]},
+                      expected_status=http_client.OK)
+        self.assertTrue(r.result['tokens'][0]['valid'])
+        self.assertNotIn('catalog', r.result['tokens'][0]['token'])
+
+    def test_validate_tokens_does_not_encode_each_token(self):
+        project_token = self._get_project_scoped_token()
+        token_api = PROVIDERS.token_provider_api
+        with mock.patch.object(token_api, '_render_token_response',
+                               wraps=token_api._render_token_response
+                               ) as mock_render:
+            r = self.post('/auth/tokens/validate',
+                          body={'tokens': [project_token, self.v3_token]},
+                          expected_status=http_client.OK)
+            self.assertFalse(mock_render.called)
+        self.assertTrue(r.result['tokens'][0]['valid'])
+        self.assertTrue(r.result['tokens'][1]['valid'])
+
+    def test_validate_tokens_with_invalid_body(self):
+        self.post('/auth/tokens/validate', body={},
+                  expected_status=http_client.BAD_REQUEST)
+        self.post('/auth/tokens/validate', body={'tokens': []},
+                  expected_status=http_client.BAD_REQUEST)
+        self.post('/auth/tokens/validate', body={'tokens': self.v3_token},
+                  expected_status=http_client.BAD_REQUEST)
+
+    def test_validate_tokens_exceeding_batch_size(self):
+        self.config_fixture.config(group='token', validate_batch_size=1)
+        self.post('/auth/tokens/validate',
+                  body={'tokens': [self.v3_token, uuid.uuid4().hex]},
+                  expected_status=http_client.BAD_REQUEST)
+
+    @unit.skip_if_cache_disabled('token')
+    def test_token_cache_invalidation_is_limited_to_user(self):
+        other_user = unit.create_user(PROVIDERS.identity_api,
+                                      domain_id=self.domain['id'])
+        other_token = self.v3_create_token(self.build_authentication_request(
+            user_id=other_user['id'],
+            password=other_user['password'])).headers.get('X-Subject-Token')
+        token_api = PROVIDERS.token_provider_api
+        token_api.validate_token(self.v3_token)
+        token_api.validate_token(other_token)
+
+        discarded = token_provider.get_cache_invalidation_stats()[
+            'discarded'].get('user', 0)
+        token_provider.invalidate_token_cache(user_id=other_user['id'])
+        with mock.patch.object(token_api.driver, 'validate_token',
+                               wraps=token_api.driver.validate_token
+                               ) as mock_validate_token:
+            # The cached token of the user is still used.
+            token_api.validate_token(self.v3_token)
+            self.assertFalse(mock_validate_token.called)
+
+            token_api.validate_token(other_token)
+            self.assertEqual(1, mock_validate_token.call_count)
+        self.assertEqual(
+            discarded + 1,
+            token_provider.get_cache_invalidation_stats()['discarded']['user'])
+
+        # Once validated again, the token of the other user is cached anew.
+        with mock.patch.object(token_api.driver,
+                               'validate_token') as mock_validate_token:
+            token_api.validate_token(other_token)
+            self.assertFalse(mock_validate_token.called)
+
+    @unit.skip_if_cache_disabled('token')
+    def test_cached_token_roles_follow_role_changes(self):
+        project_token = self._get_project_scoped_token()
+        token_api = PROVIDERS.token_provider_api
+        token_api.validate_token(project_token)
+
+        role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(role['id'], role)
+        PROVIDERS.assignment_api.create_grant(
+            role['id'], user_id=self.user['id'], project_id=self.project_id)
+        token = token_api.validate_token(project_token)
+        self.assertIn(role['id'], [r['id'] for r in token.roles])
+
+        # Renaming a role doesn't change the computed assignments, but the
+        # cached token still picks the new name up.
+        role['name'] = uuid.uuid4().hex
+        PROVIDERS.role_api.update_role(role['id'], role)
+        token = token_api.validate_token(project_token)
+        self.assertIn(role['name'], [r['name'] for r in token.roles])
+
+        PROVIDERS.assignment_api.delete_grant(
+            role['id'], user_id=self.user['id'], project_id=self.project_id)
+        token = token_api.validate_token(project_token)
+        self.assertNotIn(role['id'], [r['id'] for r in token.roles])
+
+    @unit.skip_if_cache_disabled('token')
+    def test_cached_federated_token_roles_follow_group_grants(self):
+        idp_id = uuid.uuid4().hex
+        PROVIDERS.federation_api.create_idp(
+            idp_id, {'id': idp_id, 'enabled': True})
+        # The user of a federated token isn't a member of its groups in the
+        # identity backend.
+        user = unit.create_user(PROVIDERS.identity_api,
+                                domain_id=self.domain['id'])
+        group = unit.new_group_ref(domain_id=self.domain['id'])
+        group = PROVIDERS.identity_api.create_group(group)
+        role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(role['id'], role)
+        for role_id in (self.role_id, role['id']):
+            PROVIDERS.assignment_api.create_grant(
+                role_id, group_id=group['id'], project_id=self.project_id)
+        auth_context = auth.core.AuthContext(
+            user_id=user['id'], group_ids=[group['id']],
+            **{federation_constants.IDENTITY_PROVIDER: idp_id,
+               federation_constants.PROTOCOL: uuid.uuid4().hex})
+        token_api = PROVIDERS.token_provider_api
+        token = token_api.issue_token(
+            user['id'], ['mapped'], project_id=self.project_id,
+            auth_context=auth_context)
+        token = token_api.validate_token(token.id)
+        self.assertIn(role['id'], [r['id'] for r in token.roles])
+
+        PROVIDERS.assignment_api.delete_grant(
+            role['id'], group_id=group['id'], project_id=self.project_id)
+        token = token_api.validate_token(token.id)
+        self.assertEqual([self.role_id], [r['id'] for r in token.roles])
+
+    @unit.skip_if_cache_disabled('token')
+    def test_delete_group_grants_invalidates_tokens_on_target(self):
+        self.config_fixture.config(group='token', revoke_by_id=False)
+        project_token = self._get_project_scoped_token()
+        token_api = PROVIDERS.token_provider_api
+        token_api.validate_token(project_token)
+
+        group = unit.new_group_ref(domain_id=self.domain['id'])
+        group = PROVIDERS.identity_api.create_group(group)
+        grant = {'role_id': self.role_id, 'user_id': None,
+                 'group_id': group['id'], 'domain_id': None,
+                 'project_id': self.project_id}
+        PROVIDERS.assignment_api.create_grants([grant])
+        with mock.patch.object(token_api.driver, 'validate_token',
+                               wraps=token_api.driver.validate_token
+                               ) as mock_validate_token:
+            token_api.validate_token(project_token)
+            self.assertFalse(mock_validate_token.called)
+
+            # The user isn't a member of the group, but the tokens holding
+            # the roles of a group aren't all those of its members.
+            PROVIDERS.assignment_api.delete_grants([grant])
+            token_api.validate_token(project_token)
+            self.assertEqual(1, mock_validate_token.call_count)
+
+    @unit.skip_if_cache_disabled('token')
+    def test_validate_token_uses_cached_rendered_response(self):
+        self.config_fixture.config(group='token',
+                                   cache_rendered_responses=True)
+        project_token = self._get_project_scoped_token()
+        headers = {'X-Subject-Token': project_token}
+        r = self.get('/auth/tokens', headers=headers)
+
+        with mock.patch.object(
+                controller, 'render_token_response_from_model',
+                wraps=controller.render_token_response_from_model
+        ) as mock_render:
+            cached = self.get('/auth/tokens', headers=headers)
+            self.assertFalse(mock_render.called)
+            self.assertEqual(r.result, cached.result)
+
+            # Responses without the catalog are cached separately.
+            r = self.get('/auth/tokens?nocatalog', headers=headers)
+            self.assertNotIn('catalog', r.result['token'])
+            self.assertEqual(1, mock_render.call_count)
+
+            # Changing the catalog discards the cached responses.
+            service = unit.new_service_ref()
+            PROVIDERS.catalog_api.create_service(service['id'], service)
+            self.get('/auth/tokens', headers=headers)
+            self.assertEqual(2, mock_render.call_count)
+
+            # And so does invalidating the cached token.
+            token_provider.invalidate_token_cache(user_id=self.user['id'])
+            self.get('/auth/tokens', headers=headers)
+            self.assertEqual(3, mock_render.call_count)
+
+    @unit.skip_if_cache_disabled('token')
+    def test_cached_token_roles_follow_grants_made_while_minting(self):
+        project_token = self._get_project_scoped_token()
+        token_api = PROVIDERS.token_provider_api
+        role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(role['id'], role)
+        token_model = token_provider.token_model
+        mint = token_model.TokenModel.mint
+
+        def mint_then_grant(token, token_id, issued_at):
+            mint(token, token_id, issued_at)
+            # The roles of the token are resolved before the grant.
+            if role['id'] not in [r['id'] for r in token.roles]:
+                PROVIDERS.assignment_api.create_grant(
+                    role['id'], user_id=self.user['id'],
+                    project_id=self.project_id)
+
+        token_api.invalidate_individual_token_cache(project_token)
+        with mock.patch.object(token_model.TokenModel, 'mint', autospec=True,
+                               side_effect=mint_then_grant):
+            token_api.validate_token(project_token)
+        token = token_api.validate_token(project_token)
+        self.assertIn(role['id'], [r['id'] for r in token.roles])
+
+    @unit.skip_if_cache_disabled('token')
+    def test_assignment_changes_keep_unrelated_cached_tokens(self):
+        project_token = self._get_project_scoped_token()
+        token_api = PROVIDERS.token_provider_api
+        token_api.validate_token(project_token)
+
+        other_user = unit.create_user(PROVIDERS.identity_api,
+                                      domain_id=self.domain['id'])
+        group = unit.new_group_ref(domain_id=self.domain['id'])
+        group = PROVIDERS.identity_api.create_group(group)
+        with mock.patch.object(token_api.driver, 'validate_token',
+                               wraps=token_api.driver.validate_token
+                               ) as mock_validate_token:
+            # Neither the roles of other users, nor a new project, change the
+            # roles of the token.
+            PROVIDERS.assignment_api.create_grant(
+                self.role_id, user_id=other_user['id'],
+                project_id=self.project_id)
+            PROVIDERS.identity_api.add_user_to_group(other_user['id'],
+                                                     group['id'])
+            project = unit.new_project_ref(domain_id=self.domain['id'])
+            PROVIDERS.resource_api.create_project(project['id'], project)
+            token_api.validate_token(project_token)
+            self.assertFalse(mock_validate_token.called)
+
+            PROVIDERS.identity_api.add_user_to_group(self.user['id'],
+                                                     group['id'])
+            token_api.validate_token(project_token)
+            self.assertEqual(1, mock_validate_token.call_count)
+
     def test_is_admin_token_by_ids(self):
         self.config_fixture.config(
             group='resource',
@@ -2634,6 +2895,25 @@ class TestTokenRevokeSelfAndAdmin(test_v3.RestfulTestCase):
                   expected_status=http_client.NOT_FOUND,
                   token=adminA_token)
 
+    def test_user_validates_only_own_tokens_in_batch(self):
+        user_token = self.get_requested_token(
+            self.build_authentication_request(
+                user_id=self.userNormalA['id'],
+                password=self.userNormalA['password'],
+                user_domain_id=self.domainA['id']))
+        adminA_token = self.get_requested_token(
+            self.build_authentication_request(
+                user_id=self.userAdminA['id'],
+                password=self.userAdminA['password'],
+                domain_name=self.domainA['name']))
+
+        r = self.post('/auth/tokens/validate',
+                      body={'tokens': [user_token, adminA_token]},
+                      expected_status=http_client.OK,
+                      token=user_token)
+        self.assertEqual([True, False],
+                         [t['valid'] for t in r.result['tokens']])
+
     def test_adminA_revokes_userA_token(self):
         user_token = self.get_requested_token(
             self.build_authentication_request(
@@ -0,0 +1,73 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from six.moves import http_client
+from testtools import matchers
+
+from keystone.common import cache
+from keystone.common import provider_api
+from keystone.tests import unit
+from keystone.tests.unit import test_v3
+
+PROVIDERS = provider_api.ProviderAPIs
+
+
+class CacheMetricsTests(test_v3.RestfulTestCase, test_v3.JsonHomeTestMixin):
+
+    JSON_HOME_DATA = {
+        'https://docs.openstack.org/api/openstack-identity/3/rel/'
+        'cache_metrics': {
+            'href': '/cache/metrics',
+            'hints': {'status': 'experimental'},
+        },
+    }
+
+    def setUp(self):
+        super(CacheMetricsTests, self).setUp()
+        cache._metrics.reset()
+        self.addCleanup(cache._metrics.reset)
+
+    def test_get_cache_metrics_when_disabled(self):
+        r = self.get('/cache/metrics')
+        metrics = r.json_body['cache_metrics']
+        self.assertFalse(metrics['enabled'])
+        self.assertEqual({}, metrics['regions'])
+        self.assertEqual({}, metrics['functions'])
+        self.assertThat(r.json_body['links']['self'],
+                        matchers.EndsWith('/v3/cache/metrics'))
+
+    @unit.skip_if_cache_disabled('resource')
+    def test_get_cache_metrics(self):
+        self.config_fixture.config(cache_metrics=True)
+        resource_api = PROVIDERS.resource_api
+        resource_api.get_project.invalidate(resource_api, self.project_id)
+        for i in range(2):
+            resource_api.get_project(self.project_id)
+
+        name = cache._metrics.function_name(
+            cache.CACHE_REGION, resource_api.get_project.original)
+        function = cache.get_metrics_report()['functions'][name]
+        self.assertEqual(2, function['calls'])
+        self.assertEqual(1, function['misses'])
+        self.assertEqual(0.5, function['hit_ratio'])
+
+        metrics = self.get('/cache/metrics').json_body['cache_metrics']
+        self.assertTrue(metrics['enabled'])
+        region = metrics['regions']['shared default']
+        self.assertGreater(region['gets'], 0)
+        self.assertGreater(region['sets'], 0)
+        self.assertGreater(region['value_bytes'], 0)
+        self.assertGreater(region['deletes'], 0)
+
+    def test_get_cache_metrics_requires_authentication(self):
+        self.get('/cache/metrics', noauth=True,
+                 expected_status=http_client.UNAUTHORIZED)
@@ -148,6 +148,9 @@ APPLICATION_CREDENTIAL_RELATION = (
 V3_JSON_HOME_RESOURCES = {
     json_home.build_v3_resource_relation('auth_tokens'): {
         'href': '/auth/tokens'},
+    json_home.build_v3_resource_relation('auth_tokens_validate'): {
+        'href': '/auth/tokens/validate',
+        'hints': {'status': 'experimental'}},
     json_home.build_v3_resource_relation('auth_catalog'): {
         'href': '/auth/catalog'},
     json_home.build_v3_resource_relation('auth_projects'): {
@@ -627,6 +630,10 @@ V3_JSON_HOME_RESOURCES = {
         'href': '/limits/model',
         'hints': {'status': 'experimental'}
     },
+    json_home.build_v3_resource_relation('cache_metrics'): {
+        'href': '/cache/metrics',
+        'hints': {'status': 'experimental'}
+    },
     json_home.build_v3_resource_relation('application_credential'): {
         'href-template': APPLICATION_CREDENTIAL,
         'href-vars': {
@@ -15,8 +15,10 @@ import datetime
 import hashlib
 import mock
 import os
+import time
 import uuid
 
+from cryptography import fernet as cryptography_fernet
 from oslo_utils import timeutils
 import six
 
@@ -219,6 +221,142 @@ class TestTokenFormatter(unit.TestCase):
             )
             self.assertEqual(encoded_string, encoded_str_with_padding_restored)
 
+    def _age_key_repository(self, seconds):
+        # pretend the key repository was last modified some time ago, so that
+        # its modification time can be trusted to fingerprint it
+        mtime = time.time() - seconds
+        os.utime(CONF.fernet_tokens.key_repository, (mtime, mtime))
+
+    def test_crypto_is_reused_while_key_repository_is_unchanged(self):
+        token_formatters.invalidate_crypto_cache()
+        self.addCleanup(token_formatters.invalidate_crypto_cache)
+        self._age_key_repository(60)
+
+        formatter = token_formatters.TokenFormatter()
+        crypto = formatter.crypto
+        with mock.patch.object(fernet_utils.FernetUtils,
+                               'load_keys_with_rotation_times') as mock_load:
+            self.assertIs(crypto, formatter.crypto)
+            self.assertIs(crypto, token_formatters.TokenFormatter().crypto)
+            mock_load.assert_not_called()
+
+    def test_crypto_is_reloaded_after_key_rotation(self):
+        token_formatters.invalidate_crypto_cache()
+        self.addCleanup(token_formatters.invalidate_crypto_cache)
+        self._age_key_repository(60)
+
+        formatter = token_formatters.TokenFormatter()
+        crypto = formatter.crypto
+        token = formatter.pack(b'payload')
+
+        key_utils = fernet_utils.FernetUtils(
+            CONF.fernet_tokens.key_repository,
+            CONF.fernet_tokens.max_active_keys,
+            'fernet_tokens'
+        )
+        key_utils.rotate_keys()
+
+        # keys are always reloaded while the repository is still settling
+        rotated_crypto = formatter.crypto
+        self.assertIsNot(crypto, rotated_crypto)
+        self.assertIsNot(rotated_crypto, formatter.crypto)
+
+        self._age_key_repository(30)
+        rotated_crypto = formatter.crypto
+        self.assertIs(rotated_crypto, formatter.crypto)
+
+        # tokens issued with the previous primary key remain valid
+        self.assertEqual(b'payload', formatter.unpack(token))
+
+    def _set_key_mtime(self, key_id, mtime):
+        path = os.path.join(CONF.fernet_tokens.key_repository, str(key_id))
+        os.utime(path, (mtime, mtime))
+
+    def test_unpack_tries_key_in_use_when_token_was_created_first(self):
+        token_formatters.invalidate_crypto_cache()
+        self.addCleanup(token_formatters.invalidate_crypto_cache)
+        now = time.time()
+
+        # key 1 became the primary key when key 0 was staged
+        self._set_key_mtime(0, now - 100)
+        formatter = token_formatters.TokenFormatter()
+        token = formatter.pack(b'payload')
+
+        key_utils = fernet_utils.FernetUtils(
+            CONF.fernet_tokens.key_repository,
+            CONF.fernet_tokens.max_active_keys,
+            'fernet_tokens'
+        )
+        key_utils.rotate_keys()
+        # key 2 became the primary key after the token was created
+        self._set_key_mtime(0, now + 100)
+        self._age_key_repository(60)
+
+        decrypt = cryptography_fernet.Fernet.decrypt
+        with mock.patch.object(cryptography_fernet.Fernet, 'decrypt',
+                               autospec=True,
+                               side_effect=decrypt) as mock_decrypt:
+            self.assertEqual(b'payload', formatter.unpack(token))
+            self.assertEqual(1, mock_decrypt.call_count)
+
+        self.assertEqual({0: 0, 1: 1, 2: 0},
+                         token_formatters.get_key_usage())
+
+    def test_unpack_falls_back_to_every_key(self):
+        token_formatters.invalidate_crypto_cache()
+        self.addCleanup(token_formatters.invalidate_crypto_cache)
+        formatter = token_formatters.TokenFormatter()
+        token = formatter.pack(b'payload')
+
+        key_utils = fernet_utils.FernetUtils(
+            CONF.fernet_tokens.key_repository,
+            CONF.fernet_tokens.max_active_keys,
+            'fernet_tokens'
+        )
+        key_utils.rotate_keys()
+        # pretend key 2 was promoted before the token was created
+        self._set_key_mtime(0, time.time() - 100)
+
+        self.assertEqual(b'payload', formatter.unpack(token))
+        self.assertEqual(1, token_formatters.get_key_usage()[1])
+        self.assertRaises(exception.ValidationError,
+                          formatter.unpack, uuid.uuid4().hex)
+
+    def test_key_usage_is_logged_periodically(self):
+        token_formatters.invalidate_crypto_cache()
+        self.addCleanup(token_formatters.invalidate_crypto_cache)
+        self.config_fixture.config(group='fernet_tokens',
+                                   key_usage_log_interval=60)
+        formatter = token_formatters.TokenFormatter()
+        token = formatter.pack(b'payload')
+
+        with mock.patch.object(token_formatters.LOG, 'info') as mock_info:
+            formatter.unpack(token)
+            self.assertFalse(mock_info.called)
+
+            token_formatters._CRYPTO_CACHE._usage_logged_at -= 60
+            usage = token_formatters.get_key_usage()
+            formatter.unpack(token)
+            formatter.unpack(token)
+            self.assertEqual(1, mock_info.call_count)
+            self.assertEqual(usage, mock_info.call_args[0][1])
+
+    def test_crypto_is_reloaded_when_key_repository_changes(self):
+        token_formatters.invalidate_crypto_cache()
+        self.addCleanup(token_formatters.invalidate_crypto_cache)
+        self._age_key_repository(60)
+        crypto = token_formatters.TokenFormatter().crypto
+
+        self.useFixture(
+            ksfixtures.KeyRepository(
+                self.config_fixture,
+                'fernet_tokens',
+                CONF.fernet_tokens.max_active_keys
+            )
+        )
+        self._age_key_repository(60)
+        self.assertIsNot(crypto, token_formatters.TokenFormatter().crypto)
+
 
 class TestPayloads(unit.TestCase):
     def assertTimestampsEqual(self, expected, actual):
@@ -672,6 +810,25 @@ class TestLoadKeys(unit.TestCase):
         self.assertEqual(2, len(keys))
         self.assertValidFernetKeys(keys)
 
+    def test_load_keys_with_rotation_times(self):
+        key_utils = fernet_utils.FernetUtils(
+            CONF.fernet_tokens.key_repository,
+            CONF.fernet_tokens.max_active_keys,
+            'fernet_tokens'
+        )
+        key_utils.rotate_keys()
+        for key_id, mtime in ((0, 3000), (1, 1000), (2, 2000)):
+            path = os.path.join(CONF.fernet_tokens.key_repository,
+                                str(key_id))
+            os.utime(path, (mtime, mtime))
+
+        keys = key_utils.load_keys_with_rotation_times()
+        self.assertEqual([2, 1, 0], [key_id for key_id, _, _ in keys])
+        self.assertEqual(key_utils.load_keys(), [key for _, key, _ in keys])
+        # the staged key has never been the primary key
+        self.assertEqual([3000, 2000, None],
+                         [promoted_at for _, _, promoted_at in keys])
+
     def test_empty_files(self):
         empty_file = os.path.join(CONF.fernet_tokens.key_repository, '2')
         with open(empty_file, 'w'):
@@ -59,6 +59,18 @@ class TestTokenSerialization(base_classes.TestCaseWithBootstrap):
         self.assertEqual(self.exp_token.id, token.id)
         self.assertEqual(self.exp_token.issued_at, token.issued_at)
 
+    def test_roles_are_resolved_once_and_serialized(self):
+        roles = self.exp_token.roles
+        self.assertIn(self.admin_role_id, [r['id'] for r in roles])
+
+        with mock.patch.object(token_model.TokenModel,
+                               '_get_project_roles') as mock_get_roles:
+            self.assertEqual(roles, self.exp_token.roles)
+            serialized = self.token_handler.serialize(self.exp_token)
+            token = self.token_handler.deserialize(serialized)
+            self.assertEqual(roles, token.roles)
+            self.assertFalse(mock_get_roles.called)
+
     @mock.patch.object(
         token_model.TokenModel, '__init__', side_effect=Exception)
     def test_error_handling_in_deserialize(self, handler_mock):
@@ -15,14 +15,20 @@
 """Token provider interface."""
 
 import base64
+import collections
 import datetime
+import threading
 import uuid
 
+from dogpile.cache import api
 from oslo_log import log
+from oslo_serialization import jsonutils
 from oslo_utils import timeutils
 import six
 
+from keystone import assignment
 from keystone.common import cache
+from keystone.common import controller
 from keystone.common import manager
 from keystone.common import provider_api
 from keystone.common import utils
@@ -43,6 +49,68 @@ MEMOIZE_TOKENS = cache.get_memoization_decorator(
     group='token',
     region=TOKENS_REGION)
 
+# Cached tokens record the generations of the users, projects, domains and
+# trusts they depend on, and are discarded when any of those was bumped since.
+# This way a change to one of them only invalidates the tokens bound to it.
+# Scoped tokens also keep their roles, so a change to the role assignments of
+# some users or targets bumps those, while they record the generation of the
+# roles as well for the changes that may affect anyone.
+ROLES_GENERATION = assignment.ROLES_GENERATION
+_INVALIDATION_STATS_LOCK = threading.Lock()
+# Generations bumped, and cached tokens discarded because of them, by kind of
+# entity. 'all' counts invalidations of the whole token cache.
+_INVALIDATION_STATS = {'bumped': collections.Counter(),
+                       'discarded': collections.Counter()}
+
+
+def _count_invalidation(stat, kinds):
+    with _INVALIDATION_STATS_LOCK:
+        _INVALIDATION_STATS[stat].update(kinds)
+
+
+def get_cache_invalidation_stats():
+    """Return the token cache invalidation counters of this process.
+
+    :returns: a dictionary with the number of generations ``bumped`` and of
+              cached tokens ``discarded`` because of them, each keyed by kind
+              of entity (``user``, ``project``, ``domain`` or ``trust``), by
+              ``roles`` for changes to the roles of scoped tokens, and by
+              ``all`` for invalidations of the whole token cache
+
+    """
+    with _INVALIDATION_STATS_LOCK:
+        return dict((stat, dict(counter))
+                    for stat, counter in _INVALIDATION_STATS.items())
+
+
+def invalidate_token_cache(user_id=None, project_id=None, domain_id=None,
+                           trust_id=None, group_id=None):
+    """Invalidate the cached tokens bound to the given entities.
+
+    A cached token is bound to its user, the project, domain or trust it is
+    scoped to, the domains of its user and project, a trust's trustor and
+    the groups of a federated token. If no entity is given, the whole token
+    cache is invalidated.
+
+    """
+    if not (CONF.cache.enabled and CONF.token.caching):
+        return
+    names = ['%s:%s' % (kind, entity_id)
+             for kind, entity_id in (('user', user_id),
+                                     ('project', project_id),
+                                     ('domain', domain_id),
+                                     ('trust', trust_id),
+                                     ('group', group_id))
+             if entity_id is not None]
+    if names:
+        cache.bump_generations(TOKENS_REGION, names)
+        _count_invalidation('bumped', [n.split(':', 1)[0] for n in names])
+        LOG.debug('Invalidated the cached tokens of %s', ', '.join(names))
+    else:
+        TOKENS_REGION.invalidate()
+        _count_invalidation('bumped', ['all'])
+
+
 # NOTE(morganfainberg): This is for compatibility in case someone was relying
 # on the old location of the UnsupportedTokenVersionException for their code.
 UnsupportedTokenVersionException = exception.UnsupportedTokenVersionException
@@ -98,14 +166,17 @@ class Manager(manager.Manager):
         # provider (token_provider_api) manager to listen for trust deletions.
         callbacks = {
             notifications.ACTIONS.deleted: [
-                ['OS-TRUST:trust', self._drop_token_cache],
-                ['user', self._drop_token_cache],
-                ['domain', self._drop_token_cache],
+                ['OS-TRUST:trust', self._drop_trust_token_cache],
+                ['user', self._drop_user_token_cache],
+                ['domain', self._drop_domain_token_cache],
             ],
             notifications.ACTIONS.disabled: [
-                ['user', self._drop_token_cache],
-                ['domain', self._drop_token_cache],
-                ['project', self._drop_token_cache],
+                ['user', self._drop_user_token_cache],
+                ['domain', self._drop_domain_token_cache],
+                ['project', self._drop_project_token_cache],
+            ],
+            notifications.ACTIONS.updated: [
+                ['role', self._drop_token_roles],
             ],
             notifications.ACTIONS.internal: [
                 [notifications.INVALIDATE_TOKEN_CACHE,
@@ -119,14 +190,246 @@ class Manager(manager.Manager):
                                                       callback_fns)
 
     def _drop_token_cache(self, service, resource_type, operation, payload):
-        """Invalidate the entire token cache.
+        """Invalidate the token cache.
 
         This is a handy private utility method that should be used when
-        consuming notifications that signal invalidating the token cache.
+        consuming notifications that signal invalidating the token cache. The
+        notification may limit the invalidation to the tokens bound to some
+        entities, otherwise the entire token cache is invalidated.
 
         """
-        if CONF.token.cache_on_issue:
-            TOKENS_REGION.invalidate()
+        scope = payload.get('resource_info') or {}
+        invalidate_token_cache(**scope)
+
+    def _drop_user_token_cache(self, service, resource_type, operation,
+                               payload):
+        invalidate_token_cache(user_id=payload['resource_info'])
+
+    def _drop_project_token_cache(self, service, resource_type, operation,
+                                  payload):
+        invalidate_token_cache(project_id=payload['resource_info'])
+
+    def _drop_domain_token_cache(self, service, resource_type, operation,
+                                 payload):
+        invalidate_token_cache(domain_id=payload['resource_info'])
+
+    def _drop_trust_token_cache(self, service, resource_type, operation,
+                                payload):
+        invalidate_token_cache(trust_id=payload['resource_info'])
+
+    def _drop_token_roles(self, service, resource_type, operation, payload):
+        # Tokens keep the names of their roles, which the computed assignments
+        # don't depend on, so only the generation of the roles is renewed.
+        if self._generations_checked():
+            cache.bump_generations(assignment.COMPUTED_ASSIGNMENTS_REGION,
+                                   [ROLES_GENERATION])
+            _count_invalidation('bumped', [ROLES_GENERATION])
+
+    def _generation_names(self, token):
+        names = set()
+        entities = [('user', token.user_id),
+                    ('project', token.project_id),
+                    ('domain', token.domain_id),
+                    ('trust', token.trust_id)]
+        # These were already looked up, and are kept by the token, when it
+        # was minted.
+        if token.user:
+            entities.append(('domain', token.user.get('domain_id')))
+        if token.project:
+            entities.append(('domain', token.project.get('domain_id')))
+        if token.trust_scoped:
+            entities.append(('user', token.trustor['id']))
+        entities.extend(('group', group_id)
+                        for group_id in self._federated_group_ids(token))
+        for kind, entity_id in entities:
+            if entity_id is not None:
+                names.add('%s:%s' % (kind, entity_id))
+        return sorted(names)
+
+    def _federated_group_ids(self, token):
+        # Federated users aren't members of their groups in the identity
+        # backend, so the roles of their tokens depend on the groups instead.
+        return [group['id'] for group in token.federated_groups or []]
+
+    def _generations_checked(self):
+        return CONF.cache.enabled and CONF.token.caching
+
+    def _read_role_generations(self, token):
+        """Read the generations the roles of a token are about to depend on.
+
+        The roles of a scoped token are those of its user, or of the trustor
+        of its trust, on its project, domain or the system, so they depend
+        on the generations of that user and of that project or domain, and
+        on the generation of the roles themselves. Those of a federated token
+        are those of its groups, so they depend on the generations of the
+        groups as well. They are read before the token is minted, and so
+        before its roles are resolved, so that an assignment changed in
+        between isn't missed. The trustor isn't known yet, so its generation
+        is read along with the others once the token is minted.
+
+        :param token: a TokenModel about to be minted
+        :returns: a dictionary of generations by name, empty for unscoped
+                  tokens, or None if cached tokens aren't checked against
+                  generations
+
+        """
+        if not self._generations_checked():
+            return None
+        if token.unscoped:
+            return {}
+        names = ['%s:%s' % (kind, entity_id)
+                 for kind, entity_id in (('user', token.user_id),
+                                         ('project', token.project_id),
+                                         ('domain', token.domain_id))
+                 if entity_id is not None]
+        names.extend('group:%s' % group_id
+                     for group_id in self._federated_group_ids(token))
+        generations = dict(
+            zip(names, cache.get_generations(TOKENS_REGION, names)))
+        generations[ROLES_GENERATION] = cache.get_generations(
+            assignment.COMPUTED_ASSIGNMENTS_REGION, [ROLES_GENERATION])[0]
+        return generations
+
+    def _record_generations(self, token, role_generations=None):
+        """Record the generations of the entities the token is bound to.
+
+        :param token: a minted TokenModel
+        :param role_generations: the generations the roles of the token
+                                 depend on, as returned by
+                                 :meth:`_read_role_generations` before the
+                                 token was minted
+
+        """
+        if self._generations_checked():
+            generations = dict(role_generations or {})
+            names = [name for name in self._generation_names(token)
+                     if name not in generations]
+            generations.update(
+                zip(names, cache.get_generations(TOKENS_REGION, names)))
+            token.cache_generations = generations
+
+    def _stale_generations(self, tokens):
+        """Return the kinds of entities changed since tokens were cached.
+
+        :param tokens: a list of cached TokenModel instances
+        :returns: a list, in the order of ``tokens``, of the sets of kinds of
+                  entities whose generation was bumped since each token was
+                  cached, which are empty for tokens that are still current
+
+        """
+        if not self._generations_checked():
+            return [set() for token in tokens]
+        recorded = [getattr(token, 'cache_generations', None)
+                    for token in tokens]
+        names = set().union(*[g for g in recorded if g])
+        current = {}
+        if ROLES_GENERATION in names:
+            names.remove(ROLES_GENERATION)
+            current[ROLES_GENERATION] = cache.get_generations(
+                assignment.COMPUTED_ASSIGNMENTS_REGION, [ROLES_GENERATION])[0]
+        names = sorted(names)
+        current.update(zip(names,
+                           cache.get_generations(TOKENS_REGION, names)))
+        stale = []
+        for generations in recorded:
+            if generations is None:
+                # Cached without generations, so there is no telling what
+                # changed since.
+                stale.append(set(['all']))
+                continue
+            stale.append(set(name.split(':', 1)[0]
+                             for name, generation in generations.items()
+                             if current[name] != generation))
+        return stale
+
+    def _get_token(self, token_id):
+        token = self._validate_token(token_id)
+        stale = self._stale_generations([token])[0]
+        if stale:
+            _count_invalidation('discarded', stale)
+            token = self._validate_token.refresh(self, token_id)
+        return token
+
+    def _rendered_token_key(self, token_id, include_catalog):
+        return 'rendered:%s:%s' % (token_id, include_catalog)
+
+    def _rendered_token_cache(self, token, include_catalog):
+        """Return where the rendered body of a token is cached, if it is.
+
+        :returns: a tuple of the cache key, of the values the cached body must
+                  have been rendered with and of the cached entry, which is
+                  None if it's missing or outdated, or None if rendered bodies
+                  aren't cached
+
+        """
+        generations = getattr(token, 'cache_generations', None)
+        if not (CONF.token.cache_rendered_responses and
+                self._generations_checked() and generations is not None):
+            return None
+
+        key = self._rendered_token_key(token.id, include_catalog)
+        current = {'generations': generations,
+                   'catalog_generation':
+                       PROVIDERS.catalog_api.get_catalog_generation()}
+        rendered = TOKENS_REGION.get(key)
+        # The generations of the token change whenever it's validated anew,
+        # so the body rendered from it is discarded along with it.
+        if (rendered is api.NO_VALUE or
+                rendered['generations'] != current['generations'] or
+                rendered['catalog_generation'] !=
+                current['catalog_generation']):
+            rendered = None
+        return key, current, rendered
+
+    def render_token_response(self, token, include_catalog=True):
+        """Render the body of the response to a token validation.
+
+        If ``[token] cache_rendered_responses`` is enabled, the rendered body
+        is cached until the token itself is discarded from the cache, or the
+        service catalog or the service providers change.
+
+        :param token: a TokenModel, as returned by :meth:`validate_token`
+        :param include_catalog: whether to include the service catalog
+        :returns: a tuple of the body, as a dictionary, and of its JSON
+                  encoding
+
+        """
+        cached = self._rendered_token_cache(token, include_catalog)
+        if cached is None:
+            return self._render_token_response(token, include_catalog)
+
+        key, current, rendered = cached
+        if rendered is not None:
+            return rendered['body'], rendered['json']
+
+        body, json_body = self._render_token_response(token, include_catalog)
+        rendered = dict(current, body=body, json=json_body)
+        TOKENS_REGION.set(key, rendered)
+        return body, json_body
+
+    def render_token_reference(self, token, include_catalog=True):
+        """Render the body of the response to a token validation, unencoded.
+
+        This is for responses embedding the body in a larger one, so unlike
+        :meth:`render_token_response` it doesn't encode the body as JSON. A
+        body rendered and cached by :meth:`render_token_response` is reused,
+        but a body rendered here isn't cached, since it lacks its encoding.
+
+        :param token: a TokenModel, as returned by :meth:`validate_token`
+        :param include_catalog: whether to include the service catalog
+        :returns: the body, as a dictionary
+
+        """
+        cached = self._rendered_token_cache(token, include_catalog)
+        if cached is not None and cached[2] is not None:
+            return cached[2]['body']
+        return controller.render_token_response_from_model(
+            token, include_catalog=include_catalog)
+
+    def _render_token_response(self, token, include_catalog):
+        body = controller.render_token_response_from_model(
+            token, include_catalog=include_catalog)
+        return body, jsonutils.dump_as_bytes(body, cls=utils.SmarterEncoder)
 
     def check_revocation_v3(self, token):
         token_values = self.revoke_api.model.build_token_values(token)
@@ -140,13 +443,82 @@ class Manager(manager.Manager):
             raise exception.TokenNotFound(_('No token in the request'))
 
         try:
-            token = self._validate_token(token_id)
+            token = self._get_token(token_id)
             self._is_valid_token(token, window_seconds=window_seconds)
             return token
         except exception.Unauthorized as e:
             LOG.debug('Unable to validate token: %s', e)
             raise exception.TokenNotFound(token_id=token_id)
 
+    def validate_tokens(self, token_ids, window_seconds=0):
+        """Validate several tokens at once.
+
+        Cached tokens are looked up with a single round trip to the cache, and
+        revocation is checked for all of the tokens together.
+
+        :param token_ids: a list of token IDs
+        :param window_seconds: as for :meth:`validate_token`
+        :returns: a dictionary mapping each token ID to either the validated
+                  TokenModel or the ``keystone.exception.TokenNotFound``
+                  exception explaining why it isn't valid
+
+        """
+        results = {}
+        token_ids = [t for t in set(token_ids) if t]
+
+        args_list = [(self, token_id) for token_id in token_ids]
+        cached = cache.get_memoized_multi(
+            TOKENS_REGION, MEMOIZE_TOKENS, self._validate_token, args_list)
+
+        hits = [value for value in cached if value is not api.NO_VALUE]
+        stale = iter(self._stale_generations(hits))
+
+        tokens = {}
+        missed_args, missed_tokens = [], []
+        for args, value in zip(args_list, cached):
+            token_id = args[1]
+            if value is not api.NO_VALUE:
+                stale_kinds = next(stale)
+                if not stale_kinds:
+                    tokens[token_id] = value
+                    continue
+                _count_invalidation('discarded', stale_kinds)
+            try:
+                token = self._validate_token.original(self, token_id)
+            except (exception.Unauthorized, exception.NotFound,
+                    exception.ValidationError) as e:
+                LOG.debug('Unable to validate token: %s', e)
+                results[token_id] = exception.TokenNotFound(token_id=token_id)
+                continue
+            tokens[token_id] = token
+            missed_args.append(args)
+            missed_tokens.append(token)
+        cache.set_memoized_multi(TOKENS_REGION, MEMOIZE_TOKENS,
+                                 self._validate_token, missed_args,
+                                 missed_tokens)
+
+        unexpired, token_values = [], []
+        for token_id, token in tokens.items():
+            try:
+                self._check_token_expiry(token, window_seconds=window_seconds)
+                values = self.revoke_api.model.build_token_values(token)
+            except (exception.Unauthorized, exception.NotFound) as e:
+                LOG.debug('Unable to validate token: %s', e)
+                results[token_id] = exception.TokenNotFound(token_id=token_id)
+            else:
+                unexpired.append(token)
+                token_values.append(values)
+
+        revoked = PROVIDERS.revoke_api.check_tokens(token_values)
+        for token, is_revoked in zip(unexpired, revoked):
+            if is_revoked:
+                results[token.id] = exception.TokenNotFound(
+                    _('Failed to validate token'))
+            else:
+                results[token.id] = token
+
+        return results
+
     @MEMOIZE_TOKENS
     def _validate_token(self, token_id):
         (user_id, methods, audit_ids, system, domain_id,
@@ -173,11 +545,18 @@ class Manager(manager.Manager):
             token.protocol_id = protocol_id
             token.federated_groups = federated_group_ids
 
+        role_generations = self._read_role_generations(token)
         token.mint(token_id, issued_at)
+        self._record_generations(token, role_generations)
         return token
 
     def _is_valid_token(self, token, window_seconds=0):
         """Verify the token is valid format and has not expired."""
+        self._check_token_expiry(token, window_seconds=window_seconds)
+        self.check_revocation(token)
+
+    def _check_token_expiry(self, token, window_seconds=0):
+        """Verify the token has a valid expiry which hasn't passed."""
         current_time = timeutils.normalize_time(timeutils.utcnow())
 
         try:
@@ -192,11 +571,7 @@ class Manager(manager.Manager):
                           'determining token expiry: %s', token)
             raise exception.TokenNotFound(_('Failed to validate token'))
 
-        if current_time < expiry:
-            self.check_revocation(token)
-            # Token has not expired and has not been revoked.
-            return None
-        else:
+        if current_time >= expiry:
             raise exception.TokenNotFound(_('Failed to validate token'))
 
     def issue_token(self, user_id, method_names, expires_at=None,
@@ -249,6 +624,7 @@ class Manager(manager.Manager):
             )
 
         token_id, issued_at = self.driver.generate_id_and_issued_at(token)
+        role_generations = self._read_role_generations(token)
         token.mint(token_id, issued_at)
 
         # cache the token object and with ID
@@ -256,6 +632,7 @@ class Manager(manager.Manager):
             # NOTE(amakarov): here and above TOKENS_REGION is to be passed
             # to serve as required positional "self" argument. It's ignored,
             # so I've put it here for convenience - any placeholder is fine.
+            self._record_generations(token, role_generations)
             self._validate_token.set(token, self, token.id)
 
         return token
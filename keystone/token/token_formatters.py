@@ -11,8 +11,11 @@
 # under the License.
 
 import base64
+import collections
 import datetime
 import struct
+import threading
+import time
 import uuid
 
 from cryptography import fernet
@@ -38,6 +41,196 @@ LOG = log.getLogger(__name__)
 TIMESTAMP_START = 1
 TIMESTAMP_END = 9
 
+# Even if the key repository appears unchanged, keys are reloaded from disk at
+# least this often (in seconds) to pick up key files rewritten in place.
+CRYPTO_MAX_AGE = 60
+
+
+class _KeyRing(object):
+    """Encrypt and decrypt tokens with the keys of a key repository.
+
+    This behaves like ``cryptography.fernet.MultiFernet``, except that instead
+    of trying every key in order until one of them verifies a token, it first
+    tries the key that was the primary key when the token was created, based
+    on the timestamp embedded in the token and the rotation times of the keys.
+    If that guess is wrong, every other key is tried in the usual order.
+
+    """
+
+    def __init__(self, keys, usage):
+        self._key_ids = [key_id for key_id, _, _ in keys]
+        self._fernets = [fernet.Fernet(key) for _, key, _ in keys]
+        self._promotion_times = [
+            int(promoted_at) if promoted_at is not None else None
+            for _, _, promoted_at in keys]
+        self._usage = usage
+
+        default_order = list(range(len(self._fernets)))
+        self._default_order = default_order
+        self._orders = [
+            [index] + default_order[:index] + default_order[index + 1:]
+            for index in default_order]
+
+    def encrypt(self, msg):
+        return self._fernets[0].encrypt(msg)
+
+    def _decryption_order(self, token):
+        try:
+            token_bytes = base64.urlsafe_b64decode(token)
+            timestamp = struct.unpack(
+                '>Q', token_bytes[TIMESTAMP_START:TIMESTAMP_END])[0]
+        except (TypeError, ValueError, struct.error):
+            return self._default_order
+
+        for index, promoted_at in enumerate(self._promotion_times):
+            if promoted_at is not None and promoted_at <= timestamp:
+                return self._orders[index]
+        return self._default_order
+
+    def decrypt(self, msg):
+        for index in self._decryption_order(msg):
+            try:
+                payload = self._fernets[index].decrypt(msg)
+            except fernet.InvalidToken:
+                continue
+            self._usage[self._key_ids[index]] += 1
+            return payload
+        raise fernet.InvalidToken
+
+
+class _CryptoCache(object):
+    """Process-wide cache of the crypto object built from a key repository.
+
+    Building the crypto object requires listing the key repository and reading
+    every key file, which is too expensive to do for each token that is issued
+    or validated. The cached instance is reused for as long as the fingerprint
+    of the key repository is unchanged, and replaced as a whole once it
+    changes, so readers never observe a partially loaded set of keys.
+
+    The number of tokens decrypted by each key is tracked for as long as the
+    key remains in the key repository, and logged periodically if
+    ``[fernet_tokens] key_usage_log_interval`` is set.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry = None
+        self._usage_repository = None
+        self._usage = collections.Counter()
+        self._usage_logged_at = time.time()
+
+    def _lookup(self, key_repository, max_active_keys, signature):
+        entry = self._entry
+        if (entry is None or signature is None or
+                entry['signature'] != signature or
+                entry['key_repository'] != key_repository or
+                entry['max_active_keys'] != max_active_keys or
+                time.time() - entry['loaded_at'] > CRYPTO_MAX_AGE):
+            return None
+        return entry['crypto']
+
+    def _track_usage(self, key_repository, key_ids):
+        if self._usage_repository != key_repository:
+            self._usage_repository = key_repository
+            self._usage = collections.Counter()
+
+        for key_id in set(self._usage) - set(key_ids):
+            LOG.info('Fernet key %(key_id)s is no longer in the key '
+                     'repository, it decrypted %(count)d tokens in this '
+                     'process.',
+                     {'key_id': key_id, 'count': self._usage[key_id]})
+            del self._usage[key_id]
+        for key_id in key_ids:
+            self._usage.setdefault(key_id, 0)
+
+        LOG.debug('Number of tokens decrypted by each Fernet key: %s',
+                  dict(self._usage))
+
+    def _log_usage_periodically(self):
+        interval = CONF.fernet_tokens.key_usage_log_interval
+        if not interval:
+            return
+        now = time.time()
+        if now - self._usage_logged_at < interval:
+            return
+        with self._lock:
+            # another thread may have logged the usage while we waited
+            if now - self._usage_logged_at < interval:
+                return
+            self._usage_logged_at = now
+            usage = dict(self._usage)
+        LOG.info('Number of tokens decrypted by each Fernet key in this '
+                 'process: %s', usage)
+
+    def get(self, key_repository, max_active_keys):
+        self._log_usage_periodically()
+        fernet_utils = utils.FernetUtils(
+            key_repository, max_active_keys, 'fernet_tokens'
+        )
+        signature = fernet_utils.key_repository_signature()
+        crypto = self._lookup(key_repository, max_active_keys, signature)
+        if crypto is not None:
+            return crypto
+
+        with self._lock:
+            # another thread may have reloaded the keys while we waited
+            crypto = self._lookup(key_repository, max_active_keys, signature)
+            if crypto is not None:
+                return crypto
+
+            keys = fernet_utils.load_keys_with_rotation_times()
+            if not keys:
+                raise exception.KeysNotFound()
+
+            self._track_usage(
+                key_repository, [key_id for key_id, _, _ in keys])
+            crypto = _KeyRing(keys, self._usage)
+
+            # A repository without a usable fingerprint is still being
+            # modified (e.g. by a rotation in progress), so the keys are
+            # loaded from disk again next time rather than cached.
+            if signature is not None:
+                self._entry = {
+                    'key_repository': key_repository,
+                    'max_active_keys': max_active_keys,
+                    'signature': signature,
+                    'loaded_at': time.time(),
+                    'crypto': crypto,
+                }
+            else:
+                self._entry = None
+            return crypto
+
+    def get_key_usage(self):
+        return dict(self._usage)
+
+    def invalidate(self):
+        """Force the keys to be reloaded from disk on next use."""
+        with self._lock:
+            self._entry = None
+
+
+_CRYPTO_CACHE = _CryptoCache()
+
+
+def invalidate_crypto_cache():
+    """Drop the cached token crypto object of this process."""
+    _CRYPTO_CACHE.invalidate()
+
+
+def get_key_usage():
+    """Return the number of tokens decrypted by each key in this process.
+
+    Keys that no longer decrypt any tokens can safely be rotated out of the
+    key repository.
+
+    :returns: a dictionary mapping key numbers to token counts
+    :rtype: dict
+
+    """
+    return _CRYPTO_CACHE.get_key_usage()
+
 
 class TokenFormatter(object):
     """Packs and unpacks payloads into tokens for transport."""
@@ -54,19 +247,14 @@ class TokenFormatter(object):
         This @property just needs to return an object that implements
         ``encrypt(plaintext)`` and ``decrypt(ciphertext)``.
 
+        The returned instance is shared by the whole process and is only
+        rebuilt when the contents of the key repository change.
+
         """
-        fernet_utils = utils.FernetUtils(
+        return _CRYPTO_CACHE.get(
             CONF.fernet_tokens.key_repository,
-            CONF.fernet_tokens.max_active_keys,
-            'fernet_tokens'
+            CONF.fernet_tokens.max_active_keys
         )
-        keys = fernet_utils.load_keys()
-
-        if not keys:
-            raise exception.KeysNotFound()
-
-        fernet_instances = [fernet.Fernet(key) for key in keys]
-        return fernet.MultiFernet(fernet_instances)
 
     def pack(self, payload):
         """Pack a payload for transport as a token.